@@ -0,0 +1,117 @@
+import sqlite3                 # Local single-file database for the append-only checkpoint log
+import json                    # Page records are stored as JSON (safe to load, unlike pickle)
+import zlib                    # Compress the page records - word lists are very repetitive
+import time                    # Measure how much time checkpointing costs
+import collections             # deque of logged outcomes per URL
+
+
+class CrawlCheckpoint:
+    """
+    Append-only log of crawl progress, so a crawl that dies can be resumed
+
+    WHAT IS STORED?
+    - One row per fetched URL, in the order the crawler processed them: either the parsed
+      page (title, content hash, words, links, HTTP validators) or "broken"
+    - Nothing else is needed: the crawl is a deterministic BFS, so replaying these outcomes
+      in order rebuilds the frontier, visited/broken/outgoing URLs and the documents exactly,
+      without downloading the completed pages again
+
+    COST:
+    - Rows are buffered and written in one transaction every `interval` pages
+    - Time spent checkpointing is measured; if it exceeds `max_overhead` of the crawl
+      time, the interval is doubled so the overhead stays bounded
+    - Without an fsync per commit (synchronous=NORMAL), a power loss can roll back the
+      last batches; those pages are simply downloaded again on resume
+
+    Opening the log only reads it: the log of an earlier crawl is discarded by begin(),
+    when a new (not resumed) crawl actually starts
+    """
+
+    def __init__(self, filename, seed_url, resume=False, interval=50, max_overhead=0.05):
+        self.filename = filename
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.buffer = []
+        self.seed_url = seed_url
+        self.replay = {}  # URL -> deque of logged outcomes still to be replayed
+        self.resumed = False
+        self.pages_logged = 0
+        self.pages_replayed = 0
+        self.checkpoint_seconds = 0.0
+        self.started = time.perf_counter()
+
+        self.db = sqlite3.connect(filename)
+        self.db.execute("PRAGMA journal_mode=WAL")      # Appends don't rewrite the database file
+        self.db.execute("PRAGMA synchronous=NORMAL")    # No fsync per commit: safe if the process dies, a power loss may lose the last batches
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages (seq INTEGER PRIMARY KEY, url TEXT, record BLOB)")
+
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'seed_url'").fetchone()
+
+        if resume and row is not None and row[0] == seed_url:
+            for url, record in self.db.execute("SELECT url, record FROM pages ORDER BY seq"):
+                self.replay.setdefault(url, collections.deque()).append(json.loads(zlib.decompress(record)))
+            self.resumed = True
+            print("Resuming crawl: " + str(sum(len(r) for r in self.replay.values())) + " pages in checkpoint.")
+        elif resume:
+            print("No checkpoint for " + seed_url + " found. Starting a new crawl.")
+
+    def begin(self):
+        """Start of the crawl: a new crawl replaces the log of the previous one, a resumed crawl appends to it"""
+        if not self.resumed:
+            with self.db:
+                self.db.execute("DELETE FROM pages")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('seed_url', ?)", (self.seed_url,))
+
+    def can_replay(self, url):
+        return url in self.replay
+
+    def next_replay(self, url):
+        """
+        The next logged outcome for this URL as (page dict, HTTP validators);
+        the page is None if the URL was broken
+        """
+        outcomes = self.replay[url]
+        record = outcomes.popleft()
+        if not outcomes:
+            del self.replay[url]
+
+        self.pages_replayed += 1
+        return record["page"], record["validators"]
+
+    def record(self, url, page, validators=None):
+        """Log the outcome of a fetched URL (page is None for a broken URL)"""
+        start = time.perf_counter()
+
+        self.buffer.append((url, zlib.compress(json.dumps({"page": page, "validators": validators}).encode("utf-8"))))
+        self.pages_logged += 1
+
+        self.checkpoint_seconds += time.perf_counter() - start
+
+        if len(self.buffer) >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows in one transaction"""
+        start = time.perf_counter()
+
+        if self.buffer:
+            with self.db:
+                self.db.executemany("INSERT INTO pages (url, record) VALUES (?, ?)", self.buffer)
+            self.buffer = []
+
+        self.checkpoint_seconds += time.perf_counter() - start
+
+        # Keep checkpointing below its time budget by writing less often
+        if self.checkpoint_seconds > self.max_overhead * (time.perf_counter() - self.started):
+            self.interval *= 2
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __str__(self):
+        elapsed = time.perf_counter() - self.started
+        return "Checkpoint: {} pages logged, {} replayed, {:.1f} ms spent checkpointing ({:.2%} of crawl time)".format(
+            self.pages_logged, self.pages_replayed, self.checkpoint_seconds * 1000,
+            self.checkpoint_seconds / elapsed if elapsed > 0 else 0)
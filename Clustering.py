@@ -0,0 +1,117 @@
+import numpy as np             # Dense centroids and batched distance matrices
+import scipy.sparse            # Document vectors stay sparse; centroid sums as a sparse product
+
+
+class DocumentClusterer:
+    """
+    Clusters documents given as sparse, unit-length TF-IDF vectors (one row per document)
+
+    WHY IS THIS FAST?
+    - The vectors are never densified: since
+      ||x - c||^2 = ||x||^2 + ||c||^2 - 2 x.c, and x.c for a whole block of documents against
+      every center is one sparse matrix product, instead of one distance call per pair
+    - Documents are processed in blocks of `batch_size` rows, so the distance matrix in
+      memory is at most batch_size x k
+
+    Two modes, both returning {leader document: [(follower document, distance to leader)]}:
+    - leader_follower: k random documents are leaders, every other document follows the nearest
+    - minibatch_kmeans: k centroids refined on random mini-batches (Sculley, "Web-Scale K-Means
+      Clustering"); each cluster's leader is the document closest to its centroid
+
+    All randomness comes from a NumPy Generator seeded with `seed`, so a seed reproduces the clustering
+    """
+
+    def __init__(self, vectors, seed=None, batch_size=1024):
+        self.vectors = scipy.sparse.csr_matrix(vectors)
+        self.squared_norms = np.asarray(self.vectors.multiply(self.vectors).sum(axis=1)).ravel()
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+
+    @property
+    def num_docs(self):
+        return self.vectors.shape[0]
+
+    def distances(self, rows, centers, center_squared_norms):
+        """Euclidean distances of documents `rows` to every center: len(rows) x k array"""
+        block = self.vectors[rows]
+        products = block @ centers.T
+        if scipy.sparse.issparse(products):
+            products = products.toarray()
+
+        squared = self.squared_norms[rows][:, None] + center_squared_norms[None, :] - 2 * np.asarray(products)
+        return np.sqrt(np.maximum(squared, 0))  # Rounding can make identical vectors slightly negative
+
+    def nearest(self, rows, centers, center_squared_norms):
+        """Index of the nearest center and the distance to it, for each document in rows"""
+        nearest, nearest_distance = [], []
+
+        for start in range(0, len(rows), self.batch_size):
+            distances = self.distances(rows[start:start + self.batch_size], centers, center_squared_norms)
+            closest = distances.argmin(axis=1)  # Ties go to the first center, like a strict < scan
+            nearest.append(closest)
+            nearest_distance.append(distances[np.arange(len(closest)), closest])
+
+        if not nearest:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(nearest), np.concatenate(nearest_distance)
+
+    def group(self, leaders, labels, distances):
+        """Build {leader: [(follower, distance)]} in document order"""
+        clusters = {int(leader): [] for leader in leaders}
+
+        for doc, label, distance in zip(range(self.num_docs), labels, distances):
+            leader = int(leaders[label])
+            if doc != leader:
+                clusters[leader].append((doc, float(distance)))
+
+        return clusters
+
+    def leader_follower(self, k):
+        leaders = self.rng.choice(self.num_docs, size=k, replace=False)
+
+        labels, distances = self.nearest(np.arange(self.num_docs), self.vectors[leaders], self.squared_norms[leaders])
+        labels[leaders] = np.arange(k)  # A leader leads its own cluster even if another leader is identical
+        return self.group(leaders, labels, distances)
+
+    def minibatch_kmeans(self, k, batch_size=256, iterations=100, tolerance=1e-4):
+        # Start from k distinct random documents
+        centers = self.vectors[self.rng.choice(self.num_docs, size=k, replace=False)].toarray()
+        counts = np.zeros(k)
+
+        for _ in range(iterations):
+            batch = self.rng.choice(self.num_docs, size=min(batch_size, self.num_docs), replace=False)
+            labels, _ = self.nearest(batch, centers, (centers ** 2).sum(axis=1))
+
+            # Sum of the batch documents assigned to each center, as one sparse product
+            assignment = scipy.sparse.csr_matrix((np.ones(len(batch)), (labels, np.arange(len(batch)))),
+                                                 shape=(k, len(batch)))
+            sums = (assignment @ self.vectors[batch]).toarray()
+            members = np.bincount(labels, minlength=k)
+
+            # Each center becomes the running mean of every document ever assigned to it:
+            # the learning rate 1/count shrinks as a center sees more documents
+            counts += members
+            updated = members > 0
+            shift = (sums[updated] - members[updated, None] * centers[updated]) / counts[updated, None]
+            centers[updated] += shift
+
+            if np.abs(shift).max(initial=0) < tolerance:
+                break
+
+        labels, _ = self.nearest(np.arange(self.num_docs), centers, (centers ** 2).sum(axis=1))
+
+        # Leader of each non-empty cluster: its member closest to the centroid;
+        # followers report their distance to the leader document, like leader_follower
+        clusters = {}
+        for center in range(k):
+            members = np.flatnonzero(labels == center)
+            if len(members) == 0:
+                continue
+
+            _, to_centroid = self.nearest(members, centers[center:center + 1], (centers[center:center + 1] ** 2).sum(axis=1))
+            leader = members[to_centroid.argmin()]
+
+            _, to_leader = self.nearest(members, self.vectors[[leader]], self.squared_norms[[leader]])
+            clusters[int(leader)] = [(int(doc), float(distance)) for doc, distance in zip(members, to_leader) if doc != leader]
+
+        return clusters
@@ -0,0 +1,374 @@
+"""
+Distributed crawl: several worker processes share one crawl, each owning part of the URLs
+
+WHY?
+- Even with concurrency, one process owns the whole frontier and seen-URL set, and
+  parses every page on one core
+- Here every in-scope URL has exactly one owner: the worker its hash (of the whole URL,
+  or of its host) maps to. Only the owner queues, fetches and parses it, so each
+  worker keeps the frontier and seen set of its own part of the site
+- A worker that finds a link owned by another worker sends it to its owner, in
+  batches, through the coordinator
+
+HOW?
+    coordinator (the crawl() of the WebCrawler)        workers (CrawlWorker)
+        seeds the owner of the seed URL         ->     crawl their own frontier
+        routes link batches to their owners     <->    send links they don't own
+        hands out page credits (page_limit)     <->    ask for credits / report idle
+        sends "finish" when all are idle        ->     return their part of the crawl
+        merges the parts into one crawl state
+
+- Global page limit: a worker may only index a page with a credit from the
+  coordinator, and the coordinator never hands out more than page_limit credits in
+  total (unused credits of idle workers are handed out again). Workers fetch one page
+  at a time, so the limit is never exceeded
+- End of the crawl: every worker has reported that it is idle (or waiting for credits
+  that are gone), after it processed every message the coordinator sent it
+- Politeness: a worker only paces its own requests to a host, so with a crawl delay
+  (set_crawl_delay, or the robots.txt Crawl-delay of the seed's host) every host must
+  belong to one worker: URLs are then partitioned by host even if "url" was asked for
+- Messages are pickled over multiprocessing.connection sockets, so workers can run on
+  this machine (started automatically) or on other nodes:
+
+    python SearchEngine.py -u URL -p 500 --distributed 4 --listen 0.0.0.0:6000 --authkey secret
+    python DistributedCrawl.py --connect coordinator-host:6000 --authkey secret     (on every node, 4 times)
+
+Documents of the merged crawl are ordered worker by worker. Near-duplicate detection,
+checkpoints, crawl metrics and re-crawls are features of the single-process crawl.
+"""
+import argparse                                          # Command-line options of a remote worker
+import contextlib                                        # Workers' page log goes to /dev/null unless verbose
+import os                                                # Random authentication key for local workers
+import queue                                             # Messages waiting to be sent to a worker
+import threading                                         # One sender thread per worker: the coordinator never blocks on a send
+import time                                              # Crawl duration, link batch interval
+import urllib.parse                                      # Host of a URL for host partitioning
+import multiprocessing                                   # Local worker processes
+from multiprocessing.connection import Listener, Client, wait  # Pickled messages over sockets
+from multiprocessing import AuthenticationError           # A worker with the wrong key
+from WebCrawler import WebCrawler                        # A worker is a crawler of its own URLs
+from Frontier import url_fingerprint                     # Stable 64-bit hash of a URL
+from UrlCanonicalizer import canonicalize                # Same seed spelling as begin_crawl
+
+LINK_BATCH = 500              # Links a worker collects for other workers before sending them
+LINK_INTERVAL = 0.5           # Seconds after which a smaller batch is sent anyway
+CONNECT_TIMEOUT = 120         # Seconds the coordinator waits for all workers to connect
+
+# What a worker sends back at the end: its part of the crawl
+PARTITION_STATE = ["visited_urls", "doc_words", "doc_titles", "doc_urls", "page_links", "link_sources", "link_targets",
+                   "http_validators", "outgoing_urls", "broken_urls", "graphic_urls", "link_stats", "num_pages_crawled", "num_pages_indexed"]
+
+
+def url_owner(url, num_workers, partition="url"):
+    """Worker that owns a canonical URL"""
+    key = urllib.parse.urlsplit(url).netloc if partition == "host" else url
+    return url_fingerprint(key) % num_workers
+
+
+class CrawlWorker(WebCrawler):
+    """Crawls the URLs owned by one worker; links owned by others are sent to the coordinator"""
+
+    def __init__(self, settings):
+        super().__init__(settings["seed_url"])
+        self.worker = settings["worker"]
+        self.num_workers = settings["num_workers"]
+        self.partition = settings["partition"]
+        self.stop_words = settings["stop_words"]
+        self.crawl_delay = settings["crawl_delay"]
+        self.fetch_timeout = settings["fetch_timeout"]
+        self.fetch_retries = settings["fetch_retries"]
+        if settings["scheduler"] is not None:
+            self.set_scheduler(**settings["scheduler"])  # Depths count from the URLs the worker was sent
+
+        self.outbox = [[] for _ in range(self.num_workers)]  # Links found for each other worker
+        self.last_sent = time.monotonic()
+        self.received = 0  # Messages received from the coordinator
+
+    def queue_url(self, url):
+        owner = url_owner(url, self.num_workers, self.partition)
+
+        if owner == self.worker:
+            super().queue_url(url)
+        elif url not in self.seen_urls:
+            # Every URL is sent to its owner once; the owner checks its own seen set
+            self.seen_urls.add(url)
+            self.outbox[owner].append(url)
+
+    def send_links(self, connection):
+        batches = {owner: urls for owner, urls in enumerate(self.outbox) if urls}
+        if batches:
+            connection.send(("links", batches))
+            self.outbox = [[] for _ in range(self.num_workers)]
+        self.last_sent = time.monotonic()
+
+    def crawl_partition(self, connection, limited):
+        """
+        Crawl until the coordinator says "finish", then send back this part of the crawl
+        With a page limit (limited), a page may only be crawled with a credit left
+        """
+        credits = 0 if limited else None
+        waiting = False  # Told the coordinator we are idle or need credits: block until it answers
+
+        while True:
+            if waiting or connection.poll():
+                message = connection.recv()
+                self.received += 1
+
+                if message[0] == "finish":
+                    break
+                elif message[0] == "links":
+                    for url in message[1]:
+                        super().queue_url(url)
+                elif message[0] == "credits":
+                    credits += message[1]
+                waiting = False
+
+            elif self.url_frontier and (credits is None or credits > 0):
+                indexed = self.num_pages_indexed
+                self.crawl_next_page()
+                if credits is not None:
+                    credits -= self.num_pages_indexed - indexed
+
+                if sum(len(urls) for urls in self.outbox) >= LINK_BATCH or time.monotonic() - self.last_sent > LINK_INTERVAL:
+                    self.send_links(connection)
+
+            else:
+                # Nothing to do: pass on the remaining links, then report (with unused credits)
+                self.send_links(connection)
+                if self.url_frontier:
+                    connection.send(("need", self.received))
+                else:
+                    connection.send(("idle", self.received, credits or 0))
+                    credits = 0 if credits is not None else None
+                waiting = True
+
+        connection.send(("result", {name: getattr(self, name) for name in PARTITION_STATE}))
+
+
+def run_worker(address, authkey, verbose=False):
+    """Worker process: connect to the coordinator, crawl the URLs it owns, send back the results"""
+    connection = Client(address, authkey=authkey)
+    settings = connection.recv()
+    worker = CrawlWorker(settings)
+
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+        worker.crawl_partition(connection, settings["page_limit"] is not None)
+
+    connection.close()
+
+
+class Sender:
+    """Sends messages to one worker from a thread, so the coordinator can always keep reading"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.messages = queue.Queue()
+        self.sent = 0  # Messages queued so far (compared with what the worker has received)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def send(self, message):
+        self.sent += 1
+        self.messages.put(message)
+
+    def run(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                return
+            self.connection.send(message)
+
+    def close(self):
+        self.messages.put(None)
+        self.thread.join()
+
+
+def crawl_distributed(crawler):
+    """
+    Coordinator: run the crawl of crawler (a WebCrawler) on crawler.distributed_workers
+    workers and merge their results into crawler's crawl state
+    """
+    num_workers = crawler.distributed_workers
+    listen = crawler.distributed_listen
+    authkey = crawler.distributed_authkey or os.urandom(16)  # Local workers get it from this process
+    print("robots.txt: " + str(crawler.get_robots_txt()) + "\n")
+    crawler.crawl_start = time.perf_counter()
+
+    seed = canonicalize(crawler.seed_url + "/")
+    partition = crawler.partition
+    if partition == "url" and crawler.host_crawl_delay(seed) > 0:
+        print("Crawl delay of {}s: partitioning URLs by host, so one worker paces each host".format(crawler.host_crawl_delay(seed)))
+        partition = "host"
+
+    listener = Listener(listen or ("127.0.0.1", 0), authkey=authkey)
+    processes = []
+    if listen is None:
+        for _ in range(num_workers):
+            process = multiprocessing.Process(target=run_worker, args=(listener.address, authkey))
+            process.start()
+            processes.append(process)
+    else:
+        print("Waiting up to {} seconds for {} workers on {}:{}".format(CONNECT_TIMEOUT, num_workers, *listener.address))
+
+    try:
+        connections = accept_workers(listener, num_workers, authkey)
+    except RuntimeError:
+        for process in processes:
+            process.terminate()
+        raise
+
+    for worker, connection in enumerate(connections):
+        connection.send({"worker": worker, "num_workers": num_workers, "partition": partition,
+                         "seed_url": crawler.seed_url, "stop_words": list(crawler.stop_words),
+                         "page_limit": crawler.page_limit, "crawl_delay": crawler.crawl_delay,
+                         "fetch_timeout": crawler.fetch_timeout, "fetch_retries": crawler.fetch_retries,
+                         "scheduler": crawler.scheduler})
+    senders = [Sender(connection) for connection in connections]
+
+    try:
+        coordinate(crawler, connections, senders, seed, partition)
+
+        for sender in senders:
+            sender.send(("finish",))
+        results = [receive_result(connection) for connection in connections]
+    finally:
+        for sender in senders:
+            sender.close()
+        for connection in connections:
+            connection.close()
+        for process in processes:
+            process.join()
+
+    merge_results(crawler, results)
+    for worker, state in enumerate(results):
+        print("Worker {}: {} pages crawled, {} indexed".format(worker, state["num_pages_crawled"], state["num_pages_indexed"]))
+    crawler.end_crawl()
+
+
+def accept_workers(listener, num_workers, authkey, timeout=CONNECT_TIMEOUT):
+    """
+    Connections of num_workers workers (then the listener is closed)
+    RuntimeError if they have not all connected within timeout seconds
+    """
+    connections = []
+    timed_out = threading.Event()
+
+    def accept():
+        while len(connections) < num_workers:
+            try:
+                connection = listener.accept()
+            except AuthenticationError:
+                print("Warning: a worker connected with the wrong authkey")
+                continue
+            if timed_out.is_set():
+                connection.close()
+                return
+            connections.append(connection)
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    if thread.is_alive():
+        # accept() can't be interrupted: wake it with a connection of our own
+        timed_out.set()
+        Client(listener.address, authkey=authkey).close()
+        thread.join()
+    listener.close()
+
+    if timed_out.is_set():
+        for connection in connections:
+            connection.close()
+        raise RuntimeError("Only {} of {} crawl workers connected within {} seconds".format(len(connections), num_workers, timeout))
+    return connections
+
+
+def coordinate(crawler, connections, senders, seed, partition):
+    """Route links and page credits until every worker is idle (the crawl starts at seed)"""
+    num_workers = len(connections)
+    remaining = crawler.page_limit  # Credits not handed out (None: no page limit)
+    state = ["busy"] * num_workers  # "busy", "idle" or "need" (has URLs, but no credits)
+
+    # The crawl starts at the owner of the seed URL
+    senders[url_owner(seed, num_workers, partition)].send(("links", [seed]))
+
+    while "busy" in state:
+        for connection in wait(connections):
+            worker = connections.index(connection)
+            try:
+                message = connection.recv()
+            except EOFError:
+                raise RuntimeError("Crawl worker {} disconnected".format(worker))
+
+            if message[0] == "links":
+                for owner, urls in message[1].items():
+                    senders[owner].send(("links", urls))
+                    state[owner] = "busy"
+
+            else:
+                # A status only counts if the worker has seen everything we sent it
+                current = message[1] == senders[worker].sent
+                if message[0] == "idle" and remaining is not None:
+                    remaining += message[2]
+                state[worker] = message[0] if current else "busy"
+
+        # Credits for workers waiting for them, in small enough chunks to share them out
+        for worker in range(num_workers):
+            if state[worker] == "need" and remaining:
+                credits = max(1, min(remaining, remaining // (2 * num_workers)))
+                senders[worker].send(("credits", credits))
+                remaining -= credits
+                state[worker] = "busy"
+
+
+def receive_result(connection):
+    while True:
+        message = connection.recv()
+        if message[0] == "result":
+            return message[1]
+
+
+def merge_results(crawler, results):
+    """Combine the parts of the crawl: each URL was crawled by exactly one worker"""
+    crawler.reset_crawl_state()
+
+    for state in results:
+        crawler.visited_urls.update(state["visited_urls"])
+        crawler.page_links.update(state["page_links"])
+        crawler.link_sources.extend(state["link_sources"])
+        crawler.link_targets.extend(state["link_targets"])
+        crawler.http_validators.update(state["http_validators"])
+
+        for doc_id in state["doc_words"]:
+            if doc_id not in crawler.doc_words:  # Duplicates found by two workers are indexed once
+                crawler.doc_words[doc_id] = state["doc_words"][doc_id]
+                crawler.doc_titles[doc_id] = state["doc_titles"][doc_id]
+                crawler.doc_urls[doc_id] = state["doc_urls"][doc_id]
+
+        for url in state["outgoing_urls"]:
+            if url not in crawler.outgoing_urls:
+                crawler.outgoing_urls.add(url)
+        for url in state["broken_urls"]:
+            crawler.add_broken_url(url)
+        crawler.graphic_urls += state["graphic_urls"]
+
+        for name in crawler.link_stats:
+            crawler.link_stats[name] += state["link_stats"][name]
+        crawler.num_pages_crawled += state["num_pages_crawled"]
+        crawler.num_pages_indexed += state["num_pages_indexed"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl worker for a distributed crawl (see SearchEngine.py --distributed)")
+    parser.add_argument("--connect",
+                        help="Address of the coordinator: HOST:PORT", required=True)
+    parser.add_argument("--authkey",
+                        help="Shared secret of the coordinator's --authkey", required=True)
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print every page this worker visits")
+
+    argument = parser.parse_args()
+    host, port = argument.connect.rsplit(":", 1)
+    run_worker((host, int(port)), argument.authkey.encode("utf-8"), argument.verbose)
@@ -0,0 +1,129 @@
+from array import array       # 4 bytes per token instead of an 8-byte pointer to a string object
+import numpy as np            # Renumber the term ids of a subset of the documents at once
+
+SNIPPET_WORDS = 20  # Words of a document shown under its search result
+
+
+class DocumentStore:
+    """
+    The words of every indexed document, stored as term ids: {doc_id: [words]} in a compact form
+
+    WHY?
+    - A list of str tokens costs about 50+ bytes per token (the string object and the
+      pointer to it), although a page only uses a few hundred distinct words
+    - Here every distinct word is stored once in a shared vocabulary, and a document is an
+      array('I') of vocabulary ids: 4 bytes per token
+    - Indexing only needs to stem each distinct word once, not every occurrence
+    - The first SNIPPET_WORDS words of each document are kept as a ready-made snippet string
+
+    Behaves like the dict it replaces: store[doc_id] = words, store[doc_id] returns the
+    words, and keys/values/items/in/len work in insertion (crawl) order
+    """
+
+    def __init__(self, documents=()):
+        self.vocabulary = []  # Term id -> word
+        self.word_ids = {}    # Word -> term id
+        self.documents = {}   # doc_id -> array('I') of term ids
+        self.snippets = {}    # doc_id -> first SNIPPET_WORDS words, joined
+
+        for doc_id, words in dict(documents).items():
+            self[doc_id] = words
+
+    def intern(self, word):
+        term_id = self.word_ids.get(word)
+        if term_id is None:
+            term_id = self.word_ids[word] = len(self.vocabulary)
+            self.vocabulary.append(word)
+        return term_id
+
+    def __setitem__(self, doc_id, words):
+        self.documents[doc_id] = array("I", map(self.intern, words))
+        self.snippets[doc_id] = " ".join(words[:SNIPPET_WORDS])
+
+    def __getitem__(self, doc_id):
+        vocabulary = self.vocabulary
+        return [vocabulary[term_id] for term_id in self.documents[doc_id]]
+
+    def __delitem__(self, doc_id):
+        del self.documents[doc_id]
+        del self.snippets[doc_id]
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def keys(self):
+        return self.documents.keys()
+
+    def values(self):
+        return (self[doc_id] for doc_id in self.documents)
+
+    def items(self):
+        return ((doc_id, self[doc_id]) for doc_id in self.documents)
+
+    def get(self, doc_id, default=None):
+        return self[doc_id] if doc_id in self.documents else default
+
+    def snippet(self, doc_id):
+        return self.snippets[doc_id]
+
+    def term_ids(self, doc_id):
+        return self.documents[doc_id]
+
+    def reorder(self, doc_ids):
+        """Keep only the documents doc_ids, in that order (the vocabulary is left as it is)"""
+        self.documents = {doc_id: self.documents[doc_id] for doc_id in doc_ids}
+        self.snippets = {doc_id: self.snippets[doc_id] for doc_id in doc_ids}
+
+    def subset(self, doc_ids):
+        """A new store with only the documents doc_ids and the words they use (e.g. one index shard)"""
+        store = DocumentStore()
+        documents = [np.frombuffer(self.documents[doc_id], dtype=np.uint32) for doc_id in doc_ids]
+
+        used = np.unique(np.concatenate(documents)) if documents else np.zeros(0, dtype=np.uint32)
+        new_ids = np.zeros(len(self.vocabulary), dtype=np.uint32)
+        new_ids[used] = np.arange(len(used), dtype=np.uint32)
+
+        store.vocabulary = [self.vocabulary[term_id] for term_id in used.tolist()]
+        store.word_ids = {word: term_id for term_id, word in enumerate(store.vocabulary)}
+        for doc_id, term_ids in zip(doc_ids, documents):
+            store.documents[doc_id] = array("I", new_ids[term_ids].tobytes())
+            store.snippets[doc_id] = self.snippets[doc_id]
+
+        return store
+
+    def stem_vocabulary(self, stem, doc_ids=None):
+        """
+        Stem of every vocabulary word, by term id: each distinct word is stemmed once
+        With doc_ids, only the words of those documents are stemmed: {term id: stem}
+        """
+        if doc_ids is None:
+            return [stem(word) for word in self.vocabulary]
+
+        documents = [np.frombuffer(self.documents[doc_id], dtype=np.uint32) for doc_id in doc_ids]
+        used = np.unique(np.concatenate(documents)) if documents else np.zeros(0, dtype=np.uint32)
+        return {term_id: stem(self.vocabulary[term_id]) for term_id in used.tolist()}
+
+    def stemmed(self, stems, doc_ids=None):
+        """Yield the list of stemmed terms of each document (all, or those in doc_ids), given stem_vocabulary(stem, doc_ids)"""
+        for doc_id in (self.documents if doc_ids is None else doc_ids):
+            yield [stems[term_id] for term_id in self.documents[doc_id]]
+
+    def __getstate__(self):
+        # The word -> id dictionary is rebuilt from the vocabulary when loading
+        return {"vocabulary": self.vocabulary, "documents": self.documents, "snippets": self.snippets}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.word_ids = {word: term_id for term_id, word in enumerate(self.vocabulary)}
+
+    def __eq__(self, other):
+        return list(self.items()) == list(other.items())
+
+    def __repr__(self):
+        return "DocumentStore({} documents, {} distinct words)".format(len(self.documents), len(self.vocabulary))
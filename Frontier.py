@@ -0,0 +1,385 @@
+import collections             # deque: O(1) append on the right and pop on the left
+import hashlib                 # 64-bit URL fingerprints and Bloom filter bit positions
+import heapq                   # Priority queue of each host, and of the hosts to serve next
+import itertools               # Insertion counter: FIFO order among equal priorities
+import math                    # Bloom filter sizing
+import re                      # URL pattern weights
+import tempfile                # Anonymous spill file that is deleted automatically
+import time                    # Token-bucket refill
+import urllib.parse            # Host of a URL for the per-host queues
+import numpy as np             # Compact sorted array of fingerprints
+
+SCHEDULER_POLICIES = ["bfs", "depth", "inlinks", "pattern"]  # Which URL of a host is crawled first
+HOST_SELECTIONS = ["round-robin", "token-bucket"]            # Which host is served next
+
+
+class OrderedSet:
+    """
+    Set that remembers insertion order (used for the outgoing/broken URL reports)
+
+    A plain list needs an O(n) scan for every "not in" check; a dict gives O(1)
+    membership while keeping the first-seen order for printing
+    """
+
+    def __init__(self, items=()):
+        self.items = dict.fromkeys(items)
+
+    def add(self, item):
+        self.items[item] = None
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return "OrderedSet(" + repr(list(self.items)) + ")"
+
+
+def url_fingerprint(url):
+    """64-bit hash of a URL: with 100 million URLs the chance of any two colliding is about 0.03%"""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class FingerprintSet:
+    """
+    Set of URLs that stores 8 bytes per URL instead of the URL string
+
+    A Python set of URL strings costs roughly 100-200 bytes per URL; here each URL is a
+    64-bit fingerprint in a sorted NumPy array (binary search for lookups). New fingerprints
+    collect in a small set and are merged into the array in batches, so adding stays cheap.
+    """
+
+    MIN_MERGE = 65536  # Recent additions kept in the set before merging into the array
+
+    def __init__(self):
+        self.sorted = np.zeros(0, dtype=np.uint64)
+        self.recent = set()
+
+    def add(self, url):
+        fingerprint = url_fingerprint(url)
+        if fingerprint in self.recent or self.in_sorted(fingerprint):
+            return
+
+        self.recent.add(fingerprint)
+
+        # Merge when the buffer is a fraction of the array: every fingerprint is copied only a few times
+        if len(self.recent) >= max(self.MIN_MERGE, len(self.sorted) // 8):
+            recent = np.fromiter(self.recent, dtype=np.uint64, count=len(self.recent))
+            self.sorted = np.sort(np.concatenate((self.sorted, recent)))  # Disjoint, so no duplicates
+            self.recent = set()
+
+    def in_sorted(self, fingerprint):
+        i = self.sorted.searchsorted(np.uint64(fingerprint))
+        return i < len(self.sorted) and self.sorted[i] == fingerprint
+
+    def __contains__(self, url):
+        fingerprint = url_fingerprint(url)
+        return fingerprint in self.recent or self.in_sorted(fingerprint)
+
+    def __len__(self):
+        return len(self.sorted) + len(self.recent)
+
+
+class BloomFilter:
+    """
+    Probabilistic set of URLs for crawls too large even for FingerprintSet: about
+    1.8 bytes per URL at a 0.1% error rate (capacity 10 million: 18 MB)
+
+    "Not in the set" is always right; "in the set" is wrong for about `error_rate` of
+    the URLs never added, so that fraction of new URLs is skipped. Past `capacity`
+    URLs the error rate climbs, so size it for the whole crawl.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = int(capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def positions(self, url):
+        # Double hashing: k bit positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, url):
+        bits = self.bits
+        new = False
+        for position in self.positions(url):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        self.count += new  # A new URL whose bits were all set already is a false positive: not counted
+
+    def __contains__(self, url):
+        bits = self.bits
+        for position in self.positions(url):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+
+class UrlFrontier:
+    """
+    FIFO queue of URLs waiting to be crawled (BFS order)
+
+    deque gives O(1) append/popleft instead of list.pop(0), which shifts the whole list.
+    Whether a URL was queued before is answered by the crawler's seen-URL set, not here
+    """
+
+    def __init__(self):
+        self.queue = collections.deque()
+
+    def append(self, url):
+        self.queue.append(url)
+
+    def popleft(self):
+        return self.queue.popleft()
+
+    def link_found(self, url):
+        """Another link to a URL queued before: BFS order does not change"""
+        pass
+
+    def __iter__(self):
+        return iter(self.queue)
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class DiskSpillingFrontier(UrlFrontier):
+    """
+    Frontier for very large crawls: only the first `memory_limit` URLs are kept in RAM
+
+    Once the in-memory queue is full, new URLs are appended to a temporary file on disk
+    and read back in order when the in-memory part runs low, so BFS order is unchanged.
+    """
+
+    def __init__(self, memory_limit=100000):
+        super().__init__()
+        self.memory_limit = memory_limit
+        self.spill_file = None
+        self.spill_read_pos = 0
+        self.spill_count = 0
+
+    def append(self, url):
+        # Once anything is on disk, new URLs must queue behind it to keep FIFO order
+        if self.spill_count == 0 and len(self.queue) < self.memory_limit:
+            super().append(url)
+            return
+
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile()
+
+        self.spill_file.seek(0, 2)
+        self.spill_file.write(url.encode("utf-8") + b"\n")
+        self.spill_count += 1
+
+    def refill(self):
+        """Move the oldest spilled URLs back into memory"""
+        self.spill_file.seek(self.spill_read_pos)
+
+        while self.spill_count > 0 and len(self.queue) < self.memory_limit:
+            url = self.spill_file.readline()[:-1].decode("utf-8")
+            self.spill_count -= 1
+            super().append(url)
+
+        self.spill_read_pos = self.spill_file.tell()
+
+        if self.spill_count == 0:
+            # Everything is back in memory - start a fresh spill file next time
+            self.spill_file.close()
+            self.spill_file = None
+            self.spill_read_pos = 0
+
+    def popleft(self):
+        if not self.queue and self.spill_count > 0:
+            self.refill()
+        return super().popleft()
+
+    def __iter__(self):
+        # Only the in-memory head is iterated (used to peek at the next URLs to prefetch)
+        if not self.queue and self.spill_count > 0:
+            self.refill()
+        return iter(self.queue)
+
+    def __len__(self):
+        return len(self.queue) + self.spill_count
+
+
+class PriorityFrontier:
+    """
+    Frontier with a priority queue (heap) per host, instead of one FIFO queue
+
+    WHY?
+    - With one FIFO queue, a host with thousands of queued URLs (or a slow one) holds up
+      every other host, and a page limit is spent on whatever was found first
+    - Here each host has its own queue, the hosts take turns, and within a host the most
+      valuable URL comes first
+
+    policy - which URL of a host comes first (ties: the one queued first):
+        "bfs"      queue order, as in UrlFrontier
+        "depth"    fewest links away from the seed
+        "inlinks"  most links to it found so far (it moves up while it waits)
+        "pattern"  highest weight of the regular expressions it matches (pattern_weights)
+    host_selection - which host is served next:
+        "round-robin"   every host with queued URLs in turn
+        "token-bucket"  a host earns host_rate tokens per second, up to host_burst, and
+                        each page costs one; hosts are served in the order they have a
+                        token, so a host that was just served waits behind the others
+                        (the crawl delay still paces the requests themselves)
+
+    HOW?
+    - append and popleft cost O(log n) for the host's heap plus O(log h) for the heap of
+      hosts, keyed by their turn (round-robin) or the time they have a token
+    - A new in-link pushes another entry with the higher priority; the old entry no
+      longer matches self.priority and is skipped when it reaches the top
+    """
+
+    def __init__(self, policy="bfs", host_selection="round-robin", pattern_weights=None,
+                 host_rate=1.0, host_burst=1.0, clock=time.monotonic):
+        if policy not in SCHEDULER_POLICIES:
+            raise ValueError("Unknown scheduler policy: " + str(policy))
+        if host_selection not in HOST_SELECTIONS:
+            raise ValueError("Unknown host selection: " + str(host_selection))
+
+        self.policy = policy
+        self.host_selection = host_selection
+        self.patterns = [(re.compile(pattern), float(weight)) for pattern, weight in (pattern_weights or {}).items()]
+        self.host_rate = float(host_rate)
+        self.host_burst = float(host_burst)
+        self.clock = clock
+
+        self.queues = {}    # Host -> heap of (priority, order, url); only hosts with queued URLs
+        self.priority = {}  # Queued URL -> its current priority (lower comes first)
+        self.hosts = []     # Heap of (turn or time of the next token, order, host), one entry per host in self.queues
+        self.buckets = {}   # Host -> (tokens, time they were counted)
+        self.order = itertools.count()
+        self.current_depth = -1  # Depth of the page popped last: its links are one deeper
+
+    def url_priority(self, url):
+        if self.policy == "depth":
+            return self.current_depth + 1
+        if self.policy == "inlinks":
+            return -1  # The link it was found by
+        if self.policy == "pattern":
+            return -max((weight for pattern, weight in self.patterns if pattern.search(url)), default=0.0)
+        return 0
+
+    def append(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        priority = self.priority[url] = self.url_priority(url)
+
+        if host not in self.queues:
+            self.queues[host] = []
+            self.schedule_host(host)
+        heapq.heappush(self.queues[host], (priority, next(self.order), url))
+
+    def link_found(self, url):
+        """Another link to a URL queued before: with the "inlinks" policy, it moves up"""
+        if self.policy == "inlinks" and url in self.priority:
+            priority = self.priority[url] = self.priority[url] - 1
+            heapq.heappush(self.queues[urllib.parse.urlsplit(url).netloc], (priority, next(self.order), url))
+
+    def popleft(self):
+        if not self.hosts:
+            raise IndexError("pop from an empty frontier")
+
+        host = heapq.heappop(self.hosts)[2]
+        queue = self.queues[host]
+        self.drop_outdated(queue)
+        priority, _, url = heapq.heappop(queue)
+        del self.priority[url]
+
+        if self.policy == "depth":
+            self.current_depth = priority
+
+        if self.host_selection == "token-bucket":
+            tokens, counted = self.bucket(host)
+            self.buckets[host] = (tokens - 1, counted)
+
+        self.drop_outdated(queue)
+        if queue:
+            self.schedule_host(host)
+        else:
+            del self.queues[host]
+
+        return url
+
+    def drop_outdated(self, queue):
+        """Pop entries left behind by link_found until the top entry is current"""
+        while queue and self.priority.get(queue[0][2]) != queue[0][0]:
+            heapq.heappop(queue)
+
+    def bucket(self, host):
+        """Tokens of the host now (refilled since they were last counted) and the current time"""
+        now = self.clock()
+        tokens, counted = self.buckets.get(host, (self.host_burst, now))
+        return min(self.host_burst, tokens + (now - counted) * self.host_rate), now
+
+    def schedule_host(self, host):
+        if self.host_selection == "token-bucket":
+            tokens, now = self.bucket(host)
+            self.buckets[host] = (tokens, now)
+            key = now if tokens >= 1 else now + (1 - tokens) / self.host_rate
+        else:
+            key = 0  # Same key for all hosts: the order counter makes them take turns
+
+        heapq.heappush(self.hosts, (key, next(self.order), host))
+
+    def __iter__(self):
+        """
+        The queued URLs in about the order popleft will return them (exact for one host):
+        the hosts in their current order take turns, each walking its heap in priority order
+        Used to pick the URLs to fetch ahead, so it must not change the queues
+        Lazy: the first n URLs only walk the first hosts of the heap of hosts, so taking
+        a prefetch window of n URLs costs O(n log h), not a sort of every host
+        """
+        walks = collections.deque()  # Hosts that had their first turn, in turn order
+
+        for _, _, host in self.sorted_entries(self.hosts):
+            walk = self.walk(self.queues[host])
+            url = next(walk, None)
+            if url is not None:
+                yield url
+                walks.append(walk)
+
+        while walks:
+            walk = walks.popleft()
+            url = next(walk, None)
+            if url is not None:
+                yield url
+                walks.append(walk)
+
+    def walk(self, queue):
+        """Current URLs of a host's heap in priority order (entries left behind by link_found are skipped)"""
+        for priority, _, url in self.sorted_entries(queue):
+            if self.priority.get(url) == priority:
+                yield url
+
+    @staticmethod
+    def sorted_entries(heap):
+        """Entries of a heap in sorted order, lazily: children of a popped entry become candidates"""
+        candidates = [(heap[0], 0)] if heap else []
+
+        while candidates:
+            entry, i = heapq.heappop(candidates)
+            yield entry
+
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(candidates, (heap[child], child))
+
+    def __len__(self):
+        return len(self.priority)
@@ -0,0 +1,173 @@
+"""
+Versioned binary index file that can be memory-mapped
+
+FILE LAYOUT:
+    header         magic bytes, format version, number of sections
+    section table  one entry per section: name, NumPy dtype, byte offset, item count
+    sections       raw little-endian arrays, each starting on a 64-byte boundary
+
+Opening a file only reads the header and section table; every section becomes a
+NumPy view on an mmap of the file, so pages are read from disk the first time they
+are touched and processes that open the same file share them through the OS page cache.
+
+Lists of strings (terms, titles, URLs, ...) are stored as a StringTable:
+one UTF-8 blob plus an array with the start offset of every string.
+
+Convert an index exported by older versions (pickle) with:
+    python IndexFile.py Output/exported_index.obj Output/exported_index.idx
+"""
+import bisect                  # Binary search in sorted string tables
+import json                    # Small metadata section (seed URL, stop words, ...)
+import mmap                    # Map the file into memory instead of reading it
+import os                      # Replace the old file in one step
+import struct                  # Fixed-size binary header and section table
+import sys                     # Command-line arguments of the converter
+import numpy as np             # Zero-copy array views on the mapped file
+
+MAGIC = b"WCINDEX\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sII")       # magic, version, number of sections
+SECTION = struct.Struct("<32s8sQQ")   # name, dtype, byte offset, item count
+ALIGNMENT = 64
+
+
+class StringTable:
+    """Read-only list of strings backed by an offsets array and a UTF-8 blob"""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @staticmethod
+    def encode(strings):
+        blobs = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+        return offsets, np.frombuffer(b"".join(blobs), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class PostingsTable:
+    """
+    Read-only {string: list of document numbers} stored as a sorted StringTable of keys
+    plus CSR-style arrays; behaves like dict.get for lookups
+    """
+
+    def __init__(self, keys, indptr, values):
+        self.keys = keys
+        self.indptr = indptr
+        self.values = values
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __getitem__(self, key):
+        values = self.get(key)
+        if values is None:
+            raise KeyError(key)
+        return values
+
+    def get(self, key, default=None):
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[self.indptr[i]:self.indptr[i + 1]].tolist()
+        return default
+
+
+def write_index(filename, meta, arrays, string_tables):
+    """
+    Write metadata, named NumPy arrays and named lists of strings as one index file
+
+    The file is written under a temporary name and then renamed over the old one, so
+    processes that have the old file mapped (a running SearchServer) keep reading it
+    intact, and nobody ever opens a half-written index
+    """
+    sections = [("meta", np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8))]
+    sections += [(name, np.ascontiguousarray(array)) for name, array in arrays.items()]
+
+    for name, strings in string_tables.items():
+        offsets, data = StringTable.encode(strings)
+        sections += [(name + ".offsets", offsets), (name + ".data", data)]
+
+    # Lay out the sections after the header and table, each aligned for fast access
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, array in sections:
+        offset += -offset % ALIGNMENT
+        table.append((name, array, offset))
+        offset += array.nbytes
+
+    with open(filename + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+        for name, array, offset in table:
+            f.write(SECTION.pack(name.encode("ascii"), array.dtype.newbyteorder("<").str.encode("ascii"), offset, array.size))
+
+        for name, array, offset in table:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes())
+
+    os.replace(filename + ".tmp", filename)
+
+
+def is_index_file(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class IndexReader:
+    """Memory-mapped view of an index file; arrays are paged in lazily when used"""
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(filename + " is not an index file")
+        if version != FORMAT_VERSION:
+            raise ValueError("Unsupported index format version {} (expected {})".format(version, FORMAT_VERSION))
+
+        self.sections = {}
+        for i in range(count):
+            name, dtype, offset, size = SECTION.unpack_from(self.mm, HEADER.size + i * SECTION.size)
+            self.sections[name.rstrip(b"\0").decode("ascii")] = (np.dtype(dtype.rstrip(b"\0").decode("ascii")), offset, size)
+
+        self.meta = json.loads(self.array("meta").tobytes().decode("utf-8"))
+
+    def array(self, name):
+        dtype, offset, size = self.sections[name]
+        return np.frombuffer(self.mm, dtype=dtype, count=size, offset=offset)
+
+    def strings(self, name):
+        return StringTable(self.array(name + ".offsets"), self.array(name + ".data"))
+
+
+def convert_pickle_index(pickle_filename, filename):
+    """Rewrite an index exported with pickle by older versions in the binary format"""
+    from SearchEngine import SearchEngine
+
+    search_engine = SearchEngine("")
+    search_engine.load_index(pickle_filename)
+    search_engine.save_index(filename)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python IndexFile.py OLD_PICKLE_INDEX NEW_INDEX")
+        sys.exit(1)
+
+    convert_pickle_index(sys.argv[1], sys.argv[2])
+    print("Converted " + sys.argv[1] + " -> " + sys.argv[2])
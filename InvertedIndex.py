@@ -0,0 +1,137 @@
+from collections import Counter  # Count how often each term occurs in one document
+import bisect                    # Term lookup in a sorted vocabulary loaded from disk
+import numpy as np               # Compact numeric arrays for the postings
+import scipy.sparse              # CSR sparse matrix: the postings of all terms in three flat arrays
+
+
+class InvertedIndex:
+    """
+    Sparse term-document index: term -> postings list of (document number, term frequency)
+
+    WHY NOT A MATRIX?
+    - A dense terms x documents matrix stores a cell for every pair, but a page only
+      contains a tiny fraction of the vocabulary, so almost every cell is 0
+    - Postings only store the non-zero cells, so memory grows with the amount of text
+      crawled instead of vocabulary x corpus size
+    - A query only needs the postings of its own terms, never the whole collection
+
+    The postings are stored as a CSR (compressed sparse row) matrix `counts` with one row
+    per term: row t lists the documents containing term t and how often it occurs.
+    Documents are numbered 0..N-1 in crawl order (the order of doc_ids)
+    """
+
+    def __init__(self, doc_ids, doc_terms):
+        """doc_terms yields, for each document in doc_ids, the list of its stemmed terms"""
+        self.doc_ids = list(doc_ids)
+
+        # Single pass over the corpus: count the terms of each document once
+        doc_counts = [Counter(terms) for terms in doc_terms]
+
+        self.terms = sorted(set(term for counts in doc_counts for term in counts))
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+
+        rows, cols, data = [], [], []
+        for doc, counts in enumerate(doc_counts):
+            for term, tf in counts.items():
+                rows.append(self.term_ids[term])
+                cols.append(doc)
+                data.append(tf)
+
+        self.counts = scipy.sparse.csr_matrix((np.array(data, dtype=np.int32), (rows, cols)),
+                                              shape=(len(self.terms), len(self.doc_ids)))
+        self.counts.sort_indices()
+
+        # Total occurrences of each term, kept up to date by apply_delta
+        self.totals = np.asarray(self.counts.sum(axis=1), dtype=np.int64).ravel()
+
+    @classmethod
+    def from_arrays(cls, doc_ids, terms, counts, totals):
+        """Wrap existing postings (e.g. memory-mapped from an index file) without rebuilding them"""
+        index = cls.__new__(cls)
+        index.doc_ids = doc_ids
+        index.terms = terms
+        index.term_ids = None  # Looked up by binary search in the sorted terms instead
+        index.counts = counts
+        index.totals = totals
+        return index
+
+    def apply_delta(self, deleted_docs, added_doc_ids, added_doc_terms):
+        """
+        Update the index for changed documents without rebuilding it from the whole corpus
+
+        - deleted_docs: document numbers to remove (their postings are dropped)
+        - added_doc_ids / added_doc_terms: new documents, appended after the remaining ones
+
+        Only the added documents are counted; term totals are adjusted by the removed
+        and added counts, new terms are merged into the sorted vocabulary and terms
+        that no longer occur anywhere are dropped
+        """
+        keep = np.ones(self.num_docs, dtype=bool)
+        keep[list(deleted_docs)] = False
+
+        removed_totals = np.asarray(self.counts[:, ~keep].sum(axis=1), dtype=np.int64).ravel()
+        kept = self.counts[:, keep].tocoo()
+
+        added_counts = [Counter(terms) for terms in added_doc_terms]
+        new_terms = sorted(set(term for counts in added_counts for term in counts if self.term_id(term) is None))
+
+        # Merge the new terms into the sorted vocabulary and find where every old term moved
+        terms = sorted(list(self.terms) + new_terms) if new_terms else list(self.terms)
+        term_ids = {term: i for i, term in enumerate(terms)}
+        old_to_new = np.array([term_ids[term] for term in self.terms], dtype=np.int64)
+
+        totals = np.zeros(len(terms), dtype=np.int64)
+        totals[old_to_new] = self.totals - removed_totals
+
+        rows, cols, data = [old_to_new[kept.row]], [kept.col], [kept.data]
+        for doc, counts in enumerate(added_counts, start=kept.shape[1]):
+            term_rows = np.array([term_ids[term] for term in counts], dtype=np.int64)
+            tfs = np.array(list(counts.values()), dtype=np.int32)
+            rows.append(term_rows)
+            cols.append(np.full(len(counts), doc))
+            data.append(tfs)
+            totals[term_rows] += tfs
+
+        counts = scipy.sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                         shape=(len(terms), kept.shape[1] + len(added_counts)))
+
+        # Drop terms whose every occurrence was in a deleted document
+        live = totals > 0
+        self.counts = counts[live]
+        self.counts.sort_indices()
+        self.totals = totals[live]
+        self.terms = [term for term, is_live in zip(terms, live) if is_live]
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.doc_ids = [doc_id for doc_id, kept_doc in zip(self.doc_ids, keep) if kept_doc] + list(added_doc_ids)
+
+    @property
+    def num_docs(self):
+        return len(self.doc_ids)
+
+    def term_id(self, term):
+        """Row number of a term, or None if it is not in the vocabulary"""
+        if self.term_ids is not None:
+            return self.term_ids.get(term)
+
+        i = bisect.bisect_left(self.terms, term)
+        return i if i < len(self.terms) and self.terms[i] == term else None
+
+    def postings(self, term_id):
+        """Postings of a term as two arrays: document numbers and term frequencies"""
+        start, end = self.counts.indptr[term_id], self.counts.indptr[term_id + 1]
+        return self.counts.indices[start:end], self.counts.data[start:end]
+
+    def term_frequencies(self):
+        """Total number of occurrences of every term across all documents"""
+        return self.totals
+
+    def document_frequencies(self):
+        """Number of documents containing each term"""
+        return np.diff(self.counts.indptr)
+
+    def dense_row(self, term_id):
+        """One row of the classic term-document matrix (used for CSV export)"""
+        row = np.zeros(self.num_docs, dtype=np.int32)
+        docs, tfs = self.postings(term_id)
+        row[docs] = tfs
+        return row.tolist()
@@ -0,0 +1,188 @@
+"""
+Counters, gauges and histograms for the crawl and search pipeline, with Prometheus/JSON export
+
+WHY?
+- Progress lines don't tell where a slow crawl spends its time: the network, lxml,
+  tokenizing or stemming. Metrics record how long every stage takes and how much work it did
+- Switched off (WebCrawler.metrics is None) every instrumented spot costs one attribute test
+
+WHAT IS RECORDED (see WebCrawler / SearchEngine):
+    fetch_seconds              histogram  HTTP request latency, per page
+    bytes_downloaded_total     counter    response bodies
+    fetch_errors_total         counter    pages that could not be fetched
+    parse_seconds{step}        histogram  step="html" (lxml parse) and "tokenize", per page
+    tokens_total               counter    words kept by the tokenizer
+    pages_crawled_total        counter    pages visited (pages_indexed_total: of them indexable)
+    frontier_size              gauge      URLs waiting to be crawled
+    stage_seconds_total{stage} counter    wall time of crawl, index build, stemming, clustering
+    query_seconds              histogram  process_query latency
+    queries_total              counter    searches (queries_expanded_total: of them expanded)
+
+Hooks are called with (kind, name, value, labels) on every update, e.g. to stream
+metrics somewhere else while crawling:
+
+    metrics = Metrics()
+    metrics.add_hook(lambda kind, name, value, labels: print(name, labels, value))
+"""
+import bisect                  # Find the histogram bucket of an observation
+import contextlib              # Stage timers as "with" blocks
+import json                    # JSON exporter
+import threading               # Pages are fetched from several threads at once
+import time                    # Stage and request timing
+
+# Upper bounds of the histogram buckets, in seconds (like the Prometheus client defaults)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Number of observations per bucket, plus their count and sum"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) per bucket, as Prometheus reports them"""
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+    def __init__(self, prefix="webcrawler"):
+        self.prefix = prefix
+        self.counters = {}    # (name, labels) -> value; labels is a sorted tuple of (key, value)
+        self.gauges = {}
+        self.histograms = {}
+        self.hooks = []
+        self.lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """hook(kind, name, value, labels) is called on every update ("counter", "gauge" or "histogram")"""
+        self.hooks.append(hook)
+
+    def notify(self, kind, name, value, labels):
+        for hook in self.hooks:
+            hook(kind, name, value, dict(labels))
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+        self.notify("counter", name, amount, key[1])
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+        self.notify("gauge", name, value, key[1])
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+        self.notify("histogram", name, value, key[1])
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Add the wall time of the block to stage_seconds_total{stage=...}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.increment("stage_seconds_total", time.perf_counter() - start, stage=stage)
+
+    def value(self, name, **labels):
+        """Current value of a counter or gauge (0 if it was never set)"""
+        key = (name, tuple(sorted(labels.items())))
+        return self.counters.get(key, self.gauges.get(key, 0))
+
+    def histogram(self, name, **labels):
+        return self.histograms.get((name, tuple(sorted(labels.items()))))
+
+    def derived(self):
+        """Rates computed from the raw metrics"""
+        tokenize = self.histogram("parse_seconds", step="tokenize")
+        fetch = self.histogram("fetch_seconds")
+        queries = self.value("queries_total")
+
+        return {"tokens_per_second": self.value("tokens_total") / tokenize.sum if tokenize and tokenize.sum else None,
+                "mean_fetch_seconds": fetch.sum / fetch.count if fetch else None,
+                "expansion_rate": self.value("queries_expanded_total") / queries if queries else None}
+
+    def to_json(self):
+        def series(metrics, export):
+            result = {}
+            for (name, labels), metric in sorted(metrics.items()):
+                result.setdefault(name, []).append(dict({"labels": dict(labels)}, **export(metric)))
+            return result
+
+        with self.lock:
+            return {"counters": series(self.counters, lambda value: {"value": value}),
+                    "gauges": series(self.gauges, lambda value: {"value": value}),
+                    "histograms": series(self.histograms, lambda h: {
+                        "count": h.count, "sum": h.sum,
+                        "buckets": {("+Inf" if bound == float("inf") else str(bound)): count for bound, count in h.cumulative()}}),
+                    "derived": self.derived()}
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+                declared = set()
+                for (name, labels), value in sorted(metrics.items()):
+                    full_name = self.prefix + "_" + name
+                    if full_name not in declared:
+                        lines.append("# TYPE {} {}".format(full_name, kind))
+                        declared.add(full_name)
+                    lines.append("{}{} {}".format(full_name, label_text(labels), value))
+
+            declared = set()
+            for (name, labels), h in sorted(self.histograms.items()):
+                full_name = self.prefix + "_" + name
+                if full_name not in declared:
+                    lines.append("# TYPE {} histogram".format(full_name))
+                    declared.add(full_name)
+                for bound, count in h.cumulative():
+                    le = "+Inf" if bound == float("inf") else str(bound)
+                    lines.append("{}_bucket{} {}".format(full_name, label_text(labels, [("le", le)]), count))
+                lines.append("{}_sum{} {}".format(full_name, label_text(labels), h.sum))
+                lines.append("{}_count{} {}".format(full_name, label_text(labels), h.count))
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, filename):
+        """Export to a file: JSON if the name ends in .json, else Prometheus text format"""
+        with open(filename, "w") as f:
+            if filename.endswith(".json"):
+                json.dump(self.to_json(), f, indent=2)
+                f.write("\n")
+            else:
+                f.write(self.to_prometheus())
+
+    def __str__(self):
+        """Short human-readable summary of where the time went"""
+        stages = ", ".join("{} {:.2f}s".format(dict(labels)["stage"], seconds)
+                           for (name, labels), seconds in self.counters.items() if name == "stage_seconds_total")
+        derived = self.derived()
+        return "Metrics: {}; {:.0f} tokens/s, mean fetch {}, {} queries ({} expanded)".format(
+            stages or "no stages timed", derived["tokens_per_second"] or 0,
+            "{:.1f} ms".format(derived["mean_fetch_seconds"] * 1000) if derived["mean_fetch_seconds"] is not None else "-",
+            self.value("queries_total"), self.value("queries_expanded_total"))
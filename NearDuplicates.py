@@ -0,0 +1,101 @@
+import zlib                    # Fast deterministic 32-bit hash of word shingles (CRC-32)
+import numpy as np             # Vectorized min-hashing over all shingles at once
+
+
+PRIME = 4294967311  # Smallest prime above 2^32: the hash permutations are (a*x + b) mod PRIME
+SEED = 1            # Fixed permutations, so the same pages are always found similar
+
+
+class NearDuplicateDetector:
+    """
+    Finds documents that are almost the same as one seen before (MinHash + LSH)
+
+    WHY?
+    - The SHA-256 duplicate check only catches byte-identical pages; pages that differ by a
+      timestamp, a session token or a visitor counter all get indexed again
+    - Similarity here is the Jaccard similarity of the sets of 3-word shingles:
+      |A ∩ B| / |A ∪ B|; one changed word only changes 3 shingles
+
+    HOW?
+    - MinHash: a signature of `num_perm` numbers per document; the chance that two
+      signatures agree in a position equals the Jaccard similarity of the documents
+    - LSH (locality-sensitive hashing): the signature is cut into bands, and each band is
+      a key in a hash table. Similar documents share at least one band with high probability,
+      so a lookup only compares against the few documents in the same buckets instead of
+      against every document seen so far
+    """
+
+    def __init__(self, threshold=0.9, num_perm=128, shingle_size=3):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.rows = self.band_rows(threshold, num_perm)
+
+        rng = np.random.default_rng(SEED)
+        self.a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+
+        self.clear()
+
+    @staticmethod
+    def band_rows(threshold, num_perm):
+        """
+        Rows per LSH band: documents become candidates around similarity (1/bands)^(1/rows).
+        Take the most selective banding whose candidate threshold stays 0.1 below the
+        requested one, so that pages just above the threshold are almost never missed
+        """
+        rows = 1
+        for r in range(1, num_perm + 1):
+            if num_perm % r == 0 and (r / num_perm) ** (1 / r) <= threshold - 0.1:
+                rows = r
+        return rows
+
+    def clear(self):
+        self.signatures = {}  # doc_id -> MinHash signature
+        self.buckets = {}     # (band number, band of the signature) -> doc_ids
+
+    def signature(self, words):
+        """MinHash signature of a document's word shingles, or None if it has no words"""
+        n = min(self.shingle_size, len(words))
+        if n == 0:
+            return None
+
+        shingles = set(" ".join(words[i:i + n]).encode("utf-8") for i in range(len(words) - n + 1))
+        hashes = np.fromiter((zlib.crc32(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+        # One row per permutation; a and x are below 2^32, so nothing overflows 64 bits
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % PRIME).min(axis=1)
+
+    def bands(self, signature):
+        for band, start in enumerate(range(0, self.num_perm, self.rows)):
+            yield band, signature[start:start + self.rows].tobytes()
+
+    def find(self, doc_id, words):
+        """
+        Return (doc_id of the most similar earlier document, estimated similarity) if it is
+        at least `threshold` similar; otherwise remember this document and return None
+        """
+        signature = self.signature(words)
+        if signature is None:
+            return None
+
+        best, best_similarity = None, 0.0
+        checked = set()
+        for key in self.bands(signature):
+            for candidate in self.buckets.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+
+                similarity = float(np.mean(self.signatures[candidate] == signature))
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+
+        if best is not None and best_similarity >= self.threshold:
+            return best, best_similarity
+
+        self.signatures[doc_id] = signature
+        for key in self.bands(signature):
+            self.buckets.setdefault(key, []).append(doc_id)
+
+        return None
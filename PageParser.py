@@ -0,0 +1,184 @@
+from bs4 import BeautifulSoup  # HTML parser to extract text and links from web pages
+import re                      # Regular expressions for word validation and meta charset detection
+import urllib.parse            # URL manipulation - converts relative URLs to absolute URLs
+import hashlib                 # SHA-256 hashing for duplicate content detection
+import string                  # Punctuation constants for text cleaning
+import codecs                  # Look up the codec named by a charset declaration
+import time                    # Parse and tokenize timings
+import asyncio                 # Hand parse jobs to the worker processes without blocking the crawl loop
+from concurrent.futures import ProcessPoolExecutor  # Parser worker processes, one per CPU core
+
+
+# Compiled once at import instead of on every call
+WORD_PATTERN = re.compile(r'^[a-zA-z](\S*)[a-zA-z0-9]$')
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)  # Deletes punctuation in one C-level pass
+
+CHARSET_SNIFF_BYTES = 2048  # HTML5 requires the <meta charset> declaration within the first 1024 bytes
+DEFAULT_CHARSET = "utf-8"
+
+
+def decode_page(body, charset=None):
+    """
+    Bytes -> text using the page's declared encoding
+
+    Order of precedence (as in browsers): the charset of the HTTP Content-Type header,
+    then a <meta charset> / <meta http-equiv> declaration near the top of the page,
+    then UTF-8. Undecodable bytes become U+FFFD instead of failing the page.
+    """
+    if charset is None:
+        match = META_CHARSET_PATTERN.search(body, 0, CHARSET_SNIFF_BYTES)
+        if match is not None:
+            charset = match.group(1).decode("ascii")
+
+    try:
+        codecs.lookup(charset or DEFAULT_CHARSET)
+    except LookupError:
+        charset = None  # Unknown encoding name - fall back to the default
+
+    return body.decode(charset or DEFAULT_CHARSET, errors="replace")
+
+
+def tokenize(chunks):
+    """
+    Yield the whitespace-separated tokens of a text given as a sequence of pieces
+
+    Pieces are the text nodes of the page: a word can continue from one node into the
+    next (e.g. "<b>web</b>site"), so the unfinished last token of a piece is carried over.
+    Only one text node is held at a time - the whole page text is never built.
+    """
+    pending = ""
+
+    for chunk in chunks:
+        text = pending + chunk if pending else chunk
+        if not text:
+            continue
+
+        words = text.split()
+        pending = words.pop() if words and not text[-1].isspace() else ""
+        yield from words
+
+    if pending:
+        yield pending
+
+
+class PageParser:
+    """
+    Turns a fetched page into the data the crawler records:
+    title, SHA-256 content hash, filtered words (None if not indexable) and links
+
+    Parsing only depends on the page and the stop words, never on the crawl state,
+    so it can run in another process (see ParserPool) with identical results
+    """
+
+    def __init__(self, stop_words):
+        self.stop_words = frozenset(stop_words)
+        self.timings = None  # (HTML parse seconds, tokenize seconds) of the last page parsed
+
+    @staticmethod
+    def word_is_valid(word):
+        """
+        A valid word starts with a letter and ends with letter/digit
+        This filters out garbage tokens like punctuation-only strings
+        """
+        return bool(WORD_PATTERN.match(word))
+
+    @staticmethod
+    def content_hash(current_content):
+        """SHA-256 of the page exactly as it was downloaded (bytes)"""
+        return hashlib.sha256(current_content).hexdigest()
+
+    def words(self, text_chunks):
+        """Lowercase, punctuation-free tokens that are neither stop words nor garbage, one at a time"""
+        # Lowercasing and deleting punctuation never adds or removes whitespace, so it can
+        # be done per text node before tokenizing - one call per node instead of per word
+        stop_words = self.stop_words
+        match = WORD_PATTERN.match
+
+        for word in tokenize(chunk.lower().translate(PUNCTUATION_TABLE) for chunk in text_chunks):
+            if word not in stop_words and match(word):
+                yield word
+
+    def parse(self, current_page, current_content, charset=None):
+        """current_content is the raw response body; charset comes from the Content-Type header, if any"""
+        pwd = "/".join(current_page.split("/")[:-1]) + "/"
+
+        start = time.perf_counter()
+
+        # BeautifulSoup parses raw HTML into navigable DOM tree
+        soup = BeautifulSoup(decode_page(current_content, charset), "lxml")
+        parsed = tokenized = time.perf_counter()
+
+        current_title = str(soup.title.string) if soup.title is not None else current_page.replace(pwd, '')
+
+        # SHA-256 creates unique fingerprint of page content for duplicate detection
+        current_doc_id = self.content_hash(current_content)
+
+        words = None
+        links = []
+
+        # Only index text-based documents, not binaries like PDFs or images
+        if any((current_page.lower().endswith(ext) for ext in ["/", ".html", ".htm", ".php", ".txt"])):
+
+            [s.extract() for s in soup('title')]
+
+            # Tokenize the text nodes one by one: lowercase, strip punctuation, and drop
+            # stopwords and invalid tokens to keep only meaningful terms
+            words = list(self.words(soup.strings))
+            tokenized = time.perf_counter()
+
+            # Extract all hyperlinks from the page to expand our crawl frontier
+            for link in soup.find_all('a'):
+                current_url = link.get('href')
+
+                if current_url is not None:
+                    # Convert relative URLs (like /page.html) to absolute URLs
+                    if pwd not in current_url:
+                        current_url = urllib.parse.urljoin(pwd, current_url)
+
+                    links.append(current_url)
+
+        self.timings = (parsed - start, tokenized - parsed)
+
+        return {"title": current_title, "doc_id": current_doc_id, "words": words, "links": links}
+
+
+worker_parser = None  # The PageParser of a worker process, created once by init_worker
+
+
+def init_worker(stop_words):
+    global worker_parser
+    worker_parser = PageParser(stop_words)
+
+
+def parse_in_worker(current_page, current_content, charset):
+    page = worker_parser.parse(current_page, current_content, charset)
+    return page, worker_parser.timings
+
+
+class ParserPool:
+    """
+    Parser worker processes used by WebCrawler.crawl_async
+
+    WHY PROCESSES?
+    - HTML parsing and tokenizing is CPU-bound pure Python; in the crawl thread it runs
+      between fetches and only ever uses one core (threads would share the GIL)
+    - Each worker process parses whole pages on its own core while the crawl loop keeps
+      fetching; the stop words are sent once when a worker starts, not with every page
+
+    Pages are handed over as soon as they are downloaded but their results are still
+    consumed in frontier order, so the crawl is deterministic. The crawl only prefetches
+    a bounded window of pages, which also bounds how many bodies wait here (back-pressure).
+    """
+
+    def __init__(self, workers, stop_words):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                            initargs=(list(stop_words),))
+
+    async def parse(self, current_page, current_content, charset=None):
+        """Returns (page, (HTML parse seconds, tokenize seconds)) - timings as measured in the worker"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, parse_in_worker, current_page, current_content, charset)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
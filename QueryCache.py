@@ -0,0 +1,72 @@
+import collections             # OrderedDict: least recently used entry first
+import time                    # Entry expiry (TTL)
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of search results
+
+    Search traffic is very repetitive, and a cached answer skips scoring, sorting and a
+    possible thesaurus expansion. The key (built by SearchEngine.query_key) is the
+    normalized query - its sorted stemmed terms and k - so "mystery book" and
+    "book mystery" share one entry.
+
+    - At most `max_size` entries; when full, the least recently used one is dropped
+    - With a `ttl`, entries expire that many seconds after they were stored
+    - Every entry belongs to one version of the index: when the index changes (built,
+      loaded or updated) the version changes and the whole cache is invalidated
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()  # key -> (expiry time or None, value)
+        self.version = None  # Index version the entries were computed for
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """The cached value for key, or None"""
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] is not None and entry[0] < time.monotonic():
+            del self.entries[key]  # Expired
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, version, value):
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+        self.entries[key] = (time.monotonic() + self.ttl if self.ttl is not None else None, value)
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return "Query cache: {} hits, {} misses ({:.1%} hit rate), {} queries cached, {} evicted".format(
+            self.hits, self.misses, self.hit_rate(), len(self.entries), self.evictions)
@@ -0,0 +1,225 @@
+"""
+robots.txt (RFC 9309, Robots Exclusion Protocol) parsing, matching and caching
+
+WHAT IS ROBOTS.TXT?
+- A text file placed at the root of a host (e.g., https://google.com/robots.txt)
+- Website owners use it to tell crawlers which pages they can/cannot access
+- It's a voluntary protocol - crawlers choose to respect it (ethical crawling)
+
+Example robots.txt:
+    User-agent: *
+    Disallow: /admin/
+    Allow: /admin/public/
+    Disallow: /*.pdf$
+    Crawl-delay: 2
+
+RULES (RFC 9309):
+- Rules are grouped under one or more User-agent lines; a crawler obeys the group(s)
+  naming its product token, or the "*" group if none does
+- A rule matches a URL path by prefix; "*" matches any characters and "$" anchors the end
+- The longest matching rule wins; if an Allow and a Disallow rule are equally long, Allow wins
+- No matching rule means the URL is allowed; /robots.txt itself is always allowed
+"""
+import re                      # Wildcard rules are compiled into one regular expression
+import time                    # Expiry of cached robots.txt files
+import urllib.request          # Download robots.txt
+import urllib.parse            # Split URLs into host and path, percent-encoding normalization
+import http.client             # Connection dropped while reading robots.txt
+from UrlCanonicalizer import normalize_escapes  # Same %xx normalization as canonical URLs
+
+USER_AGENT = "WebCrawler"  # Product token matched against User-agent lines (and sent with requests)
+
+ROBOTS_TTL = 24 * 3600  # Seconds a robots.txt is cached - RFC 9309 asks not to use it longer than 24 hours
+
+MAX_ROBOTS_SIZE = 500 * 1024  # RFC 9309: parse at least the first 500 KiB
+
+# Characters left as they are when normalizing percent-encoding (everything else is %-encoded)
+SAFE_CHARACTERS = "/?=&;:@!$'()*+,-._~%"
+
+
+def normalize_path(path):
+    """
+    Percent-encode non-ASCII characters, decode escaped unreserved characters (%7E -> ~) and
+    upper-case the other %xx escapes, so rules and URLs compare equal (RFC 9309, section 2.2.2)
+    """
+    return normalize_escapes(urllib.parse.quote(path, safe=SAFE_CHARACTERS))
+
+
+class RobotsRules:
+    """
+    The Allow/Disallow rules for one host, compiled for fast matching
+
+    - Plain prefix rules go into a character trie: walking the URL path down the trie
+      finds the longest matching rule in O(length of the path), however many rules there are
+    - Rules ending in "$" without "*" must match the whole path: one dictionary lookup
+    - Wildcard rules (rare) are combined into a single regular expression whose
+      alternatives are ordered longest first, so the first alternative that matches is
+      the longest matching wildcard rule
+    """
+
+    def __init__(self, allowed=(), disallowed=(), crawl_delay=None):
+        self.allowed_patterns = list(allowed)
+        self.disallowed_patterns = list(disallowed)
+        self.crawl_delay = crawl_delay
+
+        self.trie = {}    # Nested dicts by character; key None holds (rule length, is allow) of a rule ending there
+        self.exact = {}   # Path -> (rule length, is allow) for "$"-anchored rules
+        wildcard = []
+
+        # Disallow first, so an identical Allow rule overwrites it (Allow wins ties)
+        rules = [(normalize_path(p), False) for p in self.disallowed_patterns] + \
+                [(normalize_path(p), True) for p in self.allowed_patterns]
+
+        for pattern, allow in rules:
+            if "*" in pattern:
+                wildcard.append((pattern, allow))
+            elif pattern.endswith("$"):
+                self.exact[pattern[:-1]] = (len(pattern), allow)
+            else:
+                node = self.trie
+                for character in pattern:
+                    node = node.setdefault(character, {})
+                node[None] = (len(pattern), allow)
+
+        # Longest first; among equally long rules Allow comes first
+        wildcard.sort(key=lambda rule: (-len(rule[0]), not rule[1]))
+        self.wildcard_rules = [(len(pattern), allow) for pattern, allow in wildcard]
+        self.wildcard = re.compile("|".join(
+            "(" + ".*".join(re.escape(part) for part in pattern.rstrip("$").split("*")) +
+            (r"\Z" if pattern.endswith("$") else "") + ")"
+            for pattern, _ in wildcard)) if wildcard else None
+
+    @classmethod
+    def parse(cls, text, user_agent=USER_AGENT):
+        """Rules of the group(s) for our user agent, or of the "*" group if no group names it"""
+        groups = []  # [user agents, rules, crawl delay]
+        in_agent_lines = False
+
+        for line in text.splitlines():
+            line = line.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+
+            key, value = (part.strip() for part in line.split(":", 1))
+            key = key.lower()
+
+            if key == "user-agent":
+                # Consecutive User-agent lines share one group
+                if not in_agent_lines:
+                    groups.append([[], [], None])
+                groups[-1][0].append(value.split("/")[0].lower())
+                in_agent_lines = True
+                continue
+
+            in_agent_lines = False
+            if not groups:
+                continue  # Rules before any User-agent line belong to no group
+
+            if key in ("allow", "disallow") and value:
+                groups[-1][1].append((key, value))
+            elif key == "crawl-delay":
+                try:
+                    groups[-1][2] = float(value)
+                except ValueError:
+                    pass
+
+        token = user_agent.lower()
+        selected = [g for g in groups if token in g[0]] or [g for g in groups if "*" in g[0]]
+
+        rules = [rule for g in selected for rule in g[1]]
+        delays = [g[2] for g in selected if g[2] is not None]
+
+        return cls([value for key, value in rules if key == "allow"],
+                   [value for key, value in rules if key == "disallow"],
+                   max(delays) if delays else None)
+
+    @classmethod
+    def disallow_all(cls):
+        return cls(disallowed=["/"])
+
+    def longest_match(self, path):
+        """(rule length, is allow) of the longest rule matching the path, or None"""
+        best = self.exact.get(path)
+
+        node = self.trie
+        for character in path:
+            node = node.get(character)
+            if node is None:
+                break
+            if None in node and (best is None or node[None][0] >= best[0]):
+                best = node[None]
+
+        if self.wildcard is not None:
+            match = self.wildcard.match(path)
+            if match is not None:
+                rule = self.wildcard_rules[match.lastindex - 1]
+                if best is None or rule[0] > best[0] or (rule[0] == best[0] and rule[1]):
+                    best = rule
+
+        return best
+
+    def allowed(self, url):
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or "/"
+        if path == "/robots.txt":
+            return True
+
+        match = self.longest_match(normalize_path(path + ("?" + parts.query if parts.query else "")))
+        return match is None or match[1]
+
+    def __str__(self):
+        return "Disallowed{} Allowed{}".format(self.disallowed_patterns, self.allowed_patterns)
+
+
+class RobotsCache:
+    """
+    robots.txt rules of every host the crawler visits, downloaded once and kept for `ttl` seconds
+
+    How a failed download is treated (RFC 9309, section 2.3.1):
+    - 4xx (e.g. 404 Not Found): there are no rules, everything may be crawled
+    - 5xx or no connection: the host is treated as completely disallowed
+    """
+
+    def __init__(self, user_agent=USER_AGENT, ttl=ROBOTS_TTL, timeout=10):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.timeout = timeout
+        self.hosts = {}  # "scheme://host" -> (RobotsRules, expiry time)
+
+    def rules(self, url):
+        parts = urllib.parse.urlsplit(url)
+        root = parts.scheme + "://" + parts.netloc
+
+        cached = self.hosts.get(root)
+        if cached is None or cached[1] < time.monotonic():
+            cached = (self.fetch(root + "/robots.txt"), time.monotonic() + self.ttl)
+            self.hosts[root] = cached
+
+        return cached[0]
+
+    def allowed(self, url):
+        return self.rules(url).allowed(url)
+
+    def crawl_delay(self, url):
+        return self.rules(url).crawl_delay
+
+    def fetch(self, robots_url):
+        request = urllib.request.Request(robots_url, headers={"User-Agent": self.user_agent + "/1.0"})
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as handle:
+                return RobotsRules.parse(handle.read(MAX_ROBOTS_SIZE).decode("utf-8", errors="replace"), self.user_agent)
+
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                if e.code == 404:
+                    print("Note: No robots.txt found. Proceeding with no restrictions.")
+                else:
+                    print(f"Note: robots.txt unavailable (HTTP {e.code}). Proceeding with no restrictions.")
+                return RobotsRules()
+
+            print(f"Warning: Could not fetch {robots_url} (HTTP {e.code}). Treating the host as disallowed.")
+        except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+            print(f"Warning: Error reading {robots_url}: {e}. Treating the host as disallowed.")
+
+        return RobotsRules.disallow_all()
@@ -1,14 +1,29 @@
-from WebCrawler import WebCrawler                        # Parent class with crawling functionality
-import pickle                                            # Serialization - saves/loads index to/from disk
-import sys                                               # System utilities for max integer in clustering
+from WebCrawler import WebCrawler, CRAWL_STATE_FILE, CHECKPOINT_FILE  # Parent class with crawling functionality
+import pickle                                            # Reads indexes exported by older versions
+import sys                                               # System utilities for error reporting and flushing output
 import argparse                                          # Command-line argument parsing (-u, -p, -s, -t flags)
-import numpy as np                                       # Matrix operations for document clustering
-import random                                            # Random sampling to select cluster leaders
-from sklearn.metrics.pairwise import euclidean_distances # Distance calculation between document vectors
-from nltk.stem import PorterStemmer                      # Stemming for query processing (search -> search)
-import math                                              # Logarithms and square root for TF-IDF calculation
+import numpy as np                                       # Vectorized TF-IDF weights and query scoring
+import math                                              # Square root for vector lengths
+import time                                              # Query latency for the metrics
 import csv                                               # CSV parsing for thesaurus file
+import scipy.sparse                                      # Sparse document vectors for fast query scoring
+import heapq                                             # Bounded min-heap holding the current top k results
+import itertools                                         # Flatten the title postings when patching them
+import bisect                                            # Binary search to skip ahead in a postings list
 from textwrap import wrap                                # Text wrapping for displaying search result snippets
+import IndexFile                                         # Versioned, memory-mappable index file format
+from InvertedIndex import InvertedIndex                  # Postings wrapper for an index loaded from disk
+from DocumentStore import DocumentStore                  # Crawled words of older pickle exports are converted
+from Clustering import DocumentClusterer                 # Sparse, batched leader-follower / k-means clustering
+from QueryCache import QueryCache                        # LRU cache of search results
+from Frontier import SCHEDULER_POLICIES, HOST_SELECTIONS  # Choices of the --scheduler options
+
+
+INDEX_FILE = "Output/exported_index.idx"  # Default location of the exported index
+
+CLUSTER_METHODS = ["leader-follower", "kmeans"]  # Choices for cluster_docs (see Clustering.py)
+
+SCORE_EPSILON = 1e-9  # Rounding slack when comparing score upper bounds with the top-k threshold
 
 
 class SearchEngine(WebCrawler):
@@ -16,9 +31,42 @@ class SearchEngine(WebCrawler):
         super().__init__(seed_url)
         self.thesaurus = None
         self.thesaurus_file = None
+        self.synonym_weight = 1.0  # Weight of terms that only come from thesaurus synonyms (1.0: like query words)
+        self.synonyms = None  # Compiled thesaurus: word -> [(synonym, term id of its stem)], for index_version
+        self.synonyms_version = None
+        self.expansion_stats = {"queries": 0, "expanded": 0}
         self.clusters = None  # Leader-follower clustering: {leader_doc: [(follower, distance)]}
+        self.cluster_method = "leader-follower"  # Or "kmeans" (mini-batch k-means)
+        self.cluster_seed = None  # Seed for the clustering RNG; None picks different leaders every time
         self.N = None  # Total number of documents in collection
-        self.df = None  # Document frequency for each term (how many docs contain it)
+        self.df = None  # "df" of each term: its total occurrences in all documents (see compute_corpus_statistics)
+        self.idf = None  # Inverse document frequency of each term
+        self.doc_norms = None  # Length of each document's TF-IDF vector
+        self.doc_vectors = None  # Sparse terms x documents matrix of unit-length TF-IDF vectors
+        self.title_index = None  # Title word -> documents with that word in their title
+        self.link_graph = None  # LinkGraph: crawled links between the documents (CSR)
+        self.pagerank = None  # PageRank of every document number, scaled so the highest is 1 (None: no links known)
+        self.pagerank_weight = 0.0  # Share of PageRank in the score of a matching document (0: cosine only)
+        self.last_query_stats = None  # Documents scored/skipped by the last top-k search
+        self.result_titles = None  # Per document number: title, full URL and snippet shown in results
+        self.result_urls = None
+        self.result_snippets = None
+        self.index_version = 0  # Changes whenever the index does, invalidating cached results
+        self.query_cache = QueryCache()  # Results of recent queries (None: no caching)
+
+    def set_query_cache(self, max_size, ttl=None):
+        """Cache the results of up to max_size queries, for at most ttl seconds each (0 turns caching off)"""
+        self.query_cache = QueryCache(int(max_size), float(ttl) if ttl is not None else None) if int(max_size) > 0 else None
+
+    def set_synonym_weight(self, weight):
+        """Down-weight terms added by thesaurus expansion (0-1); 1.0 weighs them like the query's own words"""
+        self.synonym_weight = float(weight)
+        self.index_version += 1  # Expanded results change
+
+    def set_pagerank_weight(self, weight):
+        """Add weight * PageRank (scaled to 0-1) to the score of every document a query matches"""
+        self.pagerank_weight = float(weight)
+        self.index_version += 1  # Rankings change
 
     def set_thesaurus(self, thesaurus_file):
         """Load word synonyms from CSV file for query expansion when results are sparse"""
@@ -34,6 +82,7 @@ class SearchEngine(WebCrawler):
 
             self.thesaurus = thesaurus
             self.thesaurus_file = thesaurus_file
+            self.index_version += 1  # Expanded queries change
 
         except IOError as e:
             print("Error opening" + thesaurus_file + " error({0}): {1}".format(e.errno, e.strerror))
@@ -43,25 +92,101 @@ class SearchEngine(WebCrawler):
             print("Error opening" + thesaurus_file + "Unexpected error:", sys.exc_info()[0])
             raise
 
-    def load_index(self, filename="Output/exported_index.obj"):
-        """Restore previously built index from disk using pickle deserialization"""
+    def load_index(self, filename=INDEX_FILE):
+        """
+        Open a previously built index from disk
+
+        Index files are memory-mapped: loading only reads the section table, and the
+        postings, vectors and strings are paged in by the OS as queries touch them.
+        Indexes exported by older versions (pickle of the whole object) are still read.
+        """
         try:
-            f = open(filename, "rb")
+            binary_index = IndexFile.is_index_file(filename)
         except IOError:
             print("Error opening index file: " + filename)
             return 0
 
+        self.index_version += 1
+
+        if not binary_index:
+            self.load_pickle_index(filename)
+            print("Index successfully imported from disk.")
+            return
+
+        reader = IndexFile.IndexReader(filename)
+        meta = reader.meta
+
+        self.seed_url = meta["seed_url"]
+        self.domain_url = meta["domain_url"]
+        self.stop_words = meta["stop_words"]
+
+        counts = scipy.sparse.csr_matrix((reader.array("counts.data"), reader.array("counts.indices"), reader.array("counts.indptr")),
+                                         shape=(meta["num_terms"], meta["num_docs"]), copy=False)
+        counts.has_sorted_indices = True
+        self.index = InvertedIndex.from_arrays(reader.strings("doc_ids"), reader.strings("terms"), counts, reader.array("df"))
+        self.all_terms = self.index.terms
+
+        self.N = meta["num_docs"]
+        self.df = reader.array("df")
+        self.idf = reader.array("idf")
+        self.doc_norms = reader.array("doc_norms")
+        self.doc_vectors = scipy.sparse.csr_matrix((reader.array("weights.data"), counts.indices, counts.indptr),
+                                                   shape=counts.shape, copy=False)
+        self.doc_vectors.has_sorted_indices = True
+
+        self.title_index = IndexFile.PostingsTable(reader.strings("title_words"), reader.array("title_index.indptr"),
+                                                   reader.array("title_index.docs"))
+        self.result_titles = reader.strings("titles")
+        self.result_urls = reader.strings("urls")
+        self.result_snippets = reader.strings("snippets")
+        self.pagerank = reader.array("pagerank") if "pagerank" in reader.sections else None  # Older files have none
+
+        print("Index successfully imported from disk.")
+
+    def load_pickle_index(self, filename):
+        """Restore an index exported by older versions using pickle deserialization"""
+        f = open(filename, "rb")
         tmp_dict = pickle.load(f)
         f.close()
 
         self.__dict__.update(tmp_dict)
-        print("Index successfully imported from disk.")
+        if isinstance(self.doc_words, dict):
+            self.doc_words = DocumentStore(self.doc_words)
 
-    def save_index(self, filename="Output/exported_index.obj"):
-        """Persist current index to disk so we don't have to re-crawl next time"""
-        f = open(filename, 'wb')
-        pickle.dump(self.__dict__, f)
-        f.close()
+        # Older exports predate the inverted index and vectors - rebuild them from the crawled words
+        if self.index is None or self.doc_vectors is None or self.result_snippets is None:
+            self.build_frequency_matrix()
+
+    def save_index(self, filename=INDEX_FILE):
+        """
+        Persist current index to disk so we don't have to re-crawl next time
+
+        Only what searching needs is written (vocabulary, postings, vectors, titles, URLs,
+        snippets) in the versioned binary format of IndexFile - not the crawl state
+        """
+        IndexFile.write_index(filename, *self.index_sections())
+
+    def index_sections(self):
+        """(metadata, named arrays, named string lists) of the index file"""
+        title_words = sorted(self.title_index)
+        title_docs = [self.title_index[word] for word in title_words]
+
+        meta = {"seed_url": self.seed_url, "domain_url": self.domain_url, "stop_words": list(self.stop_words),
+                "num_docs": self.N, "num_terms": len(self.all_terms)}
+
+        arrays = {"counts.indptr": self.index.counts.indptr, "counts.indices": self.index.counts.indices,
+                  "counts.data": self.index.counts.data, "weights.data": self.doc_vectors.data,
+                  "df": self.df, "idf": self.idf, "doc_norms": self.doc_norms,
+                  "title_index.indptr": np.cumsum([0] + [len(docs) for docs in title_docs]),
+                  "title_index.docs": np.array([doc for docs in title_docs for doc in docs], dtype=np.int64)}
+
+        if self.pagerank is not None:
+            arrays["pagerank"] = self.pagerank
+
+        strings = {"terms": self.all_terms, "doc_ids": self.index.doc_ids, "title_words": title_words,
+                   "titles": self.result_titles, "urls": self.result_urls, "snippets": self.result_snippets}
+
+        return meta, arrays, strings
 
     def validate_query(self, query):
         for q in query.split():
@@ -69,107 +194,545 @@ class SearchEngine(WebCrawler):
                 return False
         return True
 
+    def set_clustering(self, method, seed=None):
+        if method not in CLUSTER_METHODS:
+            raise ValueError("Unknown clustering method: " + method + " (use " + " or ".join(CLUSTER_METHODS) + ")")
+        self.cluster_method = method
+        self.cluster_seed = int(seed) if seed is not None else None
+
     def cluster_docs(self, k=5):
         """
-        K-means style clustering using leader-follower algorithm
-        Randomly select k documents as leaders, assign others to nearest leader
-        based on Euclidean distance in the term frequency space
+        Group similar documents around k leaders
+
+        - leader-follower: randomly select k documents as leaders, assign every other
+          document to its nearest leader
+        - kmeans: mini-batch k-means; the leader of each cluster is the document closest
+          to its centroid
+
+        Distances are Euclidean between the unit-length TF-IDF document vectors, computed
+        on the sparse vectors in batches (see Clustering.py)
 
         Useful for finding similar documents and organizing search results
         """
-        # Use np.array instead of deprecated np.matrix for NumPy 2.x compatibility
-        X = np.array([list(x) for x in zip(*self.frequency_matrix)])
+        # Document vectors as rows: the transpose of the terms x documents matrix
+        X = self.doc_vectors.T.tocsr()
 
-        # Min-max normalization to scale all values between 0 and 1
-        X_max, X_min = X.max(), X.min()
-        if X_max - X_min > 0:
-            X = (X - X_min) / (X_max - X_min)
-        else:
-            X = np.zeros_like(X)
+        if X.shape[0] == 0:
+            print("No documents to cluster.")
+            self.clusters = {}
+            return
 
-        if len(X) < k:
+        if X.shape[0] < k:
             print("Warning: not enough documents to pick " + str(k) + " leaders.")
-            k = int(len(X) / 2)
+            k = max(1, int(X.shape[0] / 2))
             print("Clustering around " + str(k) + " leaders.")
 
-        leader_indices = random.sample(range(0, len(X)), k)
-        follower_indices = list(set([i for i in range(len(X))]) - set(leader_indices))
+        clusterer = DocumentClusterer(X, seed=self.cluster_seed)
+
+        with self.stage_timer("cluster"):
+            if self.cluster_method == "kmeans":
+                self.clusters = clusterer.minibatch_kmeans(k)
+            else:
+                self.clusters = clusterer.leader_follower(k)
+
+    def build_frequency_matrix(self):
+        """
+        Extend parent method to also compute corpus statistics needed for TF-IDF,
+        then precompute every document's TF-IDF vector once, L2-normalized,
+        so query scoring is a single sparse matrix product
+        """
+        super().build_frequency_matrix()
 
-        clusters = {l: [] for l in leader_indices}
+        with self.stage_timer("document_vectors"):
+            self.compute_document_vectors()
+
+        self.compute_pagerank()
+
+    def update_index(self, deleted_doc_ids, added_doc_ids, moved_doc_ids=()):
+        """
+        Apply document changes from an incremental re-crawl to the existing index
+
+        Only the words used by the added documents are stemmed, and only those documents
+        are counted; the postings of deleted ones are dropped and N/df are adjusted by the
+        difference. Because N changes the IDF of every term, the document vectors are then
+        re-derived from the patched counts (vectorized). The title index and result lists
+        are patched for the deleted and added documents (and moved_doc_ids: documents that
+        are now shown under another URL). PageRank is global - one changed link can change
+        every rank - so it is computed again from the crawled links
+        """
+        doc_numbers = {doc_id: doc for doc, doc_id in enumerate(self.index.doc_ids)}
+        deleted_docs = sorted(doc_numbers[doc_id] for doc_id in deleted_doc_ids)
+        moved_docs = [doc_numbers[doc_id] for doc_id in moved_doc_ids]
+        stems = self.doc_words.stem_vocabulary(self.stem_cache.stem, added_doc_ids)
 
-        # Assign each follower to its closest leader using Euclidean distance
-        for f in follower_indices:
-            min_dist = sys.maxsize
-            min_dist_index = -1
+        self.index.apply_delta(deleted_docs, added_doc_ids, self.doc_words.stemmed(stems, added_doc_ids))
+        self.all_terms = self.index.terms
 
-            for l in leader_indices:
-                # Reshape to 2D arrays as required by euclidean_distances
-                cur_dist = euclidean_distances(X[f].reshape(1, -1), X[l].reshape(1, -1))[0][0]
-                if cur_dist < min_dist:
-                    min_dist = cur_dist
-                    min_dist_index = l
+        with self.stage_timer("document_vectors"):
+            self.compute_document_vectors(result_data=False)
+            self.update_result_data(deleted_docs, added_doc_ids, moved_docs)
 
-            clusters[min_dist_index].append((f, min_dist))
+        self.compute_pagerank()
 
-        self.clusters = clusters
+    def recrawl(self):
+        """Re-crawl incrementally (see WebCrawler.recrawl) and patch the index with the changes"""
+        previous_urls = self.doc_urls
+        deleted, added = super().recrawl()
 
-    def normalize_list(self, input_list):
+        if self.index is None:
+            self.build_frequency_matrix()
+        else:
+            # Kept documents whose first URL went away are shown under the next one
+            moved = [doc_id for doc_id, url in self.doc_urls.items() - previous_urls.items() if doc_id in previous_urls]
+            self.update_index(deleted, added, moved)
+
+        return deleted, added
+
+    def compute_corpus_statistics(self):
+        """N, df and IDF of every term"""
+        self.N = self.index.num_docs  # Total documents
+        # Total occurrences of each term, not the number of documents containing it: the
+        # original ranking used this, so IDF can go negative for frequent terms. Kept on
+        # purpose so scores stay those of the original engine (document_frequencies() would
+        # give the textbook df)
+        self.df = self.index.term_frequencies()
+        self.idf = np.log10(self.N / self.df) if self.N > 0 else np.zeros(0)
+
+    def compute_document_vectors(self, result_data=True):
+        """Corpus statistics, unit-length TF-IDF document vectors and (result_data) result display data"""
+        self.index_version += 1
+        self.compute_corpus_statistics()
+
+        # TF-IDF weight of every posting: same sparsity pattern as the term counts
+        counts = self.index.counts
+        term_of_posting = np.repeat(np.arange(len(self.all_terms)), np.diff(counts.indptr))
+        weights = self.tf_idf(counts.data, term_of_posting)
+
+        # Length of every document's TF-IDF vector (sum of squares per column)
+        self.doc_norms = np.sqrt(np.bincount(counts.indices, weights=weights ** 2, minlength=self.index.num_docs))
+
+        # Divide by the length so each document vector has unit length (cosine normalization)
+        posting_norms = self.doc_norms[counts.indices]
+        normalized = np.divide(weights, posting_norms, out=np.zeros_like(weights), where=posting_norms > 0)
+        self.doc_vectors = scipy.sparse.csr_matrix((normalized, counts.indices, counts.indptr), shape=counts.shape)
+
+        if result_data:
+            self.build_result_data()
+
+    def build_result_data(self):
+        """Title index and what a search result shows, for every document"""
+        # Title word -> documents whose title contains it (for the title boost)
+        self.title_index = {}
+        for doc, doc_id in enumerate(self.index.doc_ids):
+            for word in set(self.doc_titles[doc_id].lower().split()):
+                self.title_index.setdefault(word, []).append(doc)
+
+        # What a search result shows for each document number: title, URL and first 20 words
+        self.result_titles = [self.doc_titles[doc_id] for doc_id in self.index.doc_ids]
+        self.result_urls = [self.doc_urls[doc_id] for doc_id in self.index.doc_ids]
+        self.result_snippets = [self.doc_words.snippet(doc_id) for doc_id in self.index.doc_ids]
+
+    def update_result_data(self, deleted_docs, added_doc_ids, moved_docs=()):
+        """
+        Patch the title index and result lists after update_index: the deleted document
+        numbers (sorted) are removed, later documents move up, added documents are appended
+        Indexes loaded from disk are read-only tables and are copied into lists first
         """
-        Convert vector to unit length for cosine similarity
-        Divides each element by the L2 norm (Euclidean length)
-        This removes document length bias from relevance scoring
+        deleted = np.asarray(deleted_docs, dtype=np.int64)
+
+        # Title postings of all words as flat arrays: drop and renumber in one pass
+        words = list(self.title_index)
+        postings = [self.title_index[word] for word in words]
+        lengths = np.fromiter(map(len, postings), dtype=np.int64, count=len(postings))
+        docs = np.fromiter(itertools.chain.from_iterable(postings), dtype=np.int64, count=int(lengths.sum()))
+        owners = np.repeat(np.arange(len(words)), lengths)
+
+        keep = ~np.isin(docs, deleted)
+        docs, owners = docs[keep], owners[keep]
+        docs -= np.searchsorted(deleted, docs)  # Number of deleted documents before each one
+        ends = np.cumsum(np.bincount(owners, minlength=len(words)))
+        self.title_index = {word: word_docs.tolist() for word, word_docs in zip(words, np.split(docs, ends[:-1]))
+                            if len(word_docs) > 0}
+
+        results = [list(self.result_titles), list(self.result_urls), list(self.result_snippets)]
+        for result_list in results:
+            for doc in reversed(deleted_docs):
+                del result_list[doc]
+        self.result_titles, self.result_urls, self.result_snippets = results
+
+        for doc in moved_docs:
+            doc -= int(np.searchsorted(deleted, doc))
+            self.result_urls[doc] = self.doc_urls[self.index.doc_ids[doc]]
+
+        for doc, doc_id in enumerate(added_doc_ids, start=len(self.result_titles)):
+            for word in set(self.doc_titles[doc_id].lower().split()):
+                self.title_index.setdefault(word, []).append(doc)
+            self.result_titles.append(self.doc_titles[doc_id])
+            self.result_urls.append(self.doc_urls[doc_id])
+            self.result_snippets.append(self.doc_words.snippet(doc_id))
+
+    def compute_pagerank(self):
         """
-        l_norm = math.sqrt(sum([l**2 for l in input_list]))
+        PageRank of the documents over the links found while crawling (see LinkGraph.py),
+        scaled so the highest is 1: blended into scores with pagerank_weight
+        """
+        with self.stage_timer("pagerank"):
+            self.link_graph = self.build_link_graph(self.index.doc_ids)
+            rank = self.link_graph.pagerank()
 
-        if l_norm > 0:
-            input_list = [l/l_norm for l in input_list]
-        return input_list
+        self.pagerank = rank / rank.max() if len(rank) > 0 else rank
 
-    def build_frequency_matrix(self):
-        """Extend parent method to also compute corpus statistics needed for TF-IDF"""
-        super().build_frequency_matrix()
+        if self.metrics is not None:
+            self.metrics.set_gauge("pagerank_iterations", self.link_graph.pagerank_stats["iterations"])
+            self.metrics.set_gauge("link_graph_links", self.link_graph.num_links)
 
-        self.N = len(self.frequency_matrix[0])  # Total documents
-        self.df = [sum(row) for row in self.frequency_matrix]  # Docs containing each term
+    def pagerank_report(self):
+        stats = self.link_graph.pagerank_stats
+        return "PageRank: {} links between {} documents, {} iterations ({}) in {:.3f} seconds".format(
+            stats["links"], self.link_graph.num_docs, stats["iterations"],
+            "converged" if stats["converged"] else "not converged", stats["seconds"])
 
-    def tf_idf(self, doc):
+    def tf_idf(self, tf, term_id):
         """
-        Calculate TF-IDF weight for document/query vector
+        Calculate TF-IDF weights (works on single values or whole NumPy arrays)
 
         TF (Term Frequency): 1 + log10(count) - dampens impact of repeated terms
         IDF (Inverse Document Frequency): log10(N/df) - rare terms get higher weight
 
         Combined: frequent terms in few docs score highest
         """
-        w = []
+        # Logarithmic TF prevents long documents from dominating
+        # IDF boosts discriminative terms that appear in fewer documents
+        return (1 + np.log10(tf)) * self.idf[term_id]
 
-        for d in range(len(doc)):
-            if doc[d] > 0:
-                # Logarithmic TF prevents long documents from dominating
-                # IDF boosts discriminative terms that appear in fewer documents
-                w.append((1 + math.log10(doc[d])) * math.log10(self.N / self.df[d]))
-            else:
-                w.append(0)
+    def query_terms(self, user_query, expanded=False):
+        """
+        Turn a query into its unit-length TF-IDF vector: (sorted term ids, weights), plus
+        the title boost as [(documents, boost)]
+        """
+        term_ids, weights, title_words = self.query_vector(user_query, expanded)
+        return term_ids, weights, self.title_boosts(title_words)
+
+    def query_vector(self, user_query, expanded=False):
+        """
+        Unit-length TF-IDF vector of a query: (sorted term ids, weights), plus the words
+        that give a title boost as [(words, boost)]
+
+        1. Tokenize and remove stopwords
+        2. Stem query terms to match how documents were indexed
+        3. Discard terms not in our vocabulary (they can't match anything)
+        4. Count each term and weight it with TF-IDF
+
+        expanded adds the thesaurus synonyms of the query words (already stemmed and looked
+        up, see compiled_thesaurus); terms that only come from synonyms, and titles only
+        matched by synonyms, count synonym_weight times as much
+        """
+        words = user_query.split()
+        query = [self.index.term_id(self.stem_cache.stem(q)) for q in words if q not in self.stop_words]
+        query = [q for q in query if q is not None]
+
+        title_words = [(set(words), 0.25)]
+
+        synonym_terms = []
+        if expanded:
+            synonyms = self.query_synonyms(words)
+            synonym_terms = [term_id for _, term_id in synonyms if term_id is not None]
+            title_words.append((set(word for word, _ in synonyms), 0.25 * self.synonym_weight))
+
+        terms = query + synonym_terms
+        term_ids = np.array(sorted(set(terms)), dtype=np.int64)
+        weights = self.tf_idf(np.array([terms.count(t) for t in term_ids]), term_ids)
+
+        if synonym_terms and self.synonym_weight != 1.0:
+            weights = weights * np.where(np.isin(term_ids, query), 1.0, self.synonym_weight)
+
+        query_norm = math.sqrt(np.sum(weights ** 2))
+        return term_ids, (weights / query_norm if query_norm > 0 else weights), title_words
+
+    def title_boosts(self, title_words):
+        """[(words, boost)] -> [(documents with one of the words in their title, boost)]; earlier groups win"""
+        title_boosts = []
+        boosted = set()
+
+        for words, boost in title_words:
+            title_docs = set(doc for word in words for doc in self.title_index.get(word, [])) - boosted
+            if title_docs:
+                title_boosts.append((sorted(title_docs), boost))
+                boosted |= title_docs
+
+        return title_boosts
 
-        return w
+    def query_vectors(self, user_queries, expanded=None):
+        """Unit-length TF-IDF vectors of many queries: one sparse row per query (expanded: one flag per query)"""
+        rows, cols, data = [], [], []
 
-    def cosine_similarity(self, query, doc):
+        for row, user_query in enumerate(user_queries):
+            term_ids, weights, _ = self.query_terms(user_query, expanded is not None and expanded[row])
+
+            rows.extend([row] * len(term_ids))
+            cols.extend(term_ids.tolist())
+            data.extend(weights.tolist())
+
+        return scipy.sparse.csr_matrix((data, (rows, cols)), shape=(len(user_queries), len(self.all_terms)))
+
+    def score_documents(self, user_queries, expanded=None):
+        """
+        Score documents for many queries at once
+
+        Cosine similarity = dot product of unit-length vectors, so for all queries together:
+            scores = (queries x terms) @ (terms x documents)
+        Only the rows (postings) of terms that occur in a query are read.
+        Returns one {document number: score} dict per query, including the title boost
+        and, for matching documents, the PageRank blend
+        """
+        similarities = (self.query_vectors(user_queries, expanded) @ self.doc_vectors).tocsr()
+        all_scores = []
+
+        for row, user_query in enumerate(user_queries):
+            scores = {}
+
+            # Title boost: documents with query terms in title get relevance bonus
+            for docs, boost in self.query_terms(user_query, expanded is not None and expanded[row])[2]:
+                for doc in docs:
+                    scores[doc] = boost
+
+            start, end = similarities.indptr[row], similarities.indptr[row + 1]
+            for doc, similarity in zip(similarities.indices[start:end].tolist(), similarities.data[start:end].tolist()):
+                scores[doc] = scores.get(doc, 0) + similarity
+
+            if self.pagerank is not None and self.pagerank_weight:
+                for doc, score in scores.items():
+                    if score > 0:
+                        scores[doc] = score + self.pagerank_weight * self.pagerank[doc]
+
+            all_scores.append(scores)
+
+        return all_scores
+
+    def num_matches(self, user_query, at_least):
+        """
+        Whether a query matches (scores above 0) at least `at_least` documents, without
+        ranking them: returns the number of matches, or any number >= at_least
+        """
+        return self.count_matches(*self.query_terms(user_query), at_least)
+
+    def count_matches(self, term_ids, weights, title_boosts, at_least):
+        """
+        num_matches for a query vector (see query_terms)
+
+        Postings are only summed per document when some contributions are negative
+        (negative IDF); otherwise a document matches if it is in any posting or title list
+        """
+        docs = [np.asarray(title_docs, dtype=np.int64) for title_docs, _ in title_boosts]
+        contributions = [np.full(len(title_docs), boost) for title_docs, boost in title_boosts]
+        for term_id, weight in zip(term_ids.tolist(), weights.tolist()):
+            start, end = self.doc_vectors.indptr[term_id], self.doc_vectors.indptr[term_id + 1]
+            docs.append(self.doc_vectors.indices[start:end])
+            contributions.append(weight * self.doc_vectors.data[start:end])
+
+        if not docs:
+            return 0
+
+        if all(np.all(c >= 0) for c in contributions):
+            matches = [d[c > 0] for d, c in zip(docs, contributions)]
+            longest = max(len(m) for m in matches)
+            if longest >= at_least:
+                return longest  # One list alone is enough, no need to merge them
+            return len(np.unique(np.concatenate(matches)))
+
+        unique_docs, position = np.unique(np.concatenate(docs), return_inverse=True)
+        return int(np.sum(np.bincount(position, weights=np.concatenate(contributions), minlength=len(unique_docs)) > 0))
+
+    def needs_expansion(self, user_query, k):
+        """Fewer than k/2 results: the query will be expanded with thesaurus synonyms"""
+        return self.thesaurus is not None and self.num_matches(user_query, k / 2) < k / 2
+
+    def compiled_thesaurus(self):
+        """
+        The thesaurus compiled for the current index: word -> [(synonym, term id of its stem,
+        or None for stop words and unknown terms)]. A word's synonyms include the synonyms of
+        its synonyms, and so on. Compiled once per index version, not for every query
+        """
+        if self.synonyms_version != self.index_version:
+            self.synonyms = {}
+
+            for word in self.thesaurus:
+                expansion = [word]
+                seen = {word}
+                for term in expansion:  # Grows while iterating: synonyms of synonyms
+                    for synonym in self.thesaurus.get(term, ()):
+                        if synonym not in seen:
+                            seen.add(synonym)
+                            expansion.append(synonym)
+
+                self.synonyms[word] = [(synonym, None if synonym in self.stop_words else
+                                        self.index.term_id(self.stem_cache.stem(synonym))) for synonym in expansion[1:]]
+
+            self.synonyms_version = self.index_version
+
+        return self.synonyms
+
+    def query_synonyms(self, words):
+        """[(synonym, term id)] added by expanding the query words; each synonym once, none that is a query word"""
+        compiled = self.compiled_thesaurus()
+        seen = set(words)
+        synonyms = []
+
+        for word in dict.fromkeys(words):
+            for synonym, term_id in compiled.get(word, ()):
+                if synonym not in seen:
+                    seen.add(synonym)
+                    synonyms.append((synonym, term_id))
+
+        return synonyms
+
+    def top_k_scores(self, user_query, k, expanded=False):
+        """Find only the k best documents for a query: {document number: score} (see top_k_documents)"""
+        return self.top_k_documents(*self.query_terms(user_query, expanded), k)
+
+    def top_k_documents(self, term_ids, weights, title_boosts, k):
         """
-        Measure angle between query and document vectors in term space
+        Find only the k best documents for a query vector using the MaxScore algorithm
+
+        IDEA:
+        - For every query term we know its largest possible contribution to any
+          document's score (its "upper bound"); the title boost is treated as one more
+          term whose contribution is always 0.25 (and a synonym title match as another,
+          on the documents no query word title-matches)
+        - A bounded min-heap keeps the k best documents seen so far; the worst of them
+          is the score a new document has to beat (the threshold)
+        - Terms whose upper bounds together stay below the threshold are "non-essential":
+          a document containing only those terms can never enter the top k, so only the
+          postings of the essential terms are walked to find candidates
+        - Before fully scoring a candidate, its best possible score is checked against
+          the threshold again, and hopeless documents are skipped
+
+        With a pagerank_weight, a matching document also gets pagerank_weight * its PageRank
+        (at most pagerank_weight, the bound every document is allowed on top of its terms)
+
+        Documents are visited in increasing document number (document-at-a-time), so
+        on equal scores the earlier document wins, exactly like the full ranking.
+        Returns {document number: score} for at most k documents with a positive score;
+        counts of scored/skipped documents are kept in self.last_query_stats
+        """
+        # One entry per query term: (term id, documents, contributions to the cosine score)
+        terms = []
+        for term_id, q_weight in zip(term_ids.tolist(), weights.tolist()):
+            start, end = self.doc_vectors.indptr[term_id], self.doc_vectors.indptr[term_id + 1]
+            terms.append((term_id, self.doc_vectors.indices[start:end].tolist(),
+                          (q_weight * self.doc_vectors.data[start:end]).tolist()))
+
+        # Title boost behaves like an extra term present in every document with a matching title
+        for title_docs, boost in title_boosts:
+            terms.append((None, title_docs, [boost] * len(title_docs)))
+
+        # Upper bound of each term; a document without the term gets 0 from it
+        terms = [(max([0] + contributions), term_id, docs, contributions) for term_id, docs, contributions in terms]
+        terms.sort(key=lambda x: x[0])
+        bounds_below = [sum(t[0] for t in terms[:i]) for i in range(len(terms) + 1)]
+        prior_weight = self.pagerank_weight if self.pagerank is not None else 0  # Bound of the PageRank blend
+
+        pointers = [0] * len(terms)
+        heap = []           # Min-heap of (score, -document): heap[0] is the weakest of the top k
+        threshold = 0       # Score a document must beat to enter the results
+        first_essential = 0
+        scored = skipped = 0
+
+        while True:
+            # Next candidate: smallest document number among the essential terms' postings
+            candidate = None
+            for i in range(first_essential, len(terms)):
+                docs = terms[i][2]
+                if pointers[i] < len(docs) and (candidate is None or docs[pointers[i]] < candidate):
+                    candidate = docs[pointers[i]]
+            if candidate is None:
+                break
 
-        Result ranges from 0 (orthogonal/unrelated) to 1 (identical direction)
-        Independent of vector magnitude - focuses purely on term distribution
+            contributions = {}
+            for i in range(first_essential, len(terms)):
+                docs = terms[i][2]
+                if pointers[i] < len(docs) and docs[pointers[i]] == candidate:
+                    contributions[i] = terms[i][3][pointers[i]]
+                    pointers[i] += 1
+
+            # Add non-essential terms from the strongest down, giving up once the bound is hopeless
+            prior = prior_weight * self.pagerank[candidate] if prior_weight else 0
+            bound = sum(contributions.values()) + bounds_below[first_essential] + prior
+            for i in reversed(range(first_essential)):
+                if bound < threshold - SCORE_EPSILON:
+                    break
+                docs = terms[i][2]
+                pointers[i] = bisect.bisect_left(docs, candidate, pointers[i])
+                bound -= terms[i][0]
+                if pointers[i] < len(docs) and docs[pointers[i]] == candidate:
+                    contributions[i] = terms[i][3][pointers[i]]
+                    bound += contributions[i]
+
+            if bound < threshold - SCORE_EPSILON:
+                skipped += 1
+                continue
+            scored += 1
+
+            # Exact score, summed in vocabulary order like the full matrix product
+            boost = 0
+            similarity = 0
+            for i in sorted(contributions, key=lambda i: terms[i][1] if terms[i][1] is not None else -1):
+                if terms[i][1] is None:
+                    boost = contributions[i]  # The title groups never share a document
+                else:
+                    similarity += contributions[i]
+            score = boost + similarity
+
+            if score > 0:
+                score += prior  # Only documents the query matches get their PageRank
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -candidate))
+                elif (score, -candidate) > heap[0]:
+                    heapq.heapreplace(heap, (score, -candidate))
+
+                if len(heap) == k:
+                    threshold = heap[0][0]
+                    while first_essential < len(terms) and bounds_below[first_essential + 1] + prior_weight < threshold - SCORE_EPSILON:
+                        first_essential += 1
+
+        self.last_query_stats = {"documents": self.N, "scored": scored, "skipped": skipped}
+        return {-negative_doc: score for score, negative_doc in heap}
+
+    def rank_results(self, scores):
+        """Sort scored documents into [[score, title, URL, snippet]] rows"""
+        # Highest score first; ties keep crawl order
+        sorted_scores = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+        # Build result list with score, title, URL path, and preview snippet
+        return [['%06.4f' % score, self.result_titles[doc], self.result_urls[doc].replace(self.domain_url, ''),
+                 self.result_snippets[doc]] for doc, score in sorted_scores if score > 0]
 
-        Formula: cos(θ) = (q · d) / (|q| × |d|)
+    def process_queries(self, user_queries, k=6, query_expanded=False):
         """
-        q_prime = self.tf_idf(query)
-        d_prime = self.tf_idf(doc)
+        Batch search: rank many queries with one sparse matrix-matrix product
+        Returns one result list per query, exactly as process_query would
+        """
+        start = time.perf_counter()
+
+        # Query expansion: queries with too few matches are scored with their synonyms right away
+        expanded = [query_expanded is False and self.needs_expansion(user_query, k) for user_query in user_queries]
+        for flag in expanded:
+            if flag:
+                print("Less than K/2 results. Performing thesaurus expansion...")
+
+        results = [self.rank_results(scores)[:k] for scores in self.score_documents(user_queries, expanded)]
+
+        if query_expanded is False:
+            for flag in expanded:
+                self.record_expansion(flag)
 
-        q_prime = self.normalize_list(q_prime)
-        d_prime = self.normalize_list(d_prime)
+            if self.metrics is not None and user_queries:
+                # One batch: every query is charged the average time
+                latency = (time.perf_counter() - start) / len(user_queries)
+                for flag in expanded:
+                    self.record_query(latency, flag)
 
-        # Dot product of normalized vectors equals cosine of angle between them
-        return sum([q_prime[i] * d_prime[i] for i in range(len(q_prime))])
+        return results
 
     def process_query(self, user_query, k=6, query_expanded=False):
         """
@@ -178,62 +741,72 @@ class SearchEngine(WebCrawler):
         Pipeline:
         1. Tokenize and stem query terms
         2. Remove stopwords and unknown terms
-        3. Convert to term frequency vector
-        4. Calculate cosine similarity with each document
-        5. Boost score if query terms appear in title
-        6. If too few results, expand query using thesaurus synonyms
+        3. If it matches fewer than k/2 documents, add the thesaurus synonyms of its words
+        4. Convert to unit-length TF-IDF vector
+        5. Find the top k documents by cosine similarity, skipping documents that cannot make it
+        6. Boost score if query terms appear in title
+
+        The corpus is scored once: whether expansion is needed is decided first, by
+        counting the documents the query matches, instead of ranking everything and
+        searching again with the expanded query (query_expanded=True never expands)
 
         Returns top k results as [[score, title, URL, snippet]]
+        Repeated queries are answered from the query cache, if it is on
         """
-        scores = {doc_id: 0 for doc_id in self.doc_titles.keys()}
-
-        # Title boost: documents with query terms in title get relevance bonus
-        for t in self.doc_titles.keys():
-            cur_title = self.doc_titles[t].lower()
-            if len(set(user_query.split()).intersection(cur_title.split())) > 0:
-                scores[t] = 0.25
-
-        query = user_query
-        query = query.split()
+        start = time.perf_counter()
 
-        query = [q for q in query if q not in self.stop_words]
+        key = self.query_key(user_query, k) if self.query_cache is not None and query_expanded is False else None
+        cached = self.query_cache.get(key, self.index_version) if key is not None else None
 
-        # Stem query terms to match how documents were indexed
-        stemmer = PorterStemmer()
-        query = [stemmer.stem(q) for q in query]
-
-        # Discard terms not in our vocabulary (they can't match anything)
-        query = [q for q in query if q in self.all_terms]
+        if cached is not None:
+            results, expanded = cached
+            results = [row[:] for row in results]  # The caller may change its copy
+        else:
+            expanded = query_expanded is False and self.needs_expansion(user_query, k)
+            if expanded:
+                print("Less than K/2 results. Performing thesaurus expansion...")
 
-        # Build query vector: count of each term in the query
-        query = [query.count(term) for term in self.all_terms]
+            results = self.rank_results(self.top_k_scores(user_query, k, expanded))
 
-        # Transpose matrix to get document vectors (columns become rows)
-        docs = [list(x) for x in zip(*self.frequency_matrix)]
+            if key is not None:
+                self.query_cache.put(key, self.index_version, ([row[:] for row in results], expanded))
 
-        for i, (doc_id, score) in enumerate(scores.items()):
-            scores[doc_id] += self.cosine_similarity(query, docs[i])
+        if query_expanded is False:
+            self.record_expansion(expanded)
+            if self.metrics is not None:
+                self.record_query(time.perf_counter() - start, expanded)
 
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return results
 
-        # Build result list with score, title, URL path, and preview snippet
-        results = [['%06.4f' % score, self.doc_titles[doc_id], self.doc_urls[doc_id].replace(self.domain_url, ''),
-                    " ".join(self.doc_words[doc_id][:20])] for doc_id, score in sorted_scores if score > 0]
+    def record_expansion(self, expanded):
+        self.expansion_stats["queries"] += 1
+        self.expansion_stats["expanded"] += expanded
 
-        # Query expansion: if results are sparse, add synonyms and try again
-        if len(results) < k/2 and query_expanded is False:
-            print("Less than K/2 results. Performing thesaurus expansion...")
+    def expansion_report(self):
+        queries, expanded = self.expansion_stats["queries"], self.expansion_stats["expanded"]
+        return "Thesaurus expansion: {} of {} queries ({:.1%})".format(expanded, queries, expanded / queries if queries else 0)
 
-            query = user_query.split()
+    def query_key(self, user_query, k):
+        """
+        Everything the results of a query depend on, in a normal form:
+        - the stemmed terms that are in the vocabulary, sorted (with repeats, which weigh more)
+        - the raw words that match titles (title boost) or the thesaurus (query expansion)
+        - k
+        """
+        words = user_query.split()
+        stems = (self.stem_cache.stem(word) for word in words if word not in self.stop_words)
+        terms = tuple(sorted(term for term in stems if self.index.term_id(term) is not None))
 
-            for term in query:
-                if term in self.thesaurus:
-                    query += [syn for syn in self.thesaurus[term] if syn not in query]
+        title_words = frozenset(word for word in words if self.title_index.get(word) is not None)
+        thesaurus_words = frozenset(word for word in words if self.thesaurus is not None and word in self.thesaurus)
 
-            # Recursive call with expanded query (flag prevents infinite recursion)
-            return self.process_query(" ".join(query), k, True)
+        return terms, title_words, thesaurus_words, k
 
-        return results[:k]
+    def record_query(self, seconds, expanded):
+        self.metrics.observe("query_seconds", seconds)
+        self.metrics.increment("queries_total")
+        if expanded:
+            self.metrics.increment("queries_expanded_total")
 
     def display_clusters(self):
         if self.clusters is not None:
@@ -311,6 +884,8 @@ class SearchEngine(WebCrawler):
 
                         search_engine.build_frequency_matrix()
                         print(" Done.")
+                        print(search_engine.stem_cache)
+                        print(search_engine.pagerank_report())
 
                         f = open("Output/tf_matrix.csv", "w")
                         f.write(search_engine.print_frequency_matrix())
@@ -346,7 +921,7 @@ class SearchEngine(WebCrawler):
                                 self.print_divider()
                                 self.display_clusters()
                         except (TypeError, KeyError) as e:
-                            print(f"Clustering skipped due to compatibility issue with newer NumPy/scikit-learn versions.")
+                            print(f"Clustering skipped due to compatibility issue with newer NumPy/SciPy versions.")
                             print("(This is optional - search functionality still works!)")
 
                         b_input = "-1"
@@ -355,10 +930,11 @@ class SearchEngine(WebCrawler):
 
                         if b_input == "y":
                             self.save_index()
-                            print("Exported to Output/exported_index.obj.")
+                            self.save_crawl_state()
+                            print("Exported to " + INDEX_FILE + " (crawl state for re-crawls: " + CRAWL_STATE_FILE + ").")
 
             elif int(main_menu_input) == 2:
-                if len(self.visited_urls) == 0:
+                if self.index is None:
                     print("You must build the index first.")
                 else:
                     while True:
@@ -366,6 +942,9 @@ class SearchEngine(WebCrawler):
 
                         if self.validate_query(query_input):
                             if "stop" in query_input:
+                                print(self.expansion_report())
+                                if self.query_cache is not None:
+                                    print(self.query_cache)
                                 run_program = False
                                 break
 
@@ -399,19 +978,107 @@ if __name__ == "__main__":
                         help="Stop words file: a newline separated list of stop words. (Default is Input/stopwords.txt)", required=False, default="Input/stopwords.txt")
     parser.add_argument("-t", "--thesaurus",
                         help="Thesaurus file: a comma separated list of words and their synonyms. (Default is Input/thesaurus.csv)", required=False, default="Input/thesaurus.csv")
+    parser.add_argument("-c", "--concurrency",
+                        help="Number of pages to fetch in parallel. (Default is 1, a sequential crawl)", required=False, default="1")
+    parser.add_argument("--per-host",
+                        help="Maximum simultaneous connections to one host when crawling concurrently. (Default is 4)", required=False, default="4")
+    parser.add_argument("--parse-workers",
+                        help="Number of worker processes parsing pages while the crawl keeps fetching. (Default is 0, parse in the crawl loop)", required=False, default="0")
+    parser.add_argument("--scheduler", choices=SCHEDULER_POLICIES,
+                        help="Crawl order: per-host priority queues, shallowest, most linked or highest --url-weight pages first. (Default is one BFS queue)", required=False, default=None)
+    parser.add_argument("--host-selection", choices=HOST_SELECTIONS,
+                        help="Which host the --scheduler serves next: in turn, or by per-host token buckets. (Default is round-robin)", required=False, default="round-robin")
+    parser.add_argument("--host-rate",
+                        help="Pages per second each host's token bucket earns with --host-selection token-bucket. (Default is 1.0)", required=False, default="1.0")
+    parser.add_argument("--url-weight", action="append",
+                        help="PATTERN=WEIGHT: URLs matching the regular expression are crawled first by --scheduler pattern; can be repeated", required=False, default=None)
+    parser.add_argument("--distributed",
+                        help="Number of worker processes sharing the crawl, each owning part of the URLs. (Default is 0, crawl in this process)", required=False, default="0")
+    parser.add_argument("--partition", choices=["host", "url"],
+                        help="Which distributed worker owns a URL: by hash of its host or of the whole URL; with a crawl delay always by host. (Default is host)", required=False, default="host")
+    parser.add_argument("--listen",
+                        help="HOST:PORT where distributed workers on other nodes connect (python DistributedCrawl.py --connect HOST:PORT --authkey KEY). (Default is to start the workers here)", required=False, default=None)
+    parser.add_argument("--authkey",
+                        help="Shared secret of the distributed workers connecting to --listen (required with --listen)", required=False, default=None)
+    parser.add_argument("--near-duplicates",
+                        help="Don't index pages at least this similar (0-1) to an indexed page, e.g. 0.9. (Default is off)", required=False, default=None)
+    parser.add_argument("--bloom-filter",
+                        help="Remember seen URLs in a Bloom filter sized for this many URLs, for very large crawls. (Default is 64-bit fingerprints)", required=False, default=None)
+    parser.add_argument("--cluster-method", choices=CLUSTER_METHODS,
+                        help="Document clustering: random leaders or mini-batch k-means. (Default is leader-follower)", required=False, default="leader-follower")
+    parser.add_argument("--cluster-seed",
+                        help="Random seed for clustering, for reproducible clusters. (Default is a new seed every run)", required=False, default=None)
+    parser.add_argument("--synonym-weight",
+                        help="Weight (0-1) of thesaurus synonyms added to queries with too few results. (Default is 1.0, like the query's own words)", required=False, default="1.0")
+    parser.add_argument("--pagerank-weight",
+                        help="Weight of PageRank (scaled to 0-1) added to the score of matching documents. (Default is 0, cosine similarity only)", required=False, default="0")
+    parser.add_argument("--query-cache",
+                        help="Number of query results kept in the LRU query cache, 0 to turn it off. (Default is 1024)", required=False, default="1024")
+    parser.add_argument("--query-cache-ttl",
+                        help="Seconds a cached query result stays valid. (Default is until the index changes)", required=False, default=None)
+    parser.add_argument("--metrics",
+                        help="Record per-stage timings and counters and write them to this file when the program ends: JSON if it ends in .json, else Prometheus text format. (Default is off)", required=False, default=None)
+    parser.add_argument("--recrawl", action="store_true",
+                        help="Refresh the exported index: re-crawl with conditional requests, update only changed pages, and export again")
+    parser.add_argument("--checkpoint", nargs="?", const=CHECKPOINT_FILE,
+                        help="Write a crawl checkpoint log while crawling, to this file or " + CHECKPOINT_FILE + ". (Default is off)", required=False, default=None)
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume an interrupted crawl from the checkpoint log (--checkpoint, or " + CHECKPOINT_FILE + ") instead of downloading its pages again")
 
     argument = parser.parse_args()
+    if argument.listen is not None and not argument.authkey:
+        parser.error("--listen needs --authkey: workers on other nodes must connect with the same key")
+    if argument.resume and argument.recrawl:
+        parser.error("--resume cannot be used with --recrawl: replayed pages would replace the conditional requests")
 
     search_engine = SearchEngine(argument.url)
 
     if int(argument.pagelimit) > 1:
         search_engine.set_page_limit(argument.pagelimit)
+        search_engine.set_concurrency(argument.concurrency, argument.per_host)
+        search_engine.set_parse_workers(argument.parse_workers)
+        if argument.scheduler is not None:
+            url_weights = dict(weight.rsplit("=", 1) for weight in argument.url_weight or [])
+            search_engine.set_scheduler(argument.scheduler, argument.host_selection, url_weights, float(argument.host_rate))
+        if argument.listen is not None:
+            host, port = argument.listen.rsplit(":", 1)
+            search_engine.set_distributed(argument.distributed, argument.partition, (host, int(port)),
+                                          argument.authkey.encode("utf-8"))
+        else:
+            search_engine.set_distributed(argument.distributed, argument.partition)
+        search_engine.set_clustering(argument.cluster_method, argument.cluster_seed)
+        if argument.near_duplicates is not None:
+            search_engine.set_near_duplicate_threshold(argument.near_duplicates)
+        if argument.bloom_filter is not None:
+            search_engine.set_bloom_filter(argument.bloom_filter)
 
         if argument.stopwords:
             search_engine.set_stop_words(argument.stopwords)
         if argument.thesaurus:
             search_engine.set_thesaurus(argument.thesaurus)
+        search_engine.set_synonym_weight(argument.synonym_weight)
+        search_engine.set_pagerank_weight(argument.pagerank_weight)
+
+        if argument.checkpoint is not None or argument.resume:
+            search_engine.set_checkpoint(argument.checkpoint or CHECKPOINT_FILE, argument.resume)
+        search_engine.set_query_cache(argument.query_cache, argument.query_cache_ttl)
+        if argument.metrics is not None:
+            search_engine.set_metrics()
+
+        if argument.recrawl:
+            search_engine.load_index()
+            search_engine.load_crawl_state()
+            search_engine.recrawl()
+            search_engine.save_index()
+            search_engine.save_crawl_state()
+            print("\nRe-crawl: {unchanged} pages unchanged, {changed} changed, {new} new; {deleted} documents removed".format(
+                **search_engine.recrawl_stats))
+        else:
+            search_engine.display_menu()
 
-        search_engine.display_menu()
+        if search_engine.metrics is not None:
+            print(search_engine.metrics)
+            search_engine.metrics.write(argument.metrics)
+            print("Metrics written to " + argument.metrics)
     else:
         print("Sorry. You must crawl a minimum of 2 pages. Otherwise, why would you need a search engine?")
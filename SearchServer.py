@@ -0,0 +1,330 @@
+"""
+HTTP/JSON search service over an exported index, answered by pre-forked worker processes
+
+WHY?
+- display_menu answers one query at a time from stdin, so nothing else can send it queries
+- The index file is memory-mapped (IndexFile.py): the server opens it once and then forks
+  its workers, which share the mapped pages through the OS page cache instead of each
+  holding its own copy of the index
+- process_query is not thread-safe (query cache, statistics), so every worker answers
+  one request at a time; the workers accept connections on one shared listening socket,
+  so N workers answer N queries at once on N CPU cores
+
+API:
+    GET /search?q=mystery+book&k=6
+        {"query": "mystery book", "k": 6, "expanded": false,
+         "results": [{"score": 0.75, "title": ..., "url": ..., "snippet": ...}]}
+    GET /health
+        {"status": "ok", "index": "Output/exported_index.idx", "index_version": 0, "documents": 15, "pid": 1234}
+    index_version counts the hot swaps: it is 0 for the index loaded at start
+
+HOT SWAP:
+    kill -HUP <server pid>    re-open the index file, e.g. after exporting a new one
+The server loads the new index and forks new workers first, then tells the old workers to
+stop: they stop accepting connections and exit once their current query is answered, so
+no query is dropped. IndexFile.write_index replaces the file in one rename, so the old
+workers keep reading the old version until they exit.
+
+Run:
+    python SearchServer.py -i Output/exported_index.idx --port 8080 -w 4
+    curl "http://localhost:8080/search?q=mystery+book"
+Load test with benchmarks/bench_search_server.py
+"""
+import argparse                                          # Command-line options
+import contextlib                                        # Keep process_query's progress messages out of the log
+import io                                                # (they are written to a StringIO)
+import json                                              # Request results as JSON
+import os                                                # fork/kill/waitpid of the worker processes
+import signal                                            # SIGHUP: reload the index, SIGTERM: stop
+import socket                                            # Listening socket shared by all workers
+import sys                                               # Error output
+import time                                              # Supervisor loop
+import traceback                                         # Report a crashed worker
+import urllib.parse                                      # Query string of /search
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from SearchEngine import SearchEngine, INDEX_FILE        # Query processing over a loaded index
+
+POLL_INTERVAL = 0.2  # Seconds between checks for signals, in the supervisor and in idle workers
+MAX_K = 100          # Largest number of results one request may ask for
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """Answers one HTTP request with the SearchEngine of the worker (self.server.search_engine)"""
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+
+        if url.path == "/search":
+            self.search(params)
+        elif url.path == "/health":
+            self.send_json(200, {"status": "ok", "index": self.server.index_file, "index_version": self.server.index_version,
+                                 "documents": self.server.search_engine.N, "pid": os.getpid()})
+        else:
+            self.send_json(404, {"error": "Unknown path: " + url.path})
+
+    def search(self, params):
+        query = params.get("q", [""])[0]
+        try:
+            k = int(params.get("k", ["6"])[0])
+        except ValueError:
+            k = 0
+
+        if not query.split() or not self.server.search_engine.validate_query(query):
+            self.send_json(400, {"error": "Invalid query"})
+            return
+        if k < 1 or k > MAX_K:
+            self.send_json(400, {"error": "k must be between 1 and " + str(MAX_K)})
+            return
+
+        search_engine = self.server.search_engine
+        expanded = search_engine.expansion_stats["expanded"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = search_engine.process_query(query, k)
+
+        self.send_json(200, {"query": query, "k": k, "expanded": search_engine.expansion_stats["expanded"] > expanded,
+                             "results": [{"score": float(score), "title": title, "url": url, "snippet": snippet}
+                                         for score, title, url, snippet in results]})
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class WorkerHTTPServer(HTTPServer):
+    """HTTPServer on an already listening (shared, non-blocking) socket"""
+
+    timeout = POLL_INTERVAL  # handle_request returns after this long without a connection
+
+    def __init__(self, listen_socket, search_engine, index_file, index_version=0, verbose=False):
+        super().__init__(listen_socket.getsockname()[:2], SearchRequestHandler, bind_and_activate=False)
+        self.socket.close()  # Replaced by the shared socket
+        self.socket = listen_socket
+        self.search_engine = search_engine
+        self.index_file = index_file
+        self.index_version = index_version
+        self.verbose = verbose
+
+    def server_close(self):
+        pass  # The shared socket belongs to SearchServer
+
+
+class SearchServer:
+    def __init__(self, index_file=INDEX_FILE, host="127.0.0.1", port=8080, workers=4):
+        self.index_file = index_file
+        self.num_workers = workers  # 0: answer requests in this process
+        self.thesaurus_file = None
+        self.synonym_weight = 1.0
+        self.pagerank_weight = 0.0
+        self.query_cache_size = 1024
+        self.verbose = False
+        self.search_engine = None
+        self.workers = {}  # pid -> generation (number of index loads) it serves
+        self.generation = 0
+        self.reload_requested = False
+        self.stop_requested = False
+
+        # Bound here, before forking, so every worker accepts on the same socket
+        self.socket = socket.create_server((host, port), backlog=128)
+        self.socket.setblocking(False)  # Workers that lose the race for a connection don't block in accept()
+        self.server_address = self.socket.getsockname()[:2]
+
+    def set_thesaurus(self, thesaurus_file, synonym_weight=1.0):
+        self.thesaurus_file = thesaurus_file
+        self.synonym_weight = synonym_weight
+
+    def set_pagerank_weight(self, weight):
+        """Share of PageRank in the scores of every worker (see SearchEngine.set_pagerank_weight)"""
+        self.pagerank_weight = weight
+
+    def set_query_cache(self, max_size):
+        """Size of every worker's query cache (0: off)"""
+        self.query_cache_size = max_size
+
+    def load_search_engine(self):
+        """A SearchEngine with the index file opened, or None if it can't be read"""
+        search_engine = SearchEngine("")
+        if self.thesaurus_file is not None:
+            search_engine.set_thesaurus(self.thesaurus_file)
+        search_engine.set_synonym_weight(self.synonym_weight)
+        search_engine.set_pagerank_weight(self.pagerank_weight)
+        search_engine.set_query_cache(self.query_cache_size)
+
+        try:
+            if search_engine.load_index(self.index_file) == 0:
+                return None
+        except (ValueError, KeyError) as e:
+            print("Error loading index " + self.index_file + ": " + str(e), file=sys.stderr)
+            return None
+
+        return search_engine
+
+    def serve_forever(self):
+        """Load the index, start the workers and supervise them until SIGTERM/SIGINT"""
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+        self.search_engine = self.load_search_engine()
+        if self.search_engine is None:
+            raise RuntimeError("Cannot serve: the index " + self.index_file + " could not be loaded")
+
+        print("Serving {} on http://{}:{} with {} (pid {}, kill -HUP {} reloads the index)".format(
+            self.index_file, self.server_address[0], self.server_address[1],
+            "{} worker processes".format(self.num_workers) if self.use_workers() else "this process",
+            os.getpid(), os.getpid()))
+        sys.stdout.flush()
+
+        try:
+            if self.use_workers():
+                self.supervise()
+            else:
+                self.serve_in_process()
+        finally:
+            self.socket.close()
+
+    def use_workers(self):
+        return self.num_workers > 0 and hasattr(os, "fork")
+
+    def request_stop(self, signum, frame):
+        self.stop_requested = True
+
+    def request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def supervise(self):
+        for _ in range(self.num_workers):
+            self.start_worker()
+
+        while not self.stop_requested:
+            time.sleep(POLL_INTERVAL)
+
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+
+            self.reap_workers()
+
+        # Let every worker finish its current query
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        for pid in list(self.workers):
+            os.waitpid(pid, 0)
+        self.workers.clear()
+
+    def reload(self):
+        """Hot swap: start workers on the new index, then stop the old ones gracefully"""
+        search_engine = self.load_search_engine()
+        if search_engine is None:
+            print("Index reload failed; still serving the previous index", file=sys.stderr)
+            return
+
+        old_workers = list(self.workers)
+        self.search_engine = search_engine
+        self.generation += 1
+        for _ in range(self.num_workers):
+            self.start_worker()
+
+        for pid in old_workers:
+            os.kill(pid, signal.SIGTERM)
+        print("Index reloaded: " + self.index_file)
+        sys.stdout.flush()
+
+    def reap_workers(self):
+        """Collect workers that exited; replace those that crashed while still current"""
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+
+            generation = self.workers.pop(pid, None)
+            if generation == self.generation and not self.stop_requested:
+                print("Worker {} exited unexpectedly (status {}); starting a new one".format(pid, status), file=sys.stderr)
+                self.start_worker()
+
+    def start_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self.run_worker()
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)  # Never return into the supervisor's code
+
+        self.workers[pid] = self.generation
+
+    def run_worker(self):
+        """Worker process: answer requests until SIGTERM, then finish the current one and exit"""
+        self.workers = {}
+        self.stop_requested = False
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the supervisor stops us
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        server = WorkerHTTPServer(self.socket, self.search_engine, self.index_file, self.generation, self.verbose)
+        while not self.stop_requested:
+            server.handle_request()
+
+    def serve_in_process(self):
+        """No worker processes: answer requests here, swapping the index between two requests"""
+        server = WorkerHTTPServer(self.socket, self.search_engine, self.index_file, self.generation, self.verbose)
+
+        while not self.stop_requested:
+            server.handle_request()
+
+            if self.reload_requested:
+                self.reload_requested = False
+                search_engine = self.load_search_engine()
+                if search_engine is None:
+                    print("Index reload failed; still serving the previous index", file=sys.stderr)
+                else:
+                    server.search_engine = self.search_engine = search_engine
+                    self.generation += 1
+                    server.index_version = self.generation
+                    print("Index reloaded: " + self.index_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP/JSON search service over an exported index")
+    parser.add_argument("-i", "--index",
+                        help="Index file exported by SearchEngine.py. (Default is " + INDEX_FILE + ")", required=False, default=INDEX_FILE)
+    parser.add_argument("--host",
+                        help="Address to listen on. (Default is 127.0.0.1)", required=False, default="127.0.0.1")
+    parser.add_argument("--port",
+                        help="Port to listen on, 0 for any free port. (Default is 8080)", required=False, default="8080")
+    parser.add_argument("-w", "--workers",
+                        help="Worker processes answering queries, 0 to answer them in the server process. (Default is 4)", required=False, default="4")
+    parser.add_argument("-t", "--thesaurus",
+                        help="Thesaurus file for query expansion. (Default is Input/thesaurus.csv)", required=False, default="Input/thesaurus.csv")
+    parser.add_argument("--synonym-weight",
+                        help="Weight (0-1) of thesaurus synonyms added to queries with too few results. (Default is 1.0)", required=False, default="1.0")
+    parser.add_argument("--pagerank-weight",
+                        help="Weight of PageRank (scaled to 0-1) added to the score of matching documents. (Default is 0, cosine similarity only)", required=False, default="0")
+    parser.add_argument("--query-cache",
+                        help="Query results kept in each worker's LRU cache, 0 to turn it off. (Default is 1024)", required=False, default="1024")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Log every request")
+
+    argument = parser.parse_args()
+
+    server = SearchServer(argument.index, argument.host, int(argument.port), int(argument.workers))
+    if argument.thesaurus:
+        server.set_thesaurus(argument.thesaurus, float(argument.synonym_weight))
+    server.set_pagerank_weight(float(argument.pagerank_weight))
+    server.set_query_cache(int(argument.query_cache))
+    server.verbose = argument.verbose
+
+    server.serve_forever()
@@ -0,0 +1,352 @@
+"""
+Document-partitioned index: the collection split into shards, searched by scatter-gather
+
+WHY?
+- One SearchEngine holds the whole index in one process, so index size and query CPU
+  are limited to one heap and one core
+- Here every document belongs to one of N shards (by a hash of its doc id). Each shard
+  is a complete, independent index file of its documents, and the shards are built in
+  parallel worker processes
+- A query is sent to every shard at once (scatter); each shard finds its own top k with
+  MaxScore and the k best of those are the answer (gather)
+
+IDENTICAL SCORES:
+    TF-IDF needs N and df of the whole collection, not of one shard. The shards are
+    counted first, their term statistics are added up, and every shard's document
+    vectors are then weighted with the collection's IDF. The query vector is built once,
+    by the coordinator, from the collection's vocabulary. Documents keep their global
+    (crawl order) number, so ties are broken the same way. PageRank is computed once over
+    the links of the whole collection, and each shard stores that of its documents.
+    Scores and rankings are exactly those of the unsharded SearchEngine, also with a
+    pagerank_weight.
+
+FILES (in one directory):
+    shard<i>.idx   index of shard i (IndexFile format), plus the global number and the
+                   (collection) PageRank of each document
+    global.idx     vocabulary and IDF of the collection, and the shard of every document
+
+Build from an exported crawl state and search:
+    python ShardedIndex.py --shards 4 --crawl-state Output/crawl_state.obj -o Output/shards
+    python ShardedIndex.py -o Output/shards -q "mystery book"
+"""
+import argparse                                          # Command-line options
+import contextlib                                        # Keep load_index messages of the shards quiet
+import hashlib                                           # Stable hash of doc ids (hash() changes per process)
+import heapq                                             # Merge the top k of every shard
+import io                                                # (redirected into a StringIO)
+import multiprocessing                                   # Build and search the shards in parallel
+import os                                                # Shard file names
+import numpy as np                                       # Collection statistics
+import IndexFile                                         # Index file format of the shards and the global file
+from InvertedIndex import InvertedIndex                  # Term counts of one shard
+from StemCache import StemCache                          # Stemming in the build workers
+from SearchEngine import SearchEngine                    # A shard is an ordinary index; the coordinator builds queries
+from WebCrawler import CRAWL_STATE_FILE                  # Crawl to build the shards from
+
+SHARDS_DIRECTORY = "Output/shards"  # Default location of the shard files
+GLOBAL_FILE = "global.idx"          # Collection statistics, next to the shards
+
+
+def shard_of(doc_id, num_shards):
+    """Shard a document belongs to: the same on every run and in every process"""
+    return int.from_bytes(hashlib.blake2b(str(doc_id).encode("utf-8"), digest_size=8).digest(), "little") % num_shards
+
+
+def shard_filename(directory, shard):
+    return os.path.join(directory, "shard%d.idx" % shard)
+
+
+class IndexShard(SearchEngine):
+    """
+    The index of one shard's documents, weighted with the IDF of the whole collection
+    (collection_size documents, collection_df per term of this shard)
+    """
+
+    def __init__(self, collection_size, collection_df, global_docs, pagerank):
+        super().__init__("")
+        self.collection_size = collection_size
+        self.collection_df = collection_df
+        self.global_docs = global_docs  # Global document number of every document of the shard
+        self.pagerank = pagerank  # PageRank of the shard's documents in the whole collection (saved with the index)
+
+    def compute_corpus_statistics(self):
+        self.N = self.index.num_docs  # Documents in this shard
+        self.df = self.collection_df
+        self.idf = np.log10(self.collection_size / self.df) if self.collection_size > 0 else np.zeros(0)
+
+    def index_sections(self):
+        meta, arrays, strings = super().index_sections()
+        arrays["global_docs"] = np.array(self.global_docs, dtype=np.int64)
+        return meta, arrays, strings
+
+
+def count_shard(store):
+    """Build worker: stem and count the documents of one shard (a DocumentStore)"""
+    stems = store.stem_vocabulary(StemCache().stem)
+    return InvertedIndex(store.keys(), store.stemmed(stems))
+
+
+def write_shard(filename, index, store, titles, urls, global_docs, collection_size, collection_df, pagerank, meta):
+    """Build worker: document vectors of one shard with the collection's statistics, written to filename"""
+    shard = IndexShard(collection_size, collection_df, global_docs, pagerank)
+    shard.seed_url, shard.domain_url, shard.stop_words = meta
+    shard.index = index
+    shard.all_terms = index.terms
+    shard.doc_words = store
+    shard.doc_titles = titles
+    shard.doc_urls = urls
+
+    shard.compute_document_vectors()
+    shard.save_index(filename)
+
+
+def build_shards(search_engine, num_shards, directory=SHARDS_DIRECTORY, processes=None):
+    """
+    Split the crawled documents of search_engine into num_shards index files in directory
+
+    1. Partition: every document goes to shard_of(doc_id); documents keep their crawl order
+    2. Count (in parallel): each shard stems and counts its own documents
+    3. Add up the term statistics of all shards: N and df of the whole collection
+    4. Weight (in parallel): each shard computes its document vectors with them and is written
+    PageRank needs every link, so it is computed here over the whole collection
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    doc_ids = list(search_engine.doc_words.keys())  # Crawl order: the global document numbers
+    shard_docs = [[] for _ in range(num_shards)]
+    for doc, doc_id in enumerate(doc_ids):
+        shard_docs[shard_of(doc_id, num_shards)].append(doc)
+
+    stores = [search_engine.doc_words.subset([doc_ids[doc] for doc in docs]) for docs in shard_docs]
+    meta = (search_engine.seed_url, search_engine.domain_url, list(search_engine.stop_words))
+
+    rank = search_engine.build_link_graph(doc_ids).pagerank()
+    pagerank = rank / rank.max() if len(rank) > 0 else rank  # Scaled like SearchEngine.compute_pagerank
+
+    with multiprocessing.Pool(processes) as pool:
+        indexes = pool.map(count_shard, stores)
+
+        # Collection vocabulary and statistics: every shard's counts added up
+        terms = sorted(set(term for index in indexes for term in index.terms))
+        positions = {term: i for i, term in enumerate(terms)}
+        shard_terms = [np.array([positions[term] for term in index.terms], dtype=np.int64) for index in indexes]
+        df = np.zeros(len(terms), dtype=np.int64)
+        for term_ids, index in zip(shard_terms, indexes):
+            df[term_ids] += index.term_frequencies()
+
+        pool.starmap(write_shard, [(shard_filename(directory, shard), index, store,
+                                    {doc_id: search_engine.doc_titles[doc_id] for doc_id in store.keys()},
+                                    {doc_id: search_engine.doc_urls[doc_id] for doc_id in store.keys()},
+                                    docs, len(doc_ids), df[term_ids], pagerank[docs], meta)
+                                   for shard, (index, store, docs, term_ids)
+                                   in enumerate(zip(indexes, stores, shard_docs, shard_terms))])
+
+    # Which shards have a word in some title (query cache keys need to know the title words)
+    title_shards = {}
+    for shard, docs in enumerate(shard_docs):
+        for doc in docs:
+            for word in set(search_engine.doc_titles[doc_ids[doc]].lower().split()):
+                title_shards.setdefault(word, set()).add(shard)
+    title_words = sorted(title_shards)
+
+    doc_shard = np.zeros(len(doc_ids), dtype=np.int64)
+    doc_local = np.zeros(len(doc_ids), dtype=np.int64)
+    for shard, docs in enumerate(shard_docs):
+        doc_shard[docs] = shard
+        doc_local[docs] = np.arange(len(docs))
+
+    IndexFile.write_index(os.path.join(directory, GLOBAL_FILE),
+                          {"seed_url": search_engine.seed_url, "domain_url": search_engine.domain_url,
+                           "stop_words": list(search_engine.stop_words), "num_docs": len(doc_ids),
+                           "num_shards": num_shards},
+                          {"df": df, "idf": np.log10(len(doc_ids) / df) if doc_ids else np.zeros(0),
+                           "doc_shard": doc_shard, "doc_local": doc_local,
+                           "title_shards.indptr": np.cumsum([0] + [len(title_shards[word]) for word in title_words]),
+                           "title_shards.shards": np.array([s for word in title_words for s in sorted(title_shards[word])],
+                                                           dtype=np.int64)},
+                          {"terms": terms, "title_words": title_words})
+
+
+# In every query worker process: [(SearchEngine of the shard, global number of each of its documents)]
+shards = None
+
+
+def open_shards(directory, num_shards):
+    """Query worker initializer: memory-map every shard (the OS shares the pages between workers)"""
+    global shards
+    shards = []
+
+    for shard in range(num_shards):
+        filename = shard_filename(directory, shard)
+        search_engine = SearchEngine("")
+        with contextlib.redirect_stdout(io.StringIO()):
+            search_engine.load_index(filename)
+        shards.append((search_engine, IndexFile.IndexReader(filename).array("global_docs")))
+
+
+def shard_query(shard, terms, weights, title_words):
+    """A query vector of the collection's vocabulary in the shard's term ids (its terms missing here can't match)"""
+    search_engine, global_docs = shards[shard]
+
+    term_ids, shard_weights = [], []
+    for term, weight in zip(terms, weights):
+        term_id = search_engine.index.term_id(term)
+        if term_id is not None:
+            term_ids.append(term_id)
+            shard_weights.append(weight)
+
+    return (search_engine, global_docs, np.array(term_ids, dtype=np.int64), np.array(shard_weights),
+            search_engine.title_boosts(title_words))
+
+
+def count_shard_matches(shard, terms, weights, title_words, at_least):
+    """Query worker: SearchEngine.num_matches on one shard"""
+    search_engine, _, term_ids, weights, title_boosts = shard_query(shard, terms, weights, title_words)
+    return search_engine.count_matches(term_ids, weights, title_boosts, at_least)
+
+
+def top_k_shard(shard, terms, weights, title_words, k, pagerank_weight):
+    """Query worker: the top k of one shard as [(score, global document number)], and its scored/skipped counts"""
+    search_engine, global_docs, term_ids, weights, title_boosts = shard_query(shard, terms, weights, title_words)
+    search_engine.pagerank_weight = pagerank_weight  # The coordinator's setting, with the shard's PageRank
+    scores = search_engine.top_k_documents(term_ids, weights, title_boosts, k)
+    return [(score, int(global_docs[doc])) for doc, score in scores.items()], search_engine.last_query_stats
+
+
+class ShardedStrings:
+    """Read-only list of one string per document (titles, URLs, ...) read from the shard files"""
+
+    def __init__(self, tables, doc_shard, doc_local):
+        self.tables = tables
+        self.doc_shard = doc_shard
+        self.doc_local = doc_local
+
+    def __len__(self):
+        return len(self.doc_shard)
+
+    def __getitem__(self, doc):
+        return self.tables[self.doc_shard[doc]][self.doc_local[doc]]
+
+
+class ShardedSearchEngine(SearchEngine):
+    """
+    Coordinator: builds query vectors from the collection's vocabulary and IDF, and has
+    a pool of worker processes search all shards for them. Query expansion, the query
+    cache and result formatting are those of SearchEngine
+    """
+
+    def __init__(self, processes=None):
+        super().__init__("")
+        self.processes = processes  # Query worker processes (None: one per CPU)
+        self.num_shards = None
+        self.pool = None
+
+    def load_index(self, directory=SHARDS_DIRECTORY):
+        """Open the collection statistics and start the query workers, which open the shards"""
+        self.close()
+        self.index_version += 1
+
+        reader = IndexFile.IndexReader(os.path.join(directory, GLOBAL_FILE))
+        meta = reader.meta
+
+        self.seed_url = meta["seed_url"]
+        self.domain_url = meta["domain_url"]
+        self.stop_words = meta["stop_words"]
+        self.num_shards = meta["num_shards"]
+
+        terms = reader.strings("terms")
+        self.index = InvertedIndex.from_arrays([], terms, None, reader.array("df"))  # Vocabulary lookups only
+        self.all_terms = terms
+        self.N = meta["num_docs"]
+        self.df = reader.array("df")
+        self.idf = reader.array("idf")
+        self.title_index = IndexFile.PostingsTable(reader.strings("title_words"), reader.array("title_shards.indptr"),
+                                                   reader.array("title_shards.shards"))
+
+        shard_readers = [IndexFile.IndexReader(shard_filename(directory, shard)) for shard in range(self.num_shards)]
+        doc_shard, doc_local = reader.array("doc_shard"), reader.array("doc_local")
+        self.result_titles, self.result_urls, self.result_snippets = [
+            ShardedStrings([shard_reader.strings(name) for shard_reader in shard_readers], doc_shard, doc_local)
+            for name in ("titles", "urls", "snippets")]
+
+        self.pool = multiprocessing.Pool(self.processes, initializer=open_shards, initargs=(directory, self.num_shards))
+
+    def close(self):
+        """Stop the query workers"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def scatter(self, function, user_query, expanded, *args):
+        """Run function(shard, terms, weights, title words, *args) on every shard in parallel"""
+        term_ids, weights, title_words = self.query_vector(user_query, expanded)
+        terms = [self.all_terms[term_id] for term_id in term_ids.tolist()]
+
+        return self.pool.starmap(function, [(shard, terms, weights.tolist(), title_words) + args
+                                            for shard in range(self.num_shards)])
+
+    def num_matches(self, user_query, at_least):
+        # Every document is in exactly one shard: the counts add up
+        return sum(self.scatter(count_shard_matches, user_query, False, at_least))
+
+    def top_k_scores(self, user_query, k, expanded=False):
+        """The k best of the shards' top k: {global document number: score}"""
+        results = self.scatter(top_k_shard, user_query, expanded, k, self.pagerank_weight)
+
+        best = heapq.nlargest(k, ((score, -doc) for scores, _ in results for score, doc in scores))
+        self.last_query_stats = {"documents": self.N, "scored": sum(stats["scored"] for _, stats in results),
+                                 "skipped": sum(stats["skipped"] for _, stats in results)}
+        return {-negative_doc: score for score, negative_doc in best}
+
+    def process_queries(self, user_queries, k=6, query_expanded=False):
+        """One scatter-gather per query: the shards of a query are searched in parallel"""
+        return [self.process_query(user_query, k, query_expanded) for user_query in user_queries]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a sharded index from a crawl, or search one")
+    parser.add_argument("-n", "--shards",
+                        help="Build this many shards from the crawl state (Default is to only search)", required=False, default=None)
+    parser.add_argument("--crawl-state",
+                        help="Crawl state exported by SearchEngine.py. (Default is " + CRAWL_STATE_FILE + ")", required=False, default=CRAWL_STATE_FILE)
+    parser.add_argument("-s", "--stopwords",
+                        help="Stop words file, for the shards' queries. (Default is Input/stopwords.txt)", required=False, default="Input/stopwords.txt")
+    parser.add_argument("-o", "--directory",
+                        help="Directory of the shard files. (Default is " + SHARDS_DIRECTORY + ")", required=False, default=SHARDS_DIRECTORY)
+    parser.add_argument("-w", "--workers",
+                        help="Worker processes building or searching the shards. (Default is one per CPU)", required=False, default=None)
+    parser.add_argument("-t", "--thesaurus",
+                        help="Thesaurus file for query expansion. (Default is Input/thesaurus.csv)", required=False, default="Input/thesaurus.csv")
+    parser.add_argument("-q", "--query", action="append",
+                        help="Search the shards for this query (can be repeated)", required=False, default=[])
+    parser.add_argument("-k",
+                        help="Number of results per query. (Default is 6)", required=False, default="6")
+    parser.add_argument("--pagerank-weight",
+                        help="Weight of PageRank (scaled to 0-1) added to the score of matching documents. (Default is 0, cosine similarity only)", required=False, default="0")
+
+    argument = parser.parse_args()
+    workers = int(argument.workers) if argument.workers is not None else None
+
+    if argument.shards is not None:
+        crawl = SearchEngine("")
+        if crawl.load_crawl_state(argument.crawl_state) == 0:
+            raise SystemExit(1)
+        if argument.stopwords:
+            crawl.set_stop_words(argument.stopwords)
+        build_shards(crawl, int(argument.shards), argument.directory, workers)
+        print("Built {} shards of {} documents in {}".format(argument.shards, len(crawl.doc_words), argument.directory))
+
+    if argument.query:
+        search_engine = ShardedSearchEngine(workers)
+        if argument.thesaurus:
+            search_engine.set_thesaurus(argument.thesaurus)
+        search_engine.set_pagerank_weight(argument.pagerank_weight)
+        search_engine.load_index(argument.directory)
+
+        for query in argument.query:
+            print("\n" + query)
+            for score, title, url, snippet in search_engine.process_query(query, int(argument.k)):
+                print("  [" + score + "]  " + title + " (" + url + ")")
+
+        search_engine.close()
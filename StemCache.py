@@ -0,0 +1,45 @@
+from nltk.stem import PorterStemmer  # Stemming algorithm to reduce words to root form (running -> run)
+
+
+class StemCache:
+    """
+    Porter stemmer with a bounded memo of previous results
+
+    Natural language is very repetitive (a few hundred words make up most of any text),
+    so most stem() calls ask for a word we have already stemmed. The Porter algorithm
+    is slow pure Python, while a dictionary lookup is nearly free.
+
+    The cache holds at most `max_size` words; when full, the oldest entry is dropped.
+    One instance is shared by indexing (build_frequency_matrix) and querying (process_query).
+    """
+
+    def __init__(self, max_size=100000):
+        self.stemmer = PorterStemmer()
+        self.max_size = max_size
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stem(self, word):
+        stemmed = self.cache.get(word)
+
+        if stemmed is not None:
+            self.hits += 1
+            return stemmed
+
+        self.misses += 1
+        stemmed = self.stemmer.stem(word)
+
+        if len(self.cache) >= self.max_size:
+            del self.cache[next(iter(self.cache))]  # Dicts keep insertion order: first key is the oldest
+        self.cache[word] = stemmed
+
+        return stemmed
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __str__(self):
+        return "Stem cache: {} hits, {} misses ({:.1%} hit rate), {} words cached".format(
+            self.hits, self.misses, self.hit_rate(), len(self.cache))
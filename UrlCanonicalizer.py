@@ -0,0 +1,106 @@
+"""
+URL canonicalization: one spelling for every URL that names the same page
+
+Without it, /a, /a#top, /A/../a and /a?utm_source=mail are all crawled (and indexed)
+as different pages. canonicalize() rewrites a URL the way RFC 3986 (section 6) allows
+without changing what it refers to, and drops parameters that only track the visitor:
+
+    HTTP://Example.COM:80/a/./b/../c?utm_source=x&id=7#part
+    -> http://example.com/a/c?id=7
+
+A trailing slash is kept: /docs and /docs/ are different URLs, and relative links on
+the page are resolved against the directory it names.
+"""
+import re                      # Percent-escape normalization
+import urllib.parse            # Split and reassemble URLs
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters added by analytics, ad networks and session handling, not by the page itself
+TRACKING_PARAMETERS = {"gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+                       "_ga", "_gl", "phpsessid", "jsessionid"}
+TRACKING_PREFIXES = ("utm_",)
+
+UNRESERVED = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+PERCENT_ESCAPE = re.compile(r"%([0-9a-fA-F]{2})")
+
+
+def normalize_escapes(text):
+    """%7e -> ~ (unreserved characters need no escaping), other escapes in upper case: %2f -> %2F"""
+    def replace(match):
+        character = chr(int(match.group(1), 16))
+        return character if character in UNRESERVED else match.group().upper()
+
+    return PERCENT_ESCAPE.sub(replace, text)
+
+
+def remove_dot_segments(path):
+    """Resolve "." and ".." path segments (RFC 3986, section 5.2.4): /a/./b/../c -> /a/c"""
+    segments = path.split("/")
+    output = []
+
+    for segment in segments:
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+
+    # "/a/b/.." names the directory /a/, so keep its trailing slash
+    if segments[-1] in (".", ".."):
+        output.append("")
+
+    return "/".join(output)
+
+
+def is_tracking_parameter(name):
+    name = name.lower()
+    return name in TRACKING_PARAMETERS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize(url):
+    """Canonical form of an absolute URL (returned unchanged if it cannot be parsed)"""
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+
+    # Host names are case-insensitive; the default port of the scheme is left out
+    netloc = (parts.hostname or "").lower()
+    if ":" in netloc:
+        netloc = "[" + netloc + "]"  # IPv6 address
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc += ":" + str(port)
+    if parts.username is not None:
+        userinfo = parts.username + (":" + parts.password if parts.password is not None else "")
+        netloc = userinfo + "@" + netloc
+
+    path = remove_dot_segments(normalize_escapes(parts.path)) or "/"
+
+    query = "&".join(parameter for parameter in normalize_escapes(parts.query).split("&")
+                     if parameter and not is_tracking_parameter(parameter.split("=", 1)[0]))
+
+    # The fragment (#part) is never sent to the server - it is the same page
+    return urllib.parse.urlunsplit((scheme, netloc, path, query, ""))
+
+
+class UrlScope:
+    """
+    Which URLs belong to the crawl: same scheme and host as the seed, and a path inside
+    the seed's path. Unlike a substring test, http://example.com.evil.org/ or
+    http://other.org/?from=http://example.com are not in scope of http://example.com
+    """
+
+    def __init__(self, seed_url):
+        seed = urllib.parse.urlsplit(canonicalize(seed_url))
+        self.scheme = seed.scheme
+        self.netloc = seed.netloc
+        self.path = seed.path.rstrip("/")  # "" for a whole site, "/~user" for a directory
+
+    def __contains__(self, url):
+        parts = urllib.parse.urlsplit(url)
+        return parts.scheme == self.scheme and parts.netloc == self.netloc and \
+            (parts.path == self.path or parts.path.startswith(self.path + "/"))
@@ -1,46 +1,132 @@
 import urllib.request          # HTTP client for sending GET requests and fetching web pages
-from bs4 import BeautifulSoup  # HTML parser to extract text and links from web pages
+import urllib.parse            # Extract the host of a URL for per-host crawl delays
 import sys                     # System utilities for error handling and max integer values
-import re                      # Regular expressions for URL validation and text tokenization
-import urllib.parse            # URL manipulation - converts relative URLs to absolute URLs
-import hashlib                 # SHA-256 hashing for duplicate content detection
-import string                  # Punctuation constants for text cleaning
-import codecs                  # Character encoding/decoding for handling special characters
-from nltk.stem import PorterStemmer  # Stemming algorithm to reduce words to root form (running -> run)
+import re                      # Regular expressions for URL validation
+import pickle                  # Saves/loads the crawl state needed for incremental re-crawls
+import time                    # Backoff pauses between fetch retries and crawl-delay pauses
+import contextlib              # Stage timer that does nothing when metrics are off
+import itertools               # Peek at the head of the frontier without copying it
+import asyncio                 # Event loop driving the concurrent crawl mode
+import http.client             # Low-level HTTP exceptions (e.g. connection dropped mid-response)
+from array import array        # Link graph edges as 8-byte URL fingerprints while crawling
+import numpy as np             # Maps the recorded edges to document numbers in one pass
+from StemCache import StemCache      # Porter stemming with a bounded memo of previous results
+from AsyncFetcher import AsyncFetcher  # Concurrent fetching with per-host politeness
+from PageParser import PageParser, ParserPool  # HTML parsing/tokenizing, optionally in worker processes
+from InvertedIndex import InvertedIndex  # Sparse term -> postings index
+from DocumentStore import DocumentStore  # Crawled words as term-id arrays over a shared vocabulary
+from Frontier import UrlFrontier, DiskSpillingFrontier, PriorityFrontier, OrderedSet, FingerprintSet, BloomFilter, url_fingerprint  # Frontier and compact seen-URL sets
+from UrlCanonicalizer import canonicalize, UrlScope  # One spelling per URL, host/path scope check
+from Checkpoint import CrawlCheckpoint  # Append-only crawl log for resuming after a crash
+from NearDuplicates import NearDuplicateDetector  # MinHash/LSH detection of almost-identical pages
+from Robots import RobotsCache, USER_AGENT  # RFC 9309 robots.txt rules, cached per host
+from Metrics import Metrics  # Optional per-stage timings, counters and histograms
+from LinkGraph import LinkGraph  # Links between indexed documents as a CSR graph, PageRank
+
+
+# Network failures that mark a URL as broken: HTTP errors, DNS/connection errors, timeouts
+FETCH_ERRORS = (urllib.error.URLError, http.client.HTTPException, OSError)
+
+RETRY_BACKOFF = 0.5  # Seconds to wait before the first retry, doubled on every further attempt
+
+# URL syntax check used by url_is_valid, compiled once instead of for every link
+URL_PATTERN = re.compile(
+    r'^(?:http|ftp)s?://'
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|'
+    r'localhost|'
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+    r'(?::\d+)?'
+    r'(?:/?|[/?]\S+)$',
+    re.IGNORECASE)
+
+NOT_MODIFIED = None  # Content returned by fetch_page for "304 Not Modified" on a conditional request
+
+CRAWL_STATE_FILE = "Output/crawl_state.obj"  # Default location of the saved crawl state
+
+CHECKPOINT_FILE = "Output/crawl_checkpoint.db"  # Default location of the crawl checkpoint log
+
+# Attributes saved with the crawl state - everything recrawl() needs besides the index
+CRAWL_STATE = ["seed_url", "domain_url", "visited_urls", "page_links", "link_sources", "link_targets",
+               "http_validators", "doc_urls", "doc_titles", "doc_words"]
 
 
 class WebCrawler:
     def __init__(self, seed_url):
         self.seed_url = seed_url
         self.domain_url = "/".join(self.seed_url.split("/")[:3])  # Extract base domain like http://example.com
-        self.robots_txt = None
+        self.robots = RobotsCache()  # robots.txt rules of every host, downloaded once per host
         self.stop_words_file = None
         self.page_limit = None
         self.stop_words = []
-        self.url_frontier = []  # FIFO queue for BFS traversal - URLs waiting to be crawled
+        self.frontier_memory_limit = None  # If set, queued URLs beyond this count are spilled to disk
+        self.scheduler = None  # If set, settings of a PriorityFrontier (per-host priority queues) instead of BFS
+        self.url_frontier = UrlFrontier()  # FIFO queue for BFS traversal - URLs waiting to be crawled
+        self.url_scope = UrlScope(seed_url)  # Same host as the seed, path below the seed's path
+        self.bloom_filter_capacity = None  # If set, seen URLs are kept in a Bloom filter of this capacity
+        self.seen_urls = FingerprintSet()  # Every URL ever queued (canonical form), 8 bytes per URL
+        self.link_stats = {"links": 0, "canonicalized": 0}  # Links found / other spellings of a known URL
         self.visited_urls = {}  # Tracks what we've seen to avoid infinite loops
-        self.outgoing_urls = []
-        self.broken_urls = []
+        self.outgoing_urls = OrderedSet()  # Ordered sets: O(1) "already seen?" checks, report keeps discovery order
+        self.broken_urls = OrderedSet()
         self.graphic_urls = []
         self.all_terms = []
-        self.frequency_matrix = []  # Rows = terms, Columns = documents
+        self.index = None  # InvertedIndex: term -> postings of (document, term frequency)
+        self.stem_cache = StemCache()  # Shared by indexing and query processing
         self.num_pages_crawled = 0
         self.num_pages_indexed = 0
 
+        # Fetch settings - concurrency 1 keeps the classic one-page-at-a-time crawl
+        self.concurrency = 1
+        self.per_host_limit = 4     # Max simultaneous connections to one host
+        self.crawl_delay = None     # Seconds between requests to one host (default: robots.txt Crawl-delay)
+        self.host_next_start = {}   # Host -> earliest time the next request may start (sequential crawl)
+        self.fetch_timeout = 10     # Seconds before an HTTP request is abandoned
+        self.fetch_retries = 2      # Extra attempts for timeouts and 5xx errors
+
+        # Parse settings - 0 workers parses in the crawl loop itself
+        self.parse_workers = 0
+        self.parse_window = None    # Max pages fetched ahead of the crawl loop (default 2 per worker)
+
+        # Distributed settings - 0 crawls in this process (see DistributedCrawl.py)
+        self.distributed_workers = 0
+        self.partition = "host"     # Which worker owns a URL: by hash of its "host" or of the whole "url"
+        self.distributed_listen = None   # (host, port) remote workers connect to (None: start local workers)
+        self.distributed_authkey = None  # Shared secret of remote workers (bytes)
+
         """
         These attributes store data only for indexable documents (.txt, .htm, .html, .php)
         We separate this because images/PDFs don't contribute to the search index
         """
         self.duplicate_urls = {}  # SHA-256 hash maps to list of URLs with identical content
+        self.near_duplicates = None  # NearDuplicateDetector, if near-duplicate pages should not be indexed
+        self.near_duplicate_urls = {}  # doc_id of the indexed page -> [(near-duplicate URL, similarity)]
         self.doc_urls = {}
         self.doc_titles = {}
-        self.doc_words = {}
+        self.doc_words = DocumentStore()
+
+        # Kept for incremental re-crawls: HTTP cache validators and the links of every indexed page
+        self.http_validators = {}  # URL -> (ETag, Last-Modified) from the last response
+        self.page_links = {}  # URL -> links found on that page
+
+        # Link graph edges, recorded as pages are stored: URL fingerprints of each in-scope link
+        self.link_sources = array("Q")
+        self.link_targets = array("Q")
+        self.previous_crawl = None  # During recrawl(): the pages, links and words of the previous crawl
+        self.recrawl_stats = None
+
+        self.checkpoint = None  # CrawlCheckpoint: logs every fetched page so a dead crawl can be resumed
+
+        self.metrics = None  # Metrics: where the time goes, stage by stage (None: not instrumented)
+        self.crawl_start = None
 
     def __str__(self):
         """Generate a human-readable crawl report showing statistics and discovered URLs"""
         report = "\nPages crawled: " + str(self.num_pages_crawled) \
                  + "\nPages indexed: " + str(self.num_pages_indexed) \
-                 + "\nVisited URLs: " + str(len(self.visited_urls))
+                 + "\nVisited URLs: " + str(len(self.visited_urls)) \
+                 + "\nURLs deduplicated by canonicalization: {} of {} links ({:.1%})".format(
+                     self.link_stats["canonicalized"], self.link_stats["links"],
+                     self.link_stats["canonicalized"] / self.link_stats["links"] if self.link_stats["links"] else 0)
 
         # Only show URL lists if they contain items
         if self.outgoing_urls:
@@ -67,51 +153,146 @@ class WebCrawler:
         else:
             report += "\n\nDuplicate URLs: None"
 
+        if self.near_duplicates is not None:
+            if self.near_duplicate_urls:
+                report += "\n\nNear-Duplicate URLs (not indexed, similarity >= " + str(self.near_duplicates.threshold) + "):"
+                for doc_id, near_duplicates in self.near_duplicate_urls.items():
+                    report += "\n  +  " + self.doc_urls[doc_id]
+                    for url, similarity in near_duplicates:
+                        report += "\n      +  " + url + " ({:.2f})".format(similarity)
+            else:
+                report += "\n\nNear-Duplicate URLs: None"
+
         return report
 
     def get_robots_txt(self):
         """
+        The robots.txt rules of the seed's host (see Robots.py)
+
         WHAT IS ROBOTS.TXT?
         - A text file placed at website root (e.g., google.com/robots.txt)
         - Website owners use it to tell crawlers which pages they can/cannot access
-        - It's a voluntary protocol - crawlers choose to respect it (ethical crawling)
         - Format: "Disallow: /private/" means don't crawl the /private/ folder
         - Defined in RFC 9309 (Robots Exclusion Protocol)
+        """
+        return self.robots.rules(self.seed_url + "/")
+
+    def set_page_limit(self, limit):
+        self.page_limit = int(limit)
 
-        Example robots.txt:
-            User-agent: *
-            Disallow: /admin/
-            Allow: /public/
+    def set_concurrency(self, concurrency, per_host_limit=None):
+        """Number of pages fetched in parallel; more than 1 switches crawl() to the asyncio engine"""
+        self.concurrency = max(1, int(concurrency))
+        if per_host_limit is not None:
+            self.per_host_limit = max(1, int(per_host_limit))
 
-        Returns dict with 'Allowed' and 'Disallowed' URL lists
+    def set_parse_workers(self, workers, window=None):
         """
-        result_data_set = {"Disallowed": [], "Allowed": []}
+        Number of worker processes parsing pages; more than 0 switches crawl() to the asyncio engine
+        `window` bounds how many fetched pages may wait for the crawl loop (memory back-pressure)
+        """
+        self.parse_workers = max(0, int(workers))
+        self.parse_window = max(1, int(window)) if window is not None else None
 
-        try:
-            result = urllib.request.urlopen(self.seed_url + "/robots.txt").read()
-
-            for line in result.decode("utf-8").split('\n'):
-                if line.startswith("Allow"):
-                    result_data_set["Allowed"].append(
-                        self.seed_url + line.split(": ")[1].split('\r')[0]
-                    )
-                elif line.startswith("Disallow"):
-                    result_data_set["Disallowed"].append(
-                        self.seed_url + line.split(": ")[1].split('\r')[0]
-                    )
-
-        except urllib.error.HTTPError as e:
-            if e.code == 404:
-                print("Note: No robots.txt found. Proceeding with no restrictions.")
-            else:
-                print(f"Warning: Could not fetch robots.txt (HTTP {e.code}). Proceeding with no restrictions.")
-        except Exception as e:
-            print(f"Warning: Error reading robots.txt: {e}. Proceeding with no restrictions.")
+    def set_distributed(self, workers, partition="host", listen=None, authkey=None):
+        """
+        Number of worker processes sharing the crawl; more than 0 switches crawl() to the
+        distributed mode, where each worker owns the URLs whose hash (of the URL or its host)
+        maps to it (see DistributedCrawl.py)
+        Partitioning by "url" spreads the pages of one host over all workers, so it is only
+        used when no crawl delay applies: each worker paces just its own requests
+        With listen=(host, port), the workers are not started here: they connect from other
+        nodes with `python DistributedCrawl.py --connect HOST:PORT --authkey KEY`
+        """
+        if partition not in ("url", "host"):
+            raise ValueError("Unknown partition: " + str(partition))
+        if listen is not None and not authkey:
+            raise ValueError("Workers connecting to " + str(listen) + " need an authkey")
+        self.distributed_workers = max(0, int(workers))
+        self.partition = partition
+        self.distributed_listen = listen
+        self.distributed_authkey = authkey
+
+    def set_near_duplicate_threshold(self, threshold):
+        """
+        Don't index pages whose words are at least `threshold` similar (0..1, Jaccard)
+        to a page indexed earlier; they are reported as near-duplicates of that page
+        """
+        self.near_duplicates = NearDuplicateDetector(float(threshold))
+
+    def set_crawl_delay(self, seconds):
+        """Fixed pause between requests to one host, instead of the robots.txt Crawl-delay"""
+        self.crawl_delay = float(seconds)
+
+    def host_crawl_delay(self, url):
+        """Seconds to wait between two requests to the host of url"""
+        if self.crawl_delay is not None:
+            return self.crawl_delay
+        return self.robots.crawl_delay(url) or 0
+
+    def wait_for_host(self, url):
+        """Sequential crawl: sleep until the crawl delay since the last request to this host has passed"""
+        delay = self.host_crawl_delay(url)
+        if not delay:
+            return
+
+        host = urllib.parse.urlsplit(url).netloc
+        now = time.monotonic()
+        start = max(now, self.host_next_start.get(host, now))
+        self.host_next_start[host] = start + delay
+        time.sleep(start - now)
+
+    def set_frontier_memory_limit(self, limit):
+        """For very large crawls: keep at most `limit` queued URLs in RAM and spill the rest to disk"""
+        self.frontier_memory_limit = int(limit)
+        self.url_frontier = self.new_frontier()
+
+    def set_checkpoint(self, filename=CHECKPOINT_FILE, resume=False, interval=50):
+        """
+        Log crawl progress to `filename`; with resume=True, pages already logged there
+        (by a crawl of the same seed URL) are replayed instead of downloaded again
+        The log of an earlier crawl is only replaced once a new crawl starts
+        """
+        self.checkpoint = CrawlCheckpoint(filename, self.seed_url, resume, interval)
 
-        return result_data_set
+    def set_metrics(self, metrics=None):
+        """Turn on instrumentation (see Metrics.py); pass a Metrics to share it or to add hooks first"""
+        self.metrics = metrics if metrics is not None else Metrics()
 
-    def set_page_limit(self, limit):
-        self.page_limit = int(limit)
+    def stage_timer(self, stage):
+        """with self.stage_timer("name"): ... adds the block's wall time to the metrics, if they are on"""
+        return self.metrics.timer(stage) if self.metrics is not None else contextlib.nullcontext()
+
+    def set_bloom_filter(self, capacity, error_rate=0.001):
+        """
+        For huge crawls: remember seen URLs in a Bloom filter (about 1.8 bytes per URL)
+        instead of 64-bit fingerprints; about `error_rate` of new URLs are wrongly skipped
+        """
+        self.bloom_filter_capacity = int(capacity)
+        self.bloom_filter_error_rate = float(error_rate)
+        self.seen_urls = self.new_seen_urls()
+
+    def new_seen_urls(self):
+        if self.bloom_filter_capacity is not None:
+            return BloomFilter(self.bloom_filter_capacity, self.bloom_filter_error_rate)
+        return FingerprintSet()
+
+    def set_scheduler(self, policy="bfs", host_selection="round-robin", pattern_weights=None, host_rate=1.0, host_burst=1.0):
+        """
+        Crawl order: per-host priority queues instead of one BFS queue (see PriorityFrontier)
+        policy "depth", "inlinks" or "pattern" spends the page limit on the most valuable pages
+        first; pattern_weights maps regular expressions to weights, e.g. {"/catalogue/": 2}
+        """
+        self.scheduler = {"policy": policy, "host_selection": host_selection, "pattern_weights": pattern_weights,
+                          "host_rate": host_rate, "host_burst": host_burst}
+        self.url_frontier = self.new_frontier()
+
+    def new_frontier(self):
+        if self.scheduler is not None:
+            return PriorityFrontier(**self.scheduler)  # Kept in memory: the frontier memory limit is for BFS
+        if self.frontier_memory_limit is not None:
+            return DiskSpillingFrontier(self.frontier_memory_limit)
+        return UrlFrontier()
 
     def set_stop_words(self, filepath):
         """Load stopwords from file - these common words (the, is, a) add noise to search results"""
@@ -135,28 +316,18 @@ class WebCrawler:
         Validates URL structure against RFC 3986 using regex
         Checks for proper scheme (http/https), valid domain format, and optional port/path
         """
-        pattern = re.compile(
-            r'^(?:http|ftp)s?://'
-            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|'
-            r'localhost|'
-            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-            r'(?::\d+)?'
-            r'(?:/?|[/?]\S+)$',
-            re.IGNORECASE)
-
-        return bool(pattern.match(url_string))
+        return bool(URL_PATTERN.match(url_string))
 
     def word_is_valid(self, word):
         """
         A valid word starts with a letter and ends with letter/digit
         This filters out garbage tokens like punctuation-only strings
         """
-        pattern = re.compile(r'^[a-zA-z](\S*)[a-zA-z0-9]$')
-        return bool(pattern.match(word))
+        return PageParser.word_is_valid(word)
 
     def url_is_within_scope(self, url_string):
         """Keep crawler focused on the target domain - don't wander off to external sites"""
-        return self.seed_url in url_string
+        return url_string in self.url_scope
 
     def produce_duplicates(self):
         """
@@ -171,6 +342,36 @@ class WebCrawler:
 
         self.duplicate_urls = {docID: urls for docID, urls in duplicates.items() if len(urls) > 1}
 
+    def url_is_allowed(self, url_string):
+        """robots.txt check: the longest matching Allow/Disallow rule of the URL's host decides"""
+        return self.robots.allowed(url_string)
+
+    def crawl_should_continue(self):
+        """Keep crawling while URLs remain in the frontier and the page limit is not reached"""
+        return self.url_frontier and (self.page_limit is None or self.num_pages_indexed < self.page_limit)
+
+    def begin_crawl(self):
+        """Fetch robots.txt and seed the frontier - shared start of every crawl mode"""
+        print("robots.txt: " + str(self.get_robots_txt()) + "\n")
+
+        self.crawl_start = time.perf_counter()
+        if self.checkpoint is not None:
+            self.checkpoint.begin()
+
+        seed = canonicalize(self.seed_url + "/")
+        self.seen_urls.add(seed)
+        self.url_frontier.append(seed)
+
+    def end_crawl(self):
+        """Write out the rest of the checkpoint log - shared end of every crawl mode, also after an error"""
+        if self.metrics is not None:
+            self.metrics.increment("stage_seconds_total", time.perf_counter() - self.crawl_start, stage="crawl")
+
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+            print(self.checkpoint)
+            self.checkpoint = None
+
     def crawl(self):
         """
         Core BFS crawling algorithm:
@@ -180,141 +381,516 @@ class WebCrawler:
         4. Repeat until queue empty or page limit reached
 
         This breadth-first approach ensures we explore level by level,
-        finding pages closer to the seed first
+        finding pages closer to the seed first (set_scheduler replaces the BFS queue
+        with per-host priority queues)
+
+        With a concurrency above 1 or parser worker processes the same algorithm runs
+        on the asyncio engine (crawl_async); with distributed workers, it is split
+        between several processes (DistributedCrawl.py; re-crawls stay in this process)
+        """
+        if self.distributed_workers > 0 and self.previous_crawl is None:
+            from DistributedCrawl import crawl_distributed  # It builds on this module
+            return crawl_distributed(self)
+
+        if self.concurrency > 1 or self.parse_workers > 0:
+            return asyncio.run(self.crawl_async())
+
+        self.begin_crawl()
+
+        try:
+            while self.crawl_should_continue():
+                self.crawl_next_page()
+        finally:
+            self.end_crawl()
+
+    def crawl_next_page(self):
+        """Take the first URL of the frontier, fetch it and record the page (one step of crawl)"""
+        current_page = self.url_frontier.popleft()  # FIFO: first URL in queue gets processed first (or the scheduler's pick)
+
+        if not self.url_is_allowed(current_page):
+            print("Not allowed: " + current_page.replace(self.domain_url, ""))
+
+        elif not self.replay_page(current_page):
+            try:
+                # HTTP GET request - this is where TCP connection happens under the hood
+                self.wait_for_host(current_page)
+                response = self.fetch_page(current_page)
+
+            except FETCH_ERRORS:
+                # Server returned error (4xx client error, 5xx server error) or was unreachable
+                self.add_fetch_error(current_page)
+            else:
+                self.add_response(current_page, response)
+
+    async def crawl_async(self):
+        """
+        Concurrent version of crawl() built on asyncio
+
+        The URLs at the head of the frontier are fetched in parallel (up to `concurrency`
+        requests in flight), but pages are still processed strictly in frontier order.
+        Because the BFS order only depends on the order pages are processed, this produces
+        exactly the same visited_urls, doc_words, broken_urls, etc. as the sequential crawl -
+        only the waiting on the network overlaps.
+
+        With parser workers, every downloaded page is parsed right away in a worker process
+        (ParserPool), so parsing also overlaps with fetching and uses several cores. At most
+        `window` pages are fetched ahead, so the bodies waiting to be processed stay bounded.
+        """
+        self.begin_crawl()
+
+        fetcher = AsyncFetcher(self.fetch_page, self.concurrency, self.per_host_limit, self.host_crawl_delay)
+        parser_pool = ParserPool(self.parse_workers, self.stop_words) if self.parse_workers > 0 else None
+        window = self.concurrency
+        if parser_pool is not None:
+            window = max(window, self.parse_window or 2 * self.parse_workers)
+
+        in_flight = {}  # URL -> asyncio task fetching (and parsing) it ahead of time
+
+        try:
+            while self.crawl_should_continue():
+                # Prefetch: keep the next `window` allowed URLs of the frontier downloading
+                # (pages in the checkpoint log are replayed, not downloaded)
+                for url in itertools.islice(self.url_frontier, window):
+                    if url not in in_flight and self.url_is_allowed(url) and \
+                            (self.checkpoint is None or not self.checkpoint.can_replay(url)):
+                        in_flight[url] = asyncio.ensure_future(self.fetch_and_parse(fetcher, parser_pool, url))
+
+                current_page = self.url_frontier.popleft()
+
+                if not self.url_is_allowed(current_page):
+                    print("Not allowed: " + current_page.replace(self.domain_url, ""))
+
+                elif not self.replay_page(current_page):
+                    task = in_flight.pop(current_page, None) or \
+                           asyncio.ensure_future(self.fetch_and_parse(fetcher, parser_pool, current_page))
+                    try:
+                        response, page = await task
+
+                    except FETCH_ERRORS:
+                        self.add_fetch_error(current_page)
+                    else:
+                        self.add_response(current_page, response, page)
+
+        finally:
+            # Page limit reached: the remaining prefetches are not needed any more
+            for task in in_flight.values():
+                task.cancel()
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+            fetcher.close()
+            if parser_pool is not None:
+                parser_pool.close()
+            self.end_crawl()
+
+    async def fetch_and_parse(self, fetcher, parser_pool, url):
+        """Fetch a page and, with parser workers, parse it there: returns (response, parsed page or None)"""
+        response = await fetcher.fetch(url)
+
+        if parser_pool is None or self.page_is_unchanged(url, response[0]):
+            return response, None
+
+        page, timings = await parser_pool.parse(url, response[0], response[1].get_content_charset())
+        self.record_parse(page, timings)
+        return response, page
+
+    def fetch_page(self, url):
         """
-        self.robots_txt = self.get_robots_txt()
+        Send the HTTP GET request and return (page content as bytes, response headers)
 
-        print("robots.txt: " + " ".join("{}{}".format(key, [
-            v.replace(self.domain_url, "") for v in val]) for key, val in self.robots_txt.items()) + "\n")
+        Transient failures (timeouts, dropped connections, 5xx server errors) are retried
+        with exponential backoff; client errors like 404 are returned immediately
 
-        self.url_frontier.append(self.seed_url + "/")
+        During a re-crawl the request is conditional (If-None-Match / If-Modified-Since);
+        if the server answers "304 Not Modified" the content is NOT_MODIFIED
+        """
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT + "/1.0"})
+
+        if self.previous_crawl is not None and url in self.http_validators:
+            etag, last_modified = self.http_validators[url]
+            if etag:
+                request.add_header("If-None-Match", etag)
+            if last_modified:
+                request.add_header("If-Modified-Since", last_modified)
+
+        for attempt in range(self.fetch_retries + 1):
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=self.fetch_timeout) as handle:
+                    content = handle.read()
+
+                    if self.metrics is not None:
+                        self.metrics.observe("fetch_seconds", time.perf_counter() - start)
+                        self.metrics.increment("bytes_downloaded_total", len(content))
+
+                    return content, handle.headers
+
+            except urllib.error.HTTPError as e:
+                if e.code == 304:
+                    return NOT_MODIFIED, e.headers
+                if e.code < 500 or attempt == self.fetch_retries:
+                    raise
+            except FETCH_ERRORS:
+                if attempt == self.fetch_retries:
+                    raise
+
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    def parse_page(self, current_page, current_content, charset=None):
+        """
+        Turn a fetched page into the data the crawler records:
+        title, SHA-256 content hash, filtered words (None if not indexable) and links
+        """
+        parser = PageParser(self.stop_words)
+        page = parser.parse(current_page, current_content, charset)
+        self.record_parse(page, parser.timings)
+        return page
 
-        while self.url_frontier and (self.page_limit is None or self.num_pages_indexed < self.page_limit):
-            current_page = self.url_frontier.pop(0)  # FIFO: first URL in queue gets processed first
+    def record_parse(self, page, timings):
+        if self.metrics is not None:
+            self.metrics.observe("parse_seconds", timings[0], step="html")
+            self.metrics.observe("parse_seconds", timings[1], step="tokenize")
+            self.metrics.increment("tokens_total", len(page["words"] or ()))
 
-            pwd = "/".join(current_page.split("/")[:-1]) + "/"
+    def content_hash(self, current_content):
+        return PageParser.content_hash(current_content)
 
-            if pwd not in self.robots_txt["Disallowed"]:
-                try:
-                    # HTTP GET request - this is where TCP connection happens under the hood
-                    handle = urllib.request.urlopen(current_page)
+    def add_response(self, current_page, response, parsed_page=None):
+        """
+        Parse a fetched page (or reuse it if a re-crawl finds it unchanged) and record it
+        parsed_page is the result of a parser worker, if the page was parsed there already
+        """
+        current_content, headers = response
 
-                except urllib.error.HTTPError as e:
-                    # Server returned error (4xx client error, 5xx server error)
-                    if current_page not in self.broken_urls and current_page is not None:
-                            self.broken_urls.append(current_page)
-                else:
-                    current_content = str(handle.read())
+        if headers.get("ETag") or headers.get("Last-Modified"):
+            self.http_validators[current_page] = (headers.get("ETag"), headers.get("Last-Modified"))
 
-                    # BeautifulSoup parses raw HTML into navigable DOM tree
-                    soup = BeautifulSoup(current_content, "lxml")
+        previous = self.previous_page(current_page)
 
-                    current_title = str(soup.title.string) if soup.title is not None else current_page.replace(pwd, '')
+        if self.page_is_unchanged(current_page, current_content):
+            # Unchanged since the last crawl (304 or identical content): no parsing or tokenizing
+            self.recrawl_stats["unchanged"] += 1
+            page = previous
+        else:
+            if self.previous_crawl is not None:
+                self.recrawl_stats["changed" if current_page in self.previous_crawl["pages"] else "new"] += 1
+            page = parsed_page if parsed_page is not None else \
+                self.parse_page(current_page, current_content, headers.get_content_charset())
 
-                    # SHA-256 creates unique fingerprint of page content for duplicate detection
-                    current_doc_id = hashlib.sha256(current_content.encode("utf-8")).hexdigest()
+        self.add_page(current_page, page)
 
-                    self.visited_urls[current_page] = (current_title, current_doc_id)
-                    self.num_pages_crawled += 1
+        if self.checkpoint is not None:
+            self.checkpoint.record(current_page, page, self.http_validators.get(current_page))
 
-                    print(str(self.num_pages_crawled) + ". " + "Visiting: " +
-                          current_page.replace(self.domain_url, "") + " (" + current_title + ")")
+    def add_fetch_error(self, current_page):
+        """A URL that could not be fetched is broken (and logged, so a resumed crawl does not retry it)"""
+        self.add_broken_url(current_page)
 
-                    # Only index text-based documents, not binaries like PDFs or images
-                    if any((current_page.lower().endswith(ext) for ext in ["/", ".html", ".htm", ".php", ".txt"])):
+        if self.metrics is not None:
+            self.metrics.increment("fetch_errors_total")
 
-                        [s.extract() for s in soup('title')]
+        if self.checkpoint is not None:
+            self.checkpoint.record(current_page, None)
 
-                        # Decode escaped characters and normalize to lowercase for consistent matching
-                        formatted_content = codecs.escape_decode(bytes(soup.get_text().lower(), "utf-8"))[0].decode("utf-8", errors='replace')
+    def replay_page(self, current_page):
+        """
+        Resumed crawl: take the outcome of a URL from the checkpoint log instead of fetching it
+        Returns False if the URL has to be fetched
+        """
+        if self.checkpoint is None or not self.checkpoint.can_replay(current_page):
+            return False
+
+        page, validators = self.checkpoint.next_replay(current_page)
+
+        if page is None:
+            self.add_broken_url(current_page)
+            return True
+
+        if validators is not None:
+            self.http_validators[current_page] = tuple(validators)
+        self.add_page(current_page, page)
+        return True
+
+    def page_is_unchanged(self, current_page, current_content):
+        """Re-crawl: did the server answer 304, or return the same content as last time?"""
+        if self.previous_page(current_page) is None:
+            return False
+
+        return current_content is NOT_MODIFIED or \
+            self.content_hash(current_content) == self.previous_crawl["pages"][current_page][1]
+
+    def previous_page(self, current_page):
+        """The page as recorded by the previous crawl, or None if it is new, must be parsed again, or this is not a re-crawl"""
+        if self.previous_crawl is None or current_page not in self.previous_crawl["pages"]:
+            return None
+
+        title, doc_id = self.previous_crawl["pages"][current_page]
+        indexed = current_page in self.previous_crawl["links"]
+
+        if indexed and doc_id not in self.previous_crawl["words"]:
+            return None  # A near-duplicate that was not indexed: its words have to be parsed again
+
+        return {"title": title, "doc_id": doc_id, "words": self.previous_crawl["words"][doc_id] if indexed else None,
+                "links": self.previous_crawl["links"].get(current_page, [])}
+
+    def reset_crawl_state(self):
+        """Forget the results of the last crawl so crawl() can run again"""
+        self.url_frontier = self.new_frontier()
+        self.seen_urls = self.new_seen_urls()
+        self.link_stats = {"links": 0, "canonicalized": 0}
+        self.visited_urls = {}
+        self.outgoing_urls = OrderedSet()
+        self.broken_urls = OrderedSet()
+        self.graphic_urls = []
+        self.duplicate_urls = {}
+        self.near_duplicate_urls = {}
+        if self.near_duplicates is not None:
+            self.near_duplicates.clear()
+        self.page_links = {}
+        self.link_sources = array("Q")
+        self.link_targets = array("Q")
+        self.doc_urls = {}
+        self.doc_titles = {}
+        self.doc_words = DocumentStore()
+        self.num_pages_crawled = 0
+        self.num_pages_indexed = 0
 
-                        # Tokenize: split text into individual words, strip punctuation
-                        content_words = list(re.sub('[' + string.punctuation + ']', '', formatted_content).split())
+    def recrawl(self):
+        """
+        Incremental refresh of a previous crawl
 
-                        content_words[0] = content_words[0][1:]
+        Every page is requested again with a conditional GET. Pages answering
+        "304 Not Modified", or whose content hash is unchanged, are taken over from the
+        previous crawl without being parsed again; their stored links are replayed so the
+        BFS discovers the same pages as a full crawl would.
 
-                        # Filter out stopwords and invalid tokens to keep only meaningful terms
-                        self.doc_words[current_doc_id] = [w for w in content_words
-                                                      if w not in self.stop_words and self.word_is_valid(w)]
+        Afterwards the documents keep their previous order, new documents are appended,
+        and the document changes are returned as (deleted doc ids, added doc ids)
+        """
+        self.previous_crawl = {"pages": self.visited_urls, "links": self.page_links, "words": self.doc_words}
+        self.recrawl_stats = {"unchanged": 0, "changed": 0, "new": 0, "deleted": 0}
 
-                        self.doc_titles[current_doc_id] = current_title
+        self.reset_crawl_state()
 
-                        # Store only first URL for each content hash to avoid duplicate entries
-                        if current_doc_id not in self.doc_urls:
-                            self.doc_urls[current_doc_id] = current_page
+        try:
+            self.crawl()
+        finally:
+            previous_words = self.previous_crawl["words"]
+            self.previous_crawl = None
 
-                        self.num_pages_indexed += 1
+        deleted = [doc_id for doc_id in previous_words if doc_id not in self.doc_words]
+        added = [doc_id for doc_id in self.doc_words if doc_id not in previous_words]
 
-                        # Extract all hyperlinks from the page to expand our crawl frontier
-                        for link in soup.find_all('a'):
-                            current_url = link.get('href')
+        # Surviving documents keep their position in the index, new ones go at the end
+        order = [doc_id for doc_id in previous_words if doc_id in self.doc_words] + added
+        self.doc_words.reorder(order)
+        self.doc_titles = {doc_id: self.doc_titles[doc_id] for doc_id in order}
+        self.doc_urls = {doc_id: self.doc_urls[doc_id] for doc_id in order}
 
-                            # Convert relative URLs (like /page.html) to absolute URLs
-                            if current_url is not None and pwd not in current_url:
-                                current_url = urllib.parse.urljoin(pwd, current_url)
+        self.recrawl_stats["deleted"] = len(deleted)
+        return deleted, added
 
-                            if current_url is not None and self.url_is_valid(current_url):
+    def save_crawl_state(self, filename=CRAWL_STATE_FILE):
+        """Persist what recrawl() needs: visited pages, their links and validators, and the crawled words"""
+        state = {name: getattr(self, name) for name in CRAWL_STATE}
 
-                                # Add to frontier if within scope and not already queued or visited
-                                if self.url_is_within_scope(current_url) and current_url not in self.url_frontier:
+        with open(filename, "wb") as f:
+            pickle.dump(state, f)
 
-                                    if current_url not in self.visited_urls.keys():
-                                        self.url_frontier.append(current_url)
+    def load_crawl_state(self, filename=CRAWL_STATE_FILE):
+        try:
+            f = open(filename, "rb")
+        except IOError:
+            print("Error opening crawl state file: " + filename)
+            return 0
 
-                                elif not self.url_is_within_scope(current_url) and current_url not in self.outgoing_urls:
-                                    self.outgoing_urls.append(current_url)
+        with f:
+            state = pickle.load(f)
+        self.__dict__.update(state)
 
-                            elif current_url not in self.broken_urls and current_url is not None:
-                                self.broken_urls.append(current_url)
+        # Older versions saved the words of each document as a plain list of strings
+        if isinstance(self.doc_words, dict):
+            self.doc_words = DocumentStore(self.doc_words)
 
-                    elif any(current_page.lower().endswith(ext) for ext in [".gif", ".png", ".jpeg", ".jpg"]):
-                        self.graphic_urls.append(current_page)
+        # ... and did not record the link graph edges
+        if "link_sources" not in state:
+            self.link_sources = array("Q")
+            self.link_targets = array("Q")
+            for page, links in self.page_links.items():
+                self.record_links(page, (canonicalize(link) for link in links if self.url_is_valid(link)))
 
-            else:
-                print("Not allowed: " + current_page.replace(self.domain_url, ""))
+    def add_page(self, current_page, page):
+        """Record a parsed page: visited list, document index and new frontier URLs"""
+        current_title = page["title"]
+        current_doc_id = page["doc_id"]
 
-    def build_frequency_matrix(self):
+        self.visited_urls[current_page] = (current_title, current_doc_id)
+        self.num_pages_crawled += 1
+
+        print(str(self.num_pages_crawled) + ". " + "Visiting: " +
+              current_page.replace(self.domain_url, "") + " (" + current_title + ")")
+
+        if page["words"] is not None:
+            if not self.add_near_duplicate(current_page, page):
+                self.doc_words[current_doc_id] = page["words"]
+
+                self.doc_titles[current_doc_id] = current_title
+
+                # Store only first URL for each content hash to avoid duplicate entries
+                if current_doc_id not in self.doc_urls:
+                    self.doc_urls[current_doc_id] = current_page
+
+            self.num_pages_indexed += 1
+
+            self.page_links[current_page] = page["links"]
+            self.record_links(current_page, [self.add_link(current_url) for current_url in page["links"]])
+
+        elif any(current_page.lower().endswith(ext) for ext in [".gif", ".png", ".jpeg", ".jpg"]):
+            self.graphic_urls.append(current_page)
+
+        if self.metrics is not None:
+            self.metrics.increment("pages_crawled_total")
+            if page["words"] is not None:
+                self.metrics.increment("pages_indexed_total")
+            self.metrics.set_gauge("frontier_size", len(self.url_frontier))
+
+    def add_near_duplicate(self, current_page, page):
         """
-        Construct term-document matrix for TF-IDF calculations
-        Each row = one unique stemmed term
-        Each column = one document
-        Cell value = how many times that term appears in that document
+        If near-duplicate detection is on and the page is almost the same as an indexed one,
+        collapse it onto that page instead of indexing it; returns True if it was collapsed
+        (exact duplicates share a doc_id and are left to the SHA-256 duplicate check)
+        """
+        if self.near_duplicates is None or page["doc_id"] in self.doc_words:
+            return False
+
+        match = self.near_duplicates.find(page["doc_id"], page["words"])
+        if match is None:
+            return False
+
+        original_doc_id, similarity = match
+        self.near_duplicate_urls.setdefault(original_doc_id, []).append((current_page, similarity))
 
-        This matrix is the foundation of our vector space model for search
+        # Its words are not kept, so a re-crawl must download it again rather than ask "modified?"
+        self.http_validators.pop(current_page, None)
+        return True
+
+    def add_link(self, current_url):
         """
-        if self.doc_words is not None:
-            # Porter Stemmer reduces words to root form (running -> run, cats -> cat)
-            stemmer = PorterStemmer()
+        Sort a discovered link into the frontier, the outgoing list or the broken list;
+        returns the canonical URL if it is in scope (None otherwise)
+        """
+        if self.url_is_valid(current_url):
+            url = canonicalize(current_url)
+            self.count_link(current_url, url)
 
-            # Build vocabulary: all unique stemmed terms across all documents
-            self.all_terms = list(set([stemmer.stem(word) for word_list in self.doc_words.values() for word in word_list]))
-            self.all_terms.sort()
+            # Add to frontier if within scope and never queued before
+            if self.url_is_within_scope(url):
+                self.queue_url(url)
+                return url
 
-            self.frequency_matrix = [[] for i in self.all_terms]
+            elif url not in self.outgoing_urls:
+                self.outgoing_urls.add(url)
 
-            # Count term occurrences in each document
-            for term in range(len(self.all_terms)):
-                frequency_count = []
+        else:
+            self.add_broken_url(current_url)
 
-                for word_list in self.doc_words.values():
-                    stemmed_word_list = [stemmer.stem(word) for word in word_list]
-                    frequency_count.append(stemmed_word_list.count(self.all_terms[term]))
+    def queue_url(self, url):
+        """Append an in-scope canonical URL to the frontier, unless it was queued before"""
+        if url not in self.seen_urls:
+            self.seen_urls.add(url)
+            self.url_frontier.append(url)
+        else:
+            self.url_frontier.link_found(url)  # In-link counts for the scheduler
 
-                self.frequency_matrix[term] = frequency_count
+    def record_links(self, page, urls):
+        """Link graph edges from a stored page to its in-scope links (None entries are skipped)"""
+        source = url_fingerprint(page)
+        for url in urls:
+            if url is not None:
+                self.link_sources.append(source)
+                self.link_targets.append(url_fingerprint(url))
+
+    def build_link_graph(self, doc_ids):
+        """
+        The in-scope links between indexed documents, as a LinkGraph over their position in
+        doc_ids. Pages with the same content are one document; links from or to pages that
+        were not indexed (broken, images, near-duplicates) are left out
+
+        The edges were recorded while crawling (record_links), so this is one pass over the
+        visited pages plus a vectorized lookup of both ends of every edge
+        """
+        doc_numbers = {doc_id: doc for doc, doc_id in enumerate(doc_ids)}
+        graph = LinkGraph(len(doc_numbers))
+
+        # Document number of every visited page (-1 if it is not indexed), sorted by URL fingerprint
+        fingerprints = np.fromiter((url_fingerprint(url) for url in self.visited_urls),
+                                   dtype=np.uint64, count=len(self.visited_urls))
+        docs = np.fromiter((doc_numbers.get(doc_id, -1) for _, doc_id in self.visited_urls.values()),
+                           dtype=np.int64, count=len(self.visited_urls))
+        order = np.argsort(fingerprints)
+        fingerprints, docs = fingerprints[order], docs[order]
+
+        def documents(urls):
+            urls = np.frombuffer(urls, dtype=np.uint64)
+            if len(fingerprints) == 0:
+                return np.full(len(urls), -1, dtype=np.int64)
+            positions = np.minimum(np.searchsorted(fingerprints, urls), len(fingerprints) - 1)
+            return np.where(fingerprints[positions] == urls, docs[positions], -1)  # Never visited: -1
+
+        sources = documents(self.link_sources)
+        targets = documents(self.link_targets)
+        keep = (sources >= 0) & (targets >= 0)
+        graph.add_links(sources[keep], targets[keep])
+
+        return graph.finish()
+
+    def count_link(self, current_url, url):
+        """Statistics: is this link another spelling of a URL we already know?"""
+        self.link_stats["links"] += 1
+
+        # Only counted: seen_urls holds canonical URLs alone, it is sized (and a Bloom
+        # filter's error rate is set) for them
+        if current_url != url and (url in self.seen_urls or url in self.outgoing_urls):
+            self.link_stats["canonicalized"] += 1
+
+    def add_broken_url(self, url):
+        if url not in self.broken_urls:
+            self.broken_urls.add(url)
+
+    def build_frequency_matrix(self):
+        """
+        Construct the term-document index for TF-IDF calculations
+        Each term (unique stemmed word) maps to its postings: (document number, term frequency)
+
+        This is the sparse form of the classic term-document matrix
+        (rows = terms, columns = documents, cell = how many times that term appears)
+        and is the foundation of our vector space model for search
+        """
+        if self.doc_words is not None:
+            # Porter Stemmer reduces words to root form (running -> run, cats -> cat)
+            # Each distinct word of the vocabulary is stemmed once, documents look their terms up
+            with self.stage_timer("stem"):
+                stems = self.doc_words.stem_vocabulary(self.stem_cache.stem)
+
+            # One pass over the corpus: count terms per document
+            with self.stage_timer("index_build"):
+                self.index = InvertedIndex(self.doc_words.keys(), self.doc_words.stemmed(stems))
+
+            # Vocabulary: all unique stemmed terms across all documents, sorted
+            self.all_terms = self.index.terms
 
     def print_frequency_matrix(self):
         """Export term-document matrix to CSV format for analysis"""
-        output_string = ","
+        output = [","]
 
         if self.doc_words is not None:
-            for i in range(len(self.doc_words.keys())):
-                output_string += "Doc" + str(i) + ","
-            output_string += "\n"
+            for i in range(self.index.num_docs):
+                output.append("Doc" + str(i) + ",")
+            output.append("\n")
 
-            for i in range(len(self.frequency_matrix)):
-                output_string += self.all_terms[i] + "," + ",".join([str(i) for i in self.frequency_matrix[i]]) + "\n"
+            # Rows are expanded from the postings one at a time, the dense matrix is never held in memory
+            for i in range(len(self.all_terms)):
+                output.append(self.all_terms[i] + "," + ",".join([str(i) for i in self.index.dense_row(i)]) + "\n")
 
-        return output_string
+        return "".join(output)
 
     def n_most_common(self, n):
         """
@@ -322,13 +898,9 @@ class WebCrawler:
         Returns tuples of (term, total_frequency, document_frequency)
         Useful for understanding what topics dominate the crawled content
         """
-        term_totals = []
         sorted_terms = self.all_terms
-        doc_freqs = []
-
-        for row in self.frequency_matrix:
-            term_totals.append(sum(row))
-            doc_freqs.append(sum([1 for x in row if x > 0]))
+        term_totals = self.index.term_frequencies().tolist()
+        doc_freqs = self.index.document_frequencies().tolist()
 
         sorted_terms = [x for _, x in sorted(zip(term_totals, sorted_terms))]
         doc_freqs = [x for _, x in sorted(zip(term_totals, doc_freqs))]
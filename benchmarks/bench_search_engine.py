@@ -0,0 +1,198 @@
+"""
+Benchmark suite: crawl, index, save/load and search on a synthetic local site
+
+Everything runs offline against a generated site (see synthetic_site.py) served from
+localhost, so runs are reproducible and can be compared across commits:
+
+    crawl       pages crawled and indexed, seconds, pages per second
+    index       build_frequency_matrix time, and peak memory allocated while building (tracemalloc)
+    save_load   save_index / load_index time and index file size
+    queries     process_query latency percentiles on the loaded (memory-mapped) index
+    memory      peak resident memory of the process
+    metrics     with --metrics: the per-stage timings and counters of Metrics.py
+
+Results are printed (or written with -o) as JSON, together with the parameters, the
+git commit and the Python version. --compare prints the change against an earlier result.
+
+Run from the project root:
+    python benchmarks/bench_search_engine.py --pages 2000 -o before.json
+    python benchmarks/bench_search_engine.py --pages 2000 --compare before.json
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from SearchEngine import SearchEngine
+from synthetic_site import make_site, make_queries, serve, STRUCTURES
+
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def new_search_engine(seed_url, page_limit, settings):
+    search_engine = SearchEngine(seed_url)
+    search_engine.set_stop_words(os.path.join(ROOT, "Input", "stopwords.txt"))
+    search_engine.set_thesaurus(os.path.join(ROOT, "Input", "thesaurus.csv"))
+    search_engine.set_page_limit(page_limit)
+    search_engine.set_concurrency(settings.concurrency)
+    search_engine.set_parse_workers(settings.parse_workers)
+    if settings.metrics:
+        search_engine.set_metrics()
+    return search_engine
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Not available on Windows
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def run(settings):
+    pages = make_site(settings.pages, settings.words, settings.links, settings.structure,
+                      settings.duplicate_rate, settings.near_duplicate_rate, settings.seed)
+    queries = make_queries(settings.queries, settings.seed)
+    server, seed_url = serve(pages, settings.latency)
+    log = io.StringIO()  # The crawler and the search engine print progress; keep it out of the JSON
+
+    try:
+        # Crawl the whole site: every page but robots.txt
+        search_engine = new_search_engine(seed_url, len(pages) - 1, settings)
+
+        with contextlib.redirect_stdout(log):
+            start = time.perf_counter()
+            search_engine.crawl()
+            crawl_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            search_engine.build_frequency_matrix()
+            build_seconds = time.perf_counter() - start
+
+            # Build again to measure memory: tracemalloc slows Python down too much to time the same run
+            # (and keep this second build out of the stage metrics)
+            metrics, search_engine.metrics = search_engine.metrics, None
+            tracemalloc.start()
+            search_engine.build_frequency_matrix()
+            build_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            search_engine.metrics = metrics
+    finally:
+        server.shutdown()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "index.idx")
+
+        with contextlib.redirect_stdout(log):
+            start = time.perf_counter()
+            search_engine.save_index(filename)
+            save_seconds = time.perf_counter() - start
+
+            loaded = SearchEngine(seed_url)
+            loaded.metrics = search_engine.metrics
+            loaded.set_thesaurus(os.path.join(ROOT, "Input", "thesaurus.csv"))
+            start = time.perf_counter()
+            loaded.load_index(filename)
+            load_seconds = time.perf_counter() - start
+
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                loaded.process_query(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        file_bytes = os.path.getsize(filename)
+        del loaded  # Release the memory map before the file is deleted
+
+    latencies.sort()
+
+    return {
+        "benchmark": "search_engine",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parameters": {name: value for name, value in vars(settings).items() if name not in ("output", "compare")},
+        "site": {"pages": len(pages), "bytes": sum(len(body) for body in pages.values())},
+        "crawl": {"pages_crawled": search_engine.num_pages_crawled, "pages_indexed": search_engine.num_pages_indexed,
+                  "seconds": crawl_seconds, "pages_per_second": search_engine.num_pages_crawled / crawl_seconds},
+        "index": {"documents": search_engine.N, "terms": len(search_engine.all_terms),
+                  "build_seconds": build_seconds, "build_peak_mb": build_peak / 2 ** 20},
+        "save_load": {"save_seconds": save_seconds, "load_seconds": load_seconds, "file_bytes": file_bytes},
+        "queries": dict({"count": len(latencies), "mean_ms": sum(latencies) / len(latencies), "max_ms": latencies[-1]},
+                        **{"p%d_ms" % p: percentile(latencies, p) for p in PERCENTILES}),
+        "memory": {"peak_rss_mb": peak_rss_mb()},
+        "metrics": search_engine.metrics.to_json() if search_engine.metrics is not None else None,
+    }
+
+
+def compare(baseline, result):
+    """Print every numeric metric of both runs and the relative change"""
+    print("{:<36} {:>14} {:>14} {:>9}".format("metric", "baseline", "this run", "change"))
+
+    for section, metrics in result.items():
+        if not isinstance(metrics, dict) or section == "parameters":
+            continue
+        for name, value in metrics.items():
+            old = baseline.get(section, {}).get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = "{:+.1%}".format((value - old) / old) if old else ""
+            print("{:<36} {:>14.4g} {:>14.4g} {:>9}".format(section + "." + name, old, value, change))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of crawling, indexing and searching a synthetic site")
+    parser.add_argument("--pages", type=int, default=1000, help="Pages on the synthetic site (Default is 1000)")
+    parser.add_argument("--words", type=int, default=300, help="Words per page (Default is 300)")
+    parser.add_argument("--links", type=int, default=5, help="Links per page (Default is 5)")
+    parser.add_argument("--structure", choices=STRUCTURES, default="random", help="Link structure (Default is random)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="Fraction of exact duplicate pages (Default is 0.05)")
+    parser.add_argument("--near-duplicate-rate", type=float, default=0.05, help="Fraction of pages with one word changed (Default is 0.05)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the server waits before every response (Default is 0)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the generated site and queries (Default is 1)")
+    parser.add_argument("--queries", type=int, default=500, help="Number of queries timed (Default is 500)")
+    parser.add_argument("-c", "--concurrency", type=int, default=1, help="Pages fetched in parallel (Default is 1)")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parser worker processes (Default is 0)")
+    parser.add_argument("--metrics", action="store_true", help="Also record per-stage metrics (Metrics.py) and include them")
+    parser.add_argument("-o", "--output", help="Write the JSON result to this file instead of printing it")
+    parser.add_argument("--compare", help="Earlier JSON result to compare this run with")
+
+    settings = parser.parse_args()
+    result = run(settings)
+
+    if settings.output:
+        with open(settings.output, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+    else:
+        print(json.dumps(result, indent=2))
+
+    if settings.compare:
+        with open(settings.compare) as f:
+            compare(json.load(f), result)
@@ -0,0 +1,150 @@
+"""
+Load test of SearchServer on localhost
+
+Builds and exports the index of a synthetic site (see synthetic_site.py), starts the
+search service on a free local port and sends it queries from many client threads:
+
+    requests    answered, failed, throughput (requests per second)
+    latency     per-request latency percentiles, as seen by the clients
+    reloads     with --reload-every: index hot swaps (SIGHUP) done during the run;
+                every request must still succeed
+
+Results are printed as JSON, like bench_search_engine.py. Needs os.fork (Linux, macOS).
+
+Run from the project root:
+    python benchmarks/bench_search_server.py --pages 1000 --workers 4 --clients 16
+    python benchmarks/bench_search_server.py --workers 4 --reload-every 0.5
+"""
+import os
+import sys
+import io
+import json
+import time
+import signal
+import argparse
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from SearchEngine import SearchEngine
+from SearchServer import SearchServer
+from synthetic_site import make_site, make_queries, serve
+from bench_search_engine import percentile, git_commit, PERCENTILES
+
+
+def export_index(settings, filename):
+    """Crawl the synthetic site and export its index"""
+    pages = make_site(settings.pages, settings.words, settings.links, seed=settings.seed)
+    site, seed_url = serve(pages)
+
+    try:
+        search_engine = SearchEngine(seed_url)
+        search_engine.set_stop_words(os.path.join(ROOT, "Input", "stopwords.txt"))
+        search_engine.set_page_limit(len(pages) - 1)
+        search_engine.set_concurrency(8)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            search_engine.crawl()
+            search_engine.build_frequency_matrix()
+            search_engine.save_index(filename)
+    finally:
+        site.shutdown()
+
+    return search_engine.N
+
+
+def run(settings):
+    queries = make_queries(settings.requests, settings.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "index.idx")
+        documents = export_index(settings, filename)
+
+        server = SearchServer(filename, "127.0.0.1", 0, settings.workers)
+        server.set_thesaurus(os.path.join(ROOT, "Input", "thesaurus.csv"))
+        server.set_query_cache(settings.query_cache)
+        base_url = "http://%s:%d" % server.server_address
+
+        process = multiprocessing.get_context("fork").Process(target=server.serve_forever)
+        with contextlib.redirect_stdout(io.StringIO()):
+            process.start()
+        server.socket.close()  # The server process has its own copy
+
+        # Wait until the workers answer
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(base_url + "/health", timeout=5).read()
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        errors = []
+        reloads = [0]
+        running = threading.Event()
+        running.set()
+
+        def reload_index():
+            while running.is_set():
+                time.sleep(settings.reload_every)
+                if running.is_set():
+                    os.kill(process.pid, signal.SIGHUP)
+                    reloads[0] += 1
+
+        def request(query):
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + "/search?" + urllib.parse.urlencode({"q": query, "k": 6}), timeout=30) as response:
+                    json.loads(response.read())
+            except OSError as e:
+                errors.append(str(e))
+                return None
+            return (time.perf_counter() - start) * 1000
+
+        if settings.reload_every:
+            threading.Thread(target=reload_index, daemon=True).start()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(settings.clients) as clients:
+            latencies = list(clients.map(request, queries))
+        seconds = time.perf_counter() - start
+        running.clear()
+
+        os.kill(process.pid, signal.SIGTERM)
+        process.join()
+
+    latencies = sorted(latency for latency in latencies if latency is not None)
+
+    return {
+        "benchmark": "search_server",
+        "commit": git_commit(),
+        "parameters": vars(settings),
+        "index": {"documents": documents},
+        "requests": {"answered": len(latencies), "failed": len(errors), "seconds": seconds,
+                     "per_second": len(latencies) / seconds, "first_errors": errors[:5]},
+        "latency": dict({"mean_ms": sum(latencies) / len(latencies) if latencies else None,
+                         "max_ms": latencies[-1] if latencies else None},
+                        **{"p%d_ms" % p: percentile(latencies, p) if latencies else None for p in PERCENTILES}),
+        "reloads": reloads[0],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the search service on a synthetic site's index")
+    parser.add_argument("--pages", type=int, default=1000, help="Pages on the synthetic site (Default is 1000)")
+    parser.add_argument("--words", type=int, default=300, help="Words per page (Default is 300)")
+    parser.add_argument("--links", type=int, default=5, help="Links per page (Default is 5)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the generated site and queries (Default is 1)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Server worker processes (Default is 4)")
+    parser.add_argument("--clients", type=int, default=16, help="Client threads sending requests (Default is 16)")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests sent (Default is 2000)")
+    parser.add_argument("--query-cache", type=int, default=0, help="Query cache size of every worker (Default is 0, off)")
+    parser.add_argument("--reload-every", type=float, default=0, help="Hot swap the index every this many seconds (Default is 0, never)")
+
+    print(json.dumps(run(parser.parse_args()), indent=2))
@@ -0,0 +1,107 @@
+"""
+Benchmark: page decoding + tokenizing, old pipeline vs PageParser
+
+The old pipeline parsed the repr of the response bytes (str(handle.read())), undid the
+escaping with codecs.escape_decode and built several full-size copies of the page text
+(re.sub over the whole text, .split(), a filtered list copy). PageParser decodes the
+bytes once with the declared charset and tokenizes the text nodes with a generator.
+
+Reports the best time of several runs and the peak memory allocated (tracemalloc)
+for the whole parse and for the tokenizing step alone.
+
+Run from the project root:
+    python benchmarks/bench_tokenizer.py [PAGE_KB]
+"""
+import os
+import sys
+import re
+import time
+import codecs
+import random
+import string
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+from PageParser import PageParser, decode_page
+
+WORDS = ("network protocol packet router crawler index query search engine document "
+         "frequency vector cluster thesaurus mystery travel history science it's don't "
+         "café naïve \"quoted\" (parenthesis) end.").split()
+
+RUNS = 5
+
+
+def make_page(size_kb, seed=1):
+    """Synthetic HTML page of roughly size_kb kilobytes: paragraphs of text and links"""
+    rng = random.Random(seed)
+    parts = ["<html><head><meta charset=\"utf-8\"><title>Benchmark page</title></head><body>"]
+    size = 0
+    while size < size_kb * 1024:
+        paragraph = "<p>" + " ".join(rng.choice(WORDS) for _ in range(80)) + \
+                    " <a href=\"/p%d.html\">link</a></p>\n" % rng.randrange(1000)
+        parts.append(paragraph)
+        size += len(paragraph)
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def old_parse(body, stop_words):
+    """The pipeline as it was before PageParser (repr of the bytes, escape_decode, re.sub)"""
+    soup = BeautifulSoup(str(body), "lxml")
+    [s.extract() for s in soup('title')]
+    return old_tokenize(soup.get_text(), stop_words)
+
+
+def old_tokenize(text, stop_words):
+    formatted_content = codecs.escape_decode(bytes(text.lower(), "utf-8"))[0].decode("utf-8", errors='replace')
+    content_words = list(re.sub('[' + string.punctuation + ']', '', formatted_content).split())
+    content_words[0] = content_words[0][1:]
+    return [w for w in content_words if w not in stop_words and
+            bool(re.compile(r'^[a-zA-z](\S*)[a-zA-z0-9]$').match(w))]
+
+
+def new_parse(parser, body):
+    return parser.parse("http://localhost/page.html", body)["words"]
+
+
+def measure(function, *args):
+    """(best seconds over RUNS runs, peak bytes allocated during one run)"""
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def report(name, old, new):
+    print("{:<10} old {:8.1f} ms {:8.1f} MB   new {:8.1f} ms {:8.1f} MB   ({:.2f}x time, {:.2f}x memory)".format(
+        name, old[0] * 1000, old[1] / 2 ** 20, new[0] * 1000, new[1] / 2 ** 20,
+        old[0] / new[0], old[1] / new[1]))
+
+
+if __name__ == "__main__":
+    page_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Input", "stopwords.txt")) as f:
+        stop_words = [line.strip() for line in f]
+
+    body = make_page(page_kb)
+    parser = PageParser(stop_words)
+    print("Page size: {:.0f} KB\n".format(len(body) / 1024))
+
+    # Whole parse: bytes -> soup -> filtered words
+    report("parse", measure(old_parse, body, stop_words), measure(new_parse, parser, body))
+
+    # Tokenizing step alone, on the same parsed document
+    old_soup = BeautifulSoup(str(body), "lxml")
+    new_soup = BeautifulSoup(decode_page(body), "lxml")
+    report("tokenize", measure(lambda: old_tokenize(old_soup.get_text(), stop_words)),
+           measure(lambda: list(parser.words(new_soup.strings))))
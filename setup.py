@@ -15,8 +15,8 @@ setup(
         'beautifulsoup4>=4.9.0',
         'lxml>=4.6.0',
         'nltk>=3.5',
-        'scikit-learn>=0.24.0',
         'numpy>=1.19.0',
+        'scipy>=1.5.0',
         'bs4'
     ],
     python_requires='>=3.9',
@@ -0,0 +1,195 @@
+"""
+Synthetic websites for the offline tests and benchmarks, served from a local HTTP server
+
+The site is generated from a seed, so the same parameters always give byte-identical
+pages and every run of a benchmark crawls exactly the same site:
+
+- Words follow a Zipf distribution over a made-up vocabulary, like natural text:
+  a few words are very common, most are rare
+- Link structure:
+    random    every page links to `links` random pages
+    tree      every page links to its `links` children and its parent (a site hierarchy)
+    powerlaw  links prefer pages that are already linked a lot (a few hub pages)
+- A fraction of the pages have an exact copy at another URL (duplicate_rate) or a
+  copy with one word changed, like a timestamp (near_duplicate_rate)
+
+    pages = make_site(1000, structure="powerlaw", duplicate_rate=0.05)
+    server, seed_url = serve(pages)
+    ...
+    server.shutdown()
+
+The tests crawl a small hand-made site instead (make_test_site), whose pages use the
+words in WORDS and are searched with QUERIES
+"""
+import bisect
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STRUCTURES = ["random", "tree", "powerlaw"]
+
+WORDS = "mystery book travel romance fiction history science poetry crime detective novel castle".split()
+QUERIES = WORDS + ["page", "home", "mystery book", "crime novel castle", "chpt", "zzz", "the"]
+
+VOCABULARY_SIZE = 5000
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "si", "vo", "pe", "da", "gu", "ho", "zi", "be", "fa", "wen", "tor", "las"]
+
+
+def make_vocabulary(rng, size=VOCABULARY_SIZE):
+    """Distinct pronounceable made-up words, most common first"""
+    words, seen = [], set()
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+class ZipfSampler:
+    """Draws words with probability proportional to 1 / rank"""
+
+    def __init__(self, words, rng):
+        self.words = words
+        self.rng = rng
+        self.cumulative = []
+        total = 0.0
+        for rank in range(1, len(words) + 1):
+            total += 1.0 / rank
+            self.cumulative.append(total)
+
+    def sample(self, count):
+        total = self.cumulative[-1]
+        return [self.words[bisect.bisect_left(self.cumulative, self.rng.random() * total)] for _ in range(count)]
+
+
+def link_targets(structure, num_pages, links, rng):
+    """Page number -> page numbers it links to; every page is reachable from page 0"""
+    targets = []
+    in_degree = [1] * num_pages
+
+    for i in range(num_pages):
+        if structure == "tree":
+            page_links = [child for child in range(i * links + 1, i * links + links + 1) if child < num_pages]
+            if i > 0:
+                page_links.append((i - 1) // links)
+        else:
+            if structure == "powerlaw":
+                # Preferential attachment among the pages that exist so far
+                page_links = rng.choices(range(i + 1), weights=in_degree[:i + 1], k=links)
+            else:
+                page_links = [rng.randrange(num_pages) for _ in range(links)]
+
+            # Link to the next page too, so a BFS from page 0 reaches everything
+            if i + 1 < num_pages:
+                page_links.append(i + 1)
+
+        for target in page_links:
+            in_degree[target] += 1
+        targets.append(sorted(set(page_links) - {i}))
+
+    return targets
+
+
+def make_site(num_pages=1000, words_per_page=300, links=5, structure="random",
+              duplicate_rate=0.0, near_duplicate_rate=0.0, seed=1):
+    """
+    {path: page bytes} of a synthetic site: a home page, robots.txt and num_pages pages
+    /p<i>.html, plus a copy /copy/p<i>.html or /near/p<i>.html (one word changed) of the
+    given fraction of them, linked from the original page
+    """
+    if structure not in STRUCTURES:
+        raise ValueError("Unknown link structure: " + structure + " (use " + ", ".join(STRUCTURES) + ")")
+
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    sampler = ZipfSampler(vocabulary, rng)
+    targets = link_targets(structure, num_pages, links, rng)
+
+    pages = {"/robots.txt": b"User-agent: *\nDisallow: /private/\n"}
+
+    for i in range(num_pages):
+        words = sampler.sample(words_per_page)
+        title = " ".join(sampler.sample(3)).title()
+        anchors = ["/p%d.html" % j for j in targets[i]]
+
+        roll = rng.random()
+        copy = "/copy/p%d.html" % i if roll < duplicate_rate else \
+               "/near/p%d.html" % i if roll < duplicate_rate + near_duplicate_rate else None
+        if copy is not None:
+            anchors.append(copy)
+
+        pages["/p%d.html" % i] = html_page(title, words, anchors)
+
+        if copy is not None and copy.startswith("/copy/"):
+            pages[copy] = pages["/p%d.html" % i]
+        elif copy is not None:
+            words[rng.randrange(len(words))] = "updated%d" % rng.randrange(10 ** 6)  # e.g. a timestamp
+            pages[copy] = html_page(title, words, anchors)
+
+    pages["/"] = html_page("Home", ["home"], ["/p0.html"])
+    return pages
+
+
+def make_test_site(num_pages=25):
+    """Pages with cross links, a broken link, an external link, an image and a duplicate page"""
+    pages = {"/robots.txt": "User-agent: *\nDisallow: /private/\n"}
+
+    for i in range(num_pages):
+        text = " ".join(WORDS[(i * j) % len(WORDS)] for j in range(40))
+        links = "".join('<a href="/p%d.html">next</a>' % ((i * 3 + j) % num_pages) for j in range(1, 4))
+        links += '<a href="/missing%d.html">x</a><a href="http://example.com/">e</a>' % i
+        links += '<a href="/img.png">i</a><a href="/private/p.html">p</a><a href="copy/p%d.html">c</a>' % i
+        pages["/p%d.html" % i] = "<html><title>Page %d</title><body>%s %s</body></html>" % (i, text, links)
+        pages["/copy/p%d.html" % i] = pages["/p%d.html" % i]
+
+    pages["/"] = "<html><title>Home</title><body>home " + '<a href="/p0.html">p0</a></body></html>'
+    pages["/img.png"] = "PNG"
+    return pages
+
+
+def html_page(title, words, links):
+    anchors = " ".join('<a href="%s">link</a>' % link for link in links)
+    return ("<html><head><meta charset=\"utf-8\"><title>%s</title></head>"
+            "<body><p>%s</p><p>%s</p></body></html>" % (title, " ".join(words), anchors)).encode("utf-8")
+
+
+def make_queries(count, site_seed=1, seed=2):
+    """Queries of 1-3 words drawn from the same vocabulary and distribution as the pages of make_site(seed=site_seed)"""
+    rng = random.Random(seed)
+    sampler = ZipfSampler(make_vocabulary(random.Random(site_seed)), rng)
+    return [" ".join(sampler.sample(rng.randint(1, 3))) for _ in range(count)]
+
+
+def serve(pages, latency=0.0):
+    """
+    Serve the pages (bytes, or text sent as UTF-8) on a free localhost port in a background
+    thread; returns (server, site URL). The pages dict may be changed while serving
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+
+            body = pages.get(self.path)
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain" if self.path.endswith(".txt") else "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://localhost:%d" % server.server_address[1]
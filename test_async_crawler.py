@@ -0,0 +1,165 @@
+"""
+Checks that the asyncio crawl mode produces exactly the same crawl as the sequential one.
+Runs against the small synthetic site of synthetic_site.py on a local HTTP server, so no internet is needed.
+
+Run with:  python test_async_crawler.py   (or pytest test_async_crawler.py)
+"""
+import contextlib
+import io
+import itertools
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+from SearchEngine import SearchEngine
+from Frontier import PriorityFrontier
+from DistributedCrawl import accept_workers
+from synthetic_site import make_test_site, serve
+
+
+def crawl(seed_url, concurrency, parse_workers=0, distributed=0, page_limit=20, scheduler=None, partition="host",
+          crawl_delay=None, log=None):
+    search_engine = SearchEngine(seed_url)
+    if page_limit is not None:
+        search_engine.set_page_limit(page_limit)
+    search_engine.set_stop_words("Input/stopwords.txt")
+    search_engine.set_concurrency(concurrency)
+    search_engine.set_parse_workers(parse_workers)
+    search_engine.set_distributed(distributed, partition)
+    if scheduler is not None:
+        search_engine.set_scheduler(scheduler)
+    if crawl_delay is not None:
+        search_engine.set_crawl_delay(crawl_delay)
+
+    with contextlib.redirect_stdout(log or io.StringIO()):
+        search_engine.crawl()
+        search_engine.produce_duplicates()
+
+    return search_engine
+
+
+def test_async_crawl_matches_sequential():
+    server, seed_url = serve(make_test_site())
+
+    try:
+        sequential = crawl(seed_url, 1)
+        concurrent = crawl(seed_url, 8)
+        pipelined = crawl(seed_url, 4, parse_workers=2)
+    finally:
+        server.shutdown()
+
+    assert sequential.num_pages_indexed == 20
+
+    for other in (concurrent, pipelined):
+        assert list(other.visited_urls.items()) == list(sequential.visited_urls.items())
+        assert list(other.doc_words.items()) == list(sequential.doc_words.items())
+        assert list(other.broken_urls) == list(sequential.broken_urls)
+        assert list(other.outgoing_urls) == list(sequential.outgoing_urls)
+        assert str(other) == str(sequential)
+
+
+def test_distributed_crawl_covers_sequential():
+    """Workers crawl in their own order, so only the crawled sets can be compared"""
+    server, seed_url = serve(make_test_site())
+
+    try:
+        sequential = crawl(seed_url, 1, page_limit=None)
+        by_host = crawl(seed_url, 1, distributed=3, page_limit=None)
+        by_url = crawl(seed_url, 1, distributed=3, page_limit=None, partition="url")
+        limited = crawl(seed_url, 1, distributed=3, partition="url")
+
+        # A crawl delay only holds if one worker fetches all pages of a host
+        log = io.StringIO()
+        polite = crawl(seed_url, 1, distributed=3, page_limit=5, partition="url", crawl_delay=0.01, log=log)
+    finally:
+        server.shutdown()
+
+    for distributed in (by_host, by_url):
+        assert dict(distributed.visited_urls) == dict(sequential.visited_urls)
+        assert dict(distributed.doc_words.items()) == dict(sequential.doc_words.items())
+        assert set(distributed.broken_urls) == set(sequential.broken_urls)
+        assert set(distributed.outgoing_urls) == set(sequential.outgoing_urls)
+        assert distributed.num_pages_indexed == sequential.num_pages_indexed
+        assert distributed.duplicate_urls.keys() == sequential.duplicate_urls.keys()
+
+    assert limited.num_pages_indexed == 20
+    assert "partitioning URLs by host" in log.getvalue() and polite.num_pages_indexed == 5
+    assert set(limited.doc_words.keys()) <= set(sequential.doc_words.keys())
+
+
+def test_workers_must_connect():
+    """A coordinator listening for remote workers needs their key, and gives up if they don't all come"""
+    try:
+        SearchEngine("http://localhost").set_distributed(2, listen=("127.0.0.1", 0))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("--listen without an authkey should be rejected")
+
+    def connect(authkey):
+        try:
+            return Client(listener.address, authkey=authkey)
+        except AuthenticationError:
+            return None
+
+    # One worker with the right key, one with a wrong key: only one of two connects
+    listener = Listener(("127.0.0.1", 0), authkey=b"secret")
+    workers = [threading.Thread(target=connect, args=(authkey,)) for authkey in (b"secret", b"wrong")]
+    for worker in workers:
+        worker.start()
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            accept_workers(listener, 2, b"secret", timeout=1)
+    except RuntimeError as e:
+        assert "Only 1 of 2" in str(e)
+    else:
+        raise AssertionError("accept_workers should time out")
+    for worker in workers:
+        worker.join()
+
+
+def test_scheduler_policies():
+    server, seed_url = serve(make_test_site())
+
+    try:
+        sequential = crawl(seed_url, 1)
+        everything = crawl(seed_url, 1, page_limit=None)
+        bfs = crawl(seed_url, 4, scheduler="bfs")
+        inlinks = crawl(seed_url, 4, scheduler="inlinks")
+    finally:
+        server.shutdown()
+
+    # A single host: its queue in insertion order is the BFS queue
+    assert list(bfs.visited_urls.items()) == list(sequential.visited_urls.items())
+    assert inlinks.num_pages_indexed == 20
+    assert set(inlinks.visited_urls) <= set(everything.visited_urls)
+
+    # Several hosts take turns
+    urls = ["http://a/1", "http://a/2", "http://a/3", "http://b/1", "http://c/1"]
+    frontier = PriorityFrontier()
+    for url in urls:
+        frontier.append(url)
+    order = ["http://a/1", "http://b/1", "http://c/1", "http://a/2", "http://a/3"]
+    assert list(frontier) == order
+    assert [frontier.popleft() for _ in urls] == order
+
+    # Many hosts: the prefetch window is the head of the pop order, with in-link priorities
+    frontier = PriorityFrontier("inlinks")
+    urls = ["http://h%d/%d" % (host, page) for page in range(3) for host in range(50)]
+    for url in urls:
+        frontier.append(url)
+    for url in urls[::7]:
+        frontier.link_found(url)
+    order = list(frontier)
+    assert sorted(order) == sorted(urls)
+    assert list(itertools.islice(frontier, 10)) == order[:10]
+    assert [frontier.popleft() for _ in urls] == order
+
+
+if __name__ == "__main__":
+    test_async_crawl_matches_sequential()
+    test_distributed_crawl_covers_sequential()
+    test_workers_must_connect()
+    test_scheduler_policies()
+    print("[SUCCESS] Concurrent, parser-worker and distributed crawls match the sequential crawl.")
@@ -0,0 +1,83 @@
+"""
+Checks that a crawl killed halfway and resumed from its checkpoint log ends exactly like an
+uninterrupted crawl: same visited URLs, documents and broken URLs.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_checkpoint.py   (or pytest test_checkpoint.py)
+"""
+import contextlib
+import io
+import os
+import tempfile
+
+from SearchEngine import SearchEngine
+from synthetic_site import make_test_site, serve
+
+CRASH_AFTER = 8   # Pages processed before the crawl dies
+
+
+def new_engine(seed_url, checkpoint_file=None, resume=False):
+    search_engine = SearchEngine(seed_url)
+    search_engine.set_page_limit(20)
+    search_engine.set_stop_words("Input/stopwords.txt")
+    if checkpoint_file is not None:
+        search_engine.set_checkpoint(checkpoint_file, resume, interval=3)
+    return search_engine
+
+
+def crash_after(search_engine, pages):
+    """The crawl dies after `pages` responses, losing the log rows not written yet"""
+    add_response = search_engine.add_response
+    responses = []
+
+    def dying_add_response(*args):
+        if len(responses) == pages:
+            raise RuntimeError("crawler killed")
+        responses.append(args[0])
+        add_response(*args)
+
+    search_engine.add_response = dying_add_response
+    search_engine.checkpoint.close = search_engine.checkpoint.db.close  # No final flush
+
+
+def test_resumed_crawl_matches_uninterrupted():
+    server, seed_url = serve(make_test_site())
+    directory = tempfile.TemporaryDirectory()
+    checkpoint_file = os.path.join(directory.name, "checkpoint.db")
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            uninterrupted = new_engine(seed_url)
+            uninterrupted.crawl()
+
+            crashed = new_engine(seed_url, checkpoint_file)
+            crash_after(crashed, CRASH_AFTER)
+            try:
+                crashed.crawl()
+            except RuntimeError:
+                pass
+            else:
+                raise AssertionError("The crawl should have died")
+
+            # Opening the log without crawling (e.g. a session that only searches) keeps it
+            new_engine(seed_url, checkpoint_file).checkpoint.close()
+
+            resumed = new_engine(seed_url, checkpoint_file, resume=True)
+            checkpoint = resumed.checkpoint
+            logged = sum(len(outcomes) for outcomes in checkpoint.replay.values())
+            assert logged > 0 and logged % 3 == 0  # Only whole batches were written
+            resumed.crawl()
+    finally:
+        server.shutdown()
+
+    assert checkpoint.pages_replayed > 0
+    assert resumed.visited_urls == uninterrupted.visited_urls
+    assert list(resumed.doc_words.items()) == list(uninterrupted.doc_words.items())
+    assert list(resumed.broken_urls) == list(uninterrupted.broken_urls)
+
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    test_resumed_crawl_matches_uninterrupted()
+    print("[SUCCESS] The resumed crawl matches an uninterrupted crawl.")
@@ -0,0 +1,51 @@
+"""
+Checks document clustering on corpora smaller than the number of leaders asked for:
+an empty crawl, a single document and a few documents, with both clustering methods.
+Runs against tiny sites on a local HTTP server, so no internet is needed.
+
+Run with:  python test_clustering.py   (or pytest test_clustering.py)
+"""
+import contextlib
+import io
+
+from SearchEngine import SearchEngine, CLUSTER_METHODS
+from synthetic_site import serve, WORDS
+
+
+def make_pages(num_pages):
+    """A home page linking to num_pages pages (num_pages=0: no pages at all, not even home)"""
+    if num_pages == 0:
+        return {"/robots.txt": ""}
+
+    pages = {"/p%d.html" % i: "<html><title>Page %d</title><body>%s</body></html>" % (i, " ".join(WORDS[i:i + 5]))
+             for i in range(num_pages - 1)}
+    pages["/"] = "<html><title>Home</title><body>home " + "".join('<a href="%s">p</a>' % path for path in pages) + "</body></html>"
+    return pages
+
+
+def test_small_corpus():
+    for num_pages in (0, 1, 2, 3):
+        server, seed_url = serve(make_pages(num_pages))
+        try:
+            search_engine = SearchEngine(seed_url)
+            with contextlib.redirect_stdout(io.StringIO()):
+                search_engine.crawl()
+                search_engine.build_frequency_matrix()
+        finally:
+            server.shutdown()
+        assert search_engine.N == num_pages
+
+        for method in CLUSTER_METHODS:
+            search_engine.set_clustering(method, seed=1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                search_engine.cluster_docs(k=5)
+
+            # Every document is a leader or follows exactly one
+            assert len(search_engine.clusters) == (max(1, num_pages // 2) if num_pages else 0)
+            docs = list(search_engine.clusters) + [doc for followers in search_engine.clusters.values() for doc, _ in followers]
+            assert sorted(docs) == list(range(num_pages))
+
+
+if __name__ == "__main__":
+    test_small_corpus()
+    print("[SUCCESS] Clustering handles corpora smaller than the number of leaders.")
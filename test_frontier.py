@@ -0,0 +1,79 @@
+"""
+Checks the disk-spilling frontier: with far more URLs queued than its memory limit, every
+URL comes out in the order it was queued (the same as a plain deque), whatever the mix of
+appends and pops, and a crawl with a tiny memory limit visits the pages in the same order.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_frontier.py   (or pytest test_frontier.py)
+"""
+import collections
+import contextlib
+import io
+import random
+
+from Frontier import DiskSpillingFrontier
+from WebCrawler import WebCrawler
+from synthetic_site import make_test_site, serve
+
+
+def test_spilled_urls_keep_fifo_order():
+    rng = random.Random(7)
+    frontier = DiskSpillingFrontier(memory_limit=10)
+    expected = collections.deque()
+    spilled = False
+
+    # Bursts of appends beyond the limit, then pops that go back and forth across it
+    for step in range(2000):
+        if rng.random() < 0.55 or not expected:
+            url = "http://localhost/p%d.html?q=%s" % (step, rng.choice(["a", "é", "日本"]))
+            frontier.append(url)
+            expected.append(url)
+        else:
+            assert frontier.popleft() == expected.popleft()
+
+        assert len(frontier) == len(expected)
+        assert len(frontier.queue) <= frontier.memory_limit
+        spilled = spilled or frontier.spill_count > 0
+
+        # Peeking at the head (prefetching) sees the oldest URLs
+        head = list(frontier)
+        assert head == list(expected)[:len(head)] and (head or not expected)
+
+    assert spilled and len(expected) > frontier.memory_limit
+
+    while expected:
+        assert frontier.popleft() == expected.popleft()
+    assert len(frontier) == 0 and frontier.spill_file is None  # The spill file is closed when drained
+
+
+def crawl(seed_url, memory_limit=None):
+    crawler = WebCrawler(seed_url)
+    crawler.set_page_limit(20)
+    crawler.set_stop_words("Input/stopwords.txt")
+    if memory_limit is not None:
+        crawler.set_frontier_memory_limit(memory_limit)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        crawler.crawl()
+
+    return crawler
+
+
+def test_crawl_with_spilling_frontier():
+    server, seed_url = serve(make_test_site())
+    try:
+        in_memory = crawl(seed_url)
+        spilling = crawl(seed_url, memory_limit=2)
+    finally:
+        server.shutdown()
+
+    assert isinstance(spilling.url_frontier, DiskSpillingFrontier)
+    assert list(spilling.visited_urls) == list(in_memory.visited_urls)
+    assert list(spilling.url_frontier) == list(in_memory.url_frontier)[:len(spilling.url_frontier.queue)]
+    assert len(spilling.url_frontier) == len(in_memory.url_frontier) > spilling.url_frontier.memory_limit
+
+
+if __name__ == "__main__":
+    test_spilled_urls_keep_fifo_order()
+    test_crawl_with_spilling_frontier()
+    print("[SUCCESS] The disk-spilling frontier keeps FIFO order beyond its memory limit.")
@@ -0,0 +1,110 @@
+"""
+Checks the binary index file: an index saved and memory-mapped again answers every query
+like the engine that built it, files of another format version are rejected, and an index
+exported with pickle by older versions converts to an equivalent binary index.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_index_file.py   (or pytest test_index_file.py)
+"""
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+import IndexFile
+from SearchEngine import SearchEngine
+from synthetic_site import make_test_site, serve, QUERIES
+
+
+def crawl(seed_url):
+    search_engine = SearchEngine(seed_url)
+    search_engine.set_page_limit(20)
+    search_engine.set_stop_words("Input/stopwords.txt")
+    search_engine.set_thesaurus("Input/thesaurus.csv")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        search_engine.crawl()
+        search_engine.build_frequency_matrix()
+
+    return search_engine
+
+
+def load(filename):
+    search_engine = SearchEngine("")
+    search_engine.set_thesaurus("Input/thesaurus.csv")  # Not part of the index file
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        search_engine.load_index(filename)
+
+    return search_engine
+
+
+def results(search_engine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [search_engine.process_query(query, k) for query in QUERIES for k in (1, 6)]
+
+
+def test_index_file():
+    server, seed_url = serve(make_test_site())
+    try:
+        search_engine = crawl(seed_url)
+    finally:
+        server.shutdown()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "index.idx")
+        search_engine.save_index(filename)
+        assert IndexFile.is_index_file(filename)
+
+        # Memory-mapped: the arrays are views on the file, and every query gets the same answer
+        loaded = load(filename)
+        assert not loaded.idf.flags.owndata and not loaded.idf.flags.writeable
+        assert loaded.N == search_engine.N and list(loaded.all_terms) == list(search_engine.all_terms)
+        assert np.array_equal(loaded.pagerank, search_engine.pagerank)
+        assert results(loaded) == results(search_engine)
+
+        # Another format version is rejected instead of being misread
+        other_version = os.path.join(directory, "other_version.idx")
+        with open(filename, "rb") as f:
+            data = bytearray(f.read())
+        magic, version, count = IndexFile.HEADER.unpack_from(data, 0)
+        IndexFile.HEADER.pack_into(data, 0, magic, version + 1, count)
+        with open(other_version, "wb") as f:
+            f.write(data)
+
+        try:
+            load(other_version)
+            assert False, "an index of another format version was loaded"
+        except ValueError as e:
+            assert "Unsupported index format version {}".format(version + 1) in str(e)
+
+        # An index exported with pickle by older versions (the engine's attributes, the
+        # words of every document as a list of strings) converts to an equivalent index
+        old_export = os.path.join(directory, "exported_index.obj")
+        with open(old_export, "wb") as f:
+            pickle.dump({"seed_url": search_engine.seed_url, "domain_url": search_engine.domain_url,
+                         "stop_words": search_engine.stop_words, "thesaurus": search_engine.thesaurus,
+                         "visited_urls": search_engine.visited_urls, "doc_urls": search_engine.doc_urls,
+                         "doc_titles": search_engine.doc_titles,
+                         "doc_words": {doc_id: list(words) for doc_id, words in search_engine.doc_words.items()}}, f)
+        assert not IndexFile.is_index_file(old_export)
+
+        converted = os.path.join(directory, "converted.idx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            IndexFile.convert_pickle_index(old_export, converted)
+        assert IndexFile.is_index_file(converted)
+
+        converted_index = load(converted)
+        assert list(converted_index.index.doc_ids) == list(search_engine.index.doc_ids)
+        assert np.allclose(converted_index.idf, search_engine.idf)
+        assert results(converted_index) == results(search_engine)
+
+        del loaded, converted_index  # Unmap the files before the directory is removed
+
+
+if __name__ == "__main__":
+    test_index_file()
+    print("[SUCCESS] Saved and memory-mapped indexes answer like the original; versions and pickle exports are handled.")
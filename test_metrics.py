@@ -0,0 +1,131 @@
+"""
+Checks the crawl and search metrics: after a small crawl and a few queries the counters
+and histograms hold what happened, the Prometheus and JSON exports report the same values,
+hooks see every update, and with metrics off nothing is recorded and results are unchanged.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_metrics.py   (or pytest test_metrics.py)
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import urllib.parse
+
+from Metrics import Metrics
+from SearchEngine import SearchEngine
+from synthetic_site import make_test_site, serve, QUERIES
+
+
+def crawl_and_search(seed_url, metrics=None):
+    search_engine = SearchEngine(seed_url)
+    search_engine.set_page_limit(10)
+    search_engine.set_stop_words("Input/stopwords.txt")
+    search_engine.set_thesaurus("Input/thesaurus.csv")
+    if metrics is not None:
+        search_engine.set_metrics(metrics)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        search_engine.crawl()
+        search_engine.build_frequency_matrix()
+        results = [search_engine.process_query(query, 6) for query in QUERIES]
+
+    return search_engine, results
+
+
+def prometheus_samples(text):
+    """{sample name with labels: value} of the Prometheus text format, and the declared types"""
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            types[name] = kind
+        elif line:
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples, types
+
+
+def test_metrics():
+    pages = make_test_site()
+    server, seed_url = serve(pages)
+    try:
+        metrics = Metrics()
+        updates = []
+        metrics.add_hook(lambda kind, name, value, labels: updates.append((kind, name, value, labels)))
+        search_engine, results = crawl_and_search(seed_url, metrics)
+
+        plain, plain_results = crawl_and_search(seed_url)
+    finally:
+        server.shutdown()
+
+    # The counters and histograms hold what the crawl and the queries did
+    fetched = sum(len(pages[urllib.parse.urlsplit(url).path].encode("utf-8")) for url in search_engine.visited_urls)
+    pages_fetched = len(search_engine.visited_urls)
+    assert metrics.value("pages_crawled_total") == search_engine.num_pages_crawled == pages_fetched
+    assert metrics.value("pages_indexed_total") == search_engine.num_pages_indexed
+    assert metrics.value("bytes_downloaded_total") == fetched
+    assert metrics.value("fetch_errors_total") == len(search_engine.broken_urls)
+    assert metrics.value("frontier_size") == len(search_engine.url_frontier)
+    assert metrics.value("queries_total") == len(QUERIES)
+    assert metrics.value("queries_expanded_total") == search_engine.expansion_stats["expanded"] > 0
+    assert metrics.value("link_graph_links") == search_engine.link_graph.num_links
+
+    assert metrics.histogram("fetch_seconds").count == pages_fetched
+    assert metrics.histogram("parse_seconds", step="html").count == pages_fetched
+    assert metrics.histogram("parse_seconds", step="tokenize").count == pages_fetched
+    assert metrics.histogram("query_seconds").count == len(QUERIES)
+    for stage in ("crawl", "stem", "index_build", "document_vectors", "pagerank"):
+        assert metrics.value("stage_seconds_total", stage=stage) > 0
+
+    # Hooks saw every update: counters add up to their value, histograms get every observation
+    assert sum(value for kind, name, value, labels in updates if name == "pages_crawled_total") == pages_fetched
+    assert sum(value for kind, name, value, labels in updates if name == "bytes_downloaded_total") == fetched
+    assert [labels for kind, name, value, labels in updates if name == "parse_seconds"][:2] == [{"step": "html"}, {"step": "tokenize"}]
+    assert {kind for kind, name, value, labels in updates if name == "query_seconds"} == {"histogram"}
+    assert sum(1 for kind, name, value, labels in updates if name == "query_seconds") == len(QUERIES)
+
+    # Prometheus export: every counter and histogram with the same values, cumulative buckets
+    samples, types = prometheus_samples(metrics.to_prometheus())
+    assert types["webcrawler_pages_crawled_total"] == "counter"
+    assert types["webcrawler_frontier_size"] == "gauge"
+    assert types["webcrawler_fetch_seconds"] == "histogram"
+    assert samples["webcrawler_pages_crawled_total"] == pages_fetched
+    assert samples["webcrawler_bytes_downloaded_total"] == fetched
+    assert samples['webcrawler_stage_seconds_total{stage="crawl"}'] == metrics.value("stage_seconds_total", stage="crawl")
+    assert samples["webcrawler_query_seconds_count"] == len(QUERIES)
+    assert samples['webcrawler_query_seconds_bucket{le="+Inf"}'] == len(QUERIES)
+    assert samples["webcrawler_query_seconds_sum"] == metrics.histogram("query_seconds").sum
+    assert samples['webcrawler_parse_seconds_count{step="tokenize"}'] == pages_fetched
+    buckets = [value for name, value in samples.items() if name.startswith("webcrawler_fetch_seconds_bucket")]
+    assert buckets == sorted(buckets) and buckets[-1] == pages_fetched
+
+    # JSON export: the same values, and written to a file by its extension
+    with tempfile.TemporaryDirectory() as directory:
+        metrics.write(os.path.join(directory, "metrics.json"))
+        metrics.write(os.path.join(directory, "metrics.prom"))
+        with open(os.path.join(directory, "metrics.json")) as f:
+            exported = json.load(f)
+        with open(os.path.join(directory, "metrics.prom")) as f:
+            assert f.read() == metrics.to_prometheus()
+
+    assert exported["counters"]["pages_crawled_total"] == [{"labels": {}, "value": pages_fetched}]
+    assert exported["counters"]["queries_total"] == [{"labels": {}, "value": len(QUERIES)}]
+    assert exported["gauges"]["frontier_size"] == [{"labels": {}, "value": len(search_engine.url_frontier)}]
+    query_seconds = exported["histograms"]["query_seconds"][0]
+    assert query_seconds["count"] == len(QUERIES) and query_seconds["buckets"]["+Inf"] == len(QUERIES)
+    assert [series["labels"] for series in exported["histograms"]["parse_seconds"]] == [{"step": "html"}, {"step": "tokenize"}]
+    assert exported["derived"]["expansion_rate"] == search_engine.expansion_stats["expanded"] / len(QUERIES)
+    assert exported["derived"]["tokens_per_second"] > 0
+
+    # Off (the default): nothing is recorded, and the crawl and the results are the same
+    assert plain.metrics is None
+    assert isinstance(plain.stage_timer("crawl"), contextlib.nullcontext)
+    assert plain.visited_urls.keys() == search_engine.visited_urls.keys()
+    assert plain_results == results
+
+
+if __name__ == "__main__":
+    test_metrics()
+    print("[SUCCESS] Metrics record the crawl and queries; Prometheus/JSON exports and hooks agree; off records nothing.")
@@ -0,0 +1,84 @@
+"""
+Checks near-duplicate detection: MinHash/LSH finds pages that differ by one word, and
+during a crawl such pages are collapsed onto the page indexed first, while exact copies
+are still left to the SHA-256 duplicate check.
+Runs against a generated site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_near_duplicates.py   (or pytest test_near_duplicates.py)
+"""
+import contextlib
+import io
+import random
+
+from NearDuplicates import NearDuplicateDetector
+from SearchEngine import SearchEngine
+from synthetic_site import make_site, serve
+
+
+def test_detector():
+    rng = random.Random(1)
+    words = [rng.choice("abcdefghijklmnopqrstuvwxyz") * 3 for _ in range(300)]
+    changed = list(words)
+    changed[150] = "timestamp"
+    other = [rng.choice("abcdefghijklmnopqrstuvwxyz") * 3 for _ in range(300)]
+
+    detector = NearDuplicateDetector(0.9)
+    assert detector.find("a", words) is None
+    assert detector.find("b", other) is None
+
+    original, similarity = detector.find("c", changed)
+    assert original == "a" and similarity >= 0.9
+    assert "c" not in detector.signatures  # Collapsed documents are not remembered
+    assert detector.find("d", []) is None
+
+
+def test_near_duplicates_collapsed_while_crawling():
+    pages = make_site(60, duplicate_rate=0.1, near_duplicate_rate=0.2)
+    near = {path for path in pages if path.startswith("/near/")}
+    copies = {path for path in pages if path.startswith("/copy/")}
+    assert near and copies
+
+    server, seed_url = serve(pages)
+    try:
+        search_engine = SearchEngine(seed_url)
+        search_engine.set_stop_words("Input/stopwords.txt")
+        search_engine.set_near_duplicate_threshold(0.9)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            search_engine.crawl()
+            search_engine.produce_duplicates()
+    finally:
+        server.shutdown()
+
+    def url(path):
+        return seed_url + path
+
+    # Every /near/ page is collapsed onto its original and not indexed
+    collapsed = {near_url: (doc_id, similarity) for doc_id, clusters in search_engine.near_duplicate_urls.items()
+                 for near_url, similarity in clusters}
+    assert set(collapsed) == {url(path) for path in near}
+    for path in near:
+        doc_id, similarity = collapsed[url(path)]
+        assert search_engine.doc_urls[doc_id] == url(path.replace("/near/", "/"))
+        assert similarity >= 0.9
+    assert not set(search_engine.doc_urls.values()) & set(collapsed)
+
+    # /copy/ pages stay exact duplicates: same content hash as the original
+    duplicates = [set(urls) for urls in search_engine.duplicate_urls.values()]
+    for path in copies:
+        assert {url(path), url(path.replace("/copy/", "/"))} in duplicates
+    assert len(search_engine.doc_words) == 60 + 1  # The pages and the home page
+
+    # The report lists every cluster: the indexed page, then its near-duplicates
+    report = str(search_engine)
+    section = report[report.index("Near-Duplicate URLs (not indexed"):]
+    for doc_id, clusters in search_engine.near_duplicate_urls.items():
+        lines = ["  +  " + search_engine.doc_urls[doc_id]]
+        lines += ["      +  {} ({:.2f})".format(near_url, similarity) for near_url, similarity in clusters]
+        assert "\n".join(lines) in section
+
+
+if __name__ == "__main__":
+    test_detector()
+    test_near_duplicates_collapsed_while_crawling()
+    print("[SUCCESS] Near-duplicate pages are collapsed; exact copies stay duplicates.")
@@ -0,0 +1,98 @@
+"""
+Checks how pages are decoded and tokenized: the charset comes from the HTTP header, then
+a <meta> declaration, then UTF-8 (table of cases), the streaming tokenizer joins words
+split across text nodes (table of cases), and a page that is not UTF-8 is parsed into
+the right words.
+
+Run with:  python test_page_parser.py   (or pytest test_page_parser.py)
+"""
+import itertools
+import types
+
+from PageParser import PageParser, decode_page, tokenize
+
+# (description, body, charset of the Content-Type header, expected text)
+DECODE_CASES = [
+    ("header charset",
+     "café".encode("latin-1"), "iso-8859-1", "café"),
+    ("header charset wins over meta",
+     b'<meta charset="utf-8">' + "café".encode("cp1252"), "windows-1252", '<meta charset="utf-8">café'),
+    ("meta charset",
+     b'<meta charset="windows-1252">' + "naïve façade".encode("cp1252"), None,
+     '<meta charset="windows-1252">naïve façade'),
+    ("meta charset without quotes",
+     b"<META CHARSET=ISO-8859-15>" + "50 €".encode("iso-8859-15"), None, "<META CHARSET=ISO-8859-15>50 €"),
+    ("meta http-equiv",
+     b'<meta http-equiv="Content-Type" content="text/html; charset=shift_jis">' + "日本語".encode("shift_jis"), None,
+     '<meta http-equiv="Content-Type" content="text/html; charset=shift_jis">日本語'),
+    ("no declaration: UTF-8",
+     "naïve 日本語".encode("utf-8"), None, "naïve 日本語"),
+    ("unknown charset name: UTF-8",
+     b'<meta charset="x-no-such-charset">' + "naïve".encode("utf-8"), None, '<meta charset="x-no-such-charset">naïve'),
+    ("unknown header charset: UTF-8",
+     "naïve".encode("utf-8"), "x-no-such-charset", "naïve"),
+    ("meta declaration too far down is not seen",
+     b" " * 3000 + b'<meta charset="windows-1252">' + "é".encode("cp1252"), None,
+     " " * 3000 + '<meta charset="windows-1252">�'),
+    ("undecodable bytes are replaced",
+     b"ok \xff\xfe ok", None, "ok �� ok"),
+]
+
+# (description, text pieces, expected tokens)
+TOKENIZE_CASES = [
+    ("one piece", ["hello web  world"], ["hello", "web", "world"]),
+    ("word split across pieces", ["<b>", "web", "site is here"], ["<b>website", "is", "here"]),
+    ("word split over three pieces", ["in", "dex", "ing done"], ["indexing", "done"]),
+    ("whitespace ends a word", ["web ", "site"], ["web", "site"]),
+    ("whitespace starts a piece", ["web", " site"], ["web", "site"]),
+    ("newlines and tabs", ["a\tb\n", "c\r\nd"], ["a", "b", "c", "d"]),
+    ("empty and blank pieces", ["", "  ", "x", "", "y"], ["xy"]),
+    ("last word without whitespace", ["end"], ["end"]),
+    ("nothing", [], []),
+    ("only whitespace", [" \n ", "\t"], []),
+]
+
+
+def test_decode_page():
+    for description, body, charset, expected in DECODE_CASES:
+        assert decode_page(body, charset) == expected, description
+
+
+def test_tokenize():
+    for description, chunks, expected in TOKENIZE_CASES:
+        tokens = tokenize(iter(chunks))
+        assert isinstance(tokens, types.GeneratorType)
+        assert list(tokens) == expected, description
+
+        # The same tokens as splitting the whole text at once
+        assert expected == "".join(chunks).split(), description
+
+
+def test_tokenize_streams():
+    # Tokens come out while the pieces are still being read: an endless text works
+    assert list(itertools.islice(tokenize(itertools.cycle(["crawl", "er ", "web "])), 4)) == ["crawler", "web", "crawler", "web"]
+
+
+def test_non_utf8_page():
+    html = ('<html><head><meta charset="windows-1252"><title>Café menu</title></head>'
+            '<body><p>The naïve fa<b>çade</b> of the café.</p>\n<a href="menü.html">more</a></body></html>')
+    body = html.encode("cp1252")
+    parser = PageParser(["the", "of"])
+
+    for charset in (None, "windows-1252"):  # From the <meta> declaration, or the HTTP header
+        page = parser.parse("http://localhost/café.html", body, charset)
+        assert page["title"] == "Café menu"
+        assert page["words"] == ["naïve", "façade", "more"]  # "café" ends in a letter the word filter rejects
+        assert page["links"] == ["http://localhost/menü.html"]
+        assert page["doc_id"] == PageParser.content_hash(body)
+
+    # Read as UTF-8 the same bytes would be garbled
+    assert "façade" not in decode_page(body.replace(b"windows-1252", b"utf-8"))
+
+
+if __name__ == "__main__":
+    test_decode_page()
+    test_tokenize()
+    test_tokenize_streams()
+    test_non_utf8_page()
+    print("[SUCCESS] Pages are decoded with the right charset and tokenized across text nodes.")
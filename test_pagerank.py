@@ -0,0 +1,100 @@
+"""
+Checks the link graph and PageRank: the CSR graph holds the crawled links between documents,
+PageRank matches a dense computation, and blending it into scores ranks the top k exactly
+like scoring every document.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_pagerank.py   (or pytest test_pagerank.py)
+"""
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from SearchEngine import SearchEngine
+from UrlCanonicalizer import canonicalize
+from synthetic_site import make_test_site, serve, QUERIES
+
+
+def dense_pagerank(graph, damping=0.85, iterations=200):
+    n = graph.num_docs
+    links = np.zeros((n, n))
+    for doc in range(n):
+        links[doc, graph.indices[graph.indptr[doc]:graph.indptr[doc + 1]]] = 1
+
+    # Pages without links link to every page
+    transitions = np.where(links.sum(axis=1, keepdims=True) > 0, links, 1.0)
+    transitions /= transitions.sum(axis=1, keepdims=True)
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        rank = (1 - damping) / n + damping * transitions.T @ rank
+    return rank
+
+
+def test_pagerank():
+    server, seed_url = serve(make_test_site())
+
+    try:
+        search_engine = SearchEngine(seed_url)
+        search_engine.set_page_limit(20)
+        search_engine.set_stop_words("Input/stopwords.txt")
+        search_engine.set_thesaurus("Input/thesaurus.csv")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            search_engine.crawl()
+            search_engine.build_frequency_matrix()
+    finally:
+        server.shutdown()
+
+    graph = search_engine.link_graph
+    doc_numbers = {doc_id: doc for doc, doc_id in enumerate(search_engine.index.doc_ids)}
+    assert graph.num_docs == search_engine.N and graph.num_links > 0
+
+    # The graph holds exactly the crawled links between two different indexed documents
+    expected = set()
+    for page, links in search_engine.page_links.items():
+        source = doc_numbers.get(search_engine.visited_urls[page][1])
+        for link in links:
+            target = doc_numbers.get(search_engine.visited_urls.get(canonicalize(link), (None, None))[1])
+            if source is not None and target is not None and source != target:
+                expected.add((source, target))
+    assert {(doc, int(target)) for doc in range(graph.num_docs)
+            for target in graph.indices[graph.indptr[doc]:graph.indptr[doc + 1]]} == expected
+
+    # A crawl state saved before the edges were recorded gets them from its page links
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "crawl_state.pkl")
+        search_engine.save_crawl_state(filename)
+        with open(filename, "rb") as f:
+            state = pickle.load(f)
+        del state["link_sources"], state["link_targets"]
+        with open(filename, "wb") as f:
+            pickle.dump(state, f)
+
+        loaded = SearchEngine(seed_url)
+        loaded.load_crawl_state(filename)
+    old_graph = loaded.build_link_graph(search_engine.index.doc_ids)
+    assert np.array_equal(old_graph.indptr, graph.indptr) and np.array_equal(old_graph.indices, graph.indices)
+
+    assert graph.pagerank_stats["converged"]
+    rank = graph.pagerank(tolerance=1e-12, max_iterations=1000)
+    assert np.allclose(rank, dense_pagerank(graph), atol=1e-9)
+    assert abs(rank.sum() - 1) < 1e-9
+    assert search_engine.pagerank.max() == 1
+
+    # The top k with the PageRank blend is the top of all scored documents
+    for weight in (0.1, 1.0):
+        search_engine.set_pagerank_weight(weight)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for k in (1, 3, 6):
+                assert [search_engine.process_query(query, k) for query in QUERIES] == \
+                    search_engine.process_queries(QUERIES, k)
+
+
+if __name__ == "__main__":
+    test_pagerank()
+    print("[SUCCESS] PageRank matches the dense computation; blended top-k matches full scoring.")
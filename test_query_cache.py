@@ -0,0 +1,97 @@
+"""
+Checks the query cache: results are the same with the cache on and off, changes to the
+index or the query expansion invalidate it, and callers changing the result rows they
+got cannot change what the cache returns next.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_query_cache.py   (or pytest test_query_cache.py)
+"""
+import contextlib
+import io
+import os
+import tempfile
+
+from SearchEngine import SearchEngine
+from synthetic_site import make_test_site, serve, QUERIES
+
+EXPANDED = ("mystery story", 100)  # Matches fewer than k/2 documents: always expanded
+
+
+def crawl(seed_url, page_limit):
+    search_engine = SearchEngine(seed_url)
+    search_engine.set_page_limit(page_limit)
+    search_engine.set_stop_words("Input/stopwords.txt")
+    search_engine.set_thesaurus("Input/thesaurus.csv")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        search_engine.crawl()
+        search_engine.build_frequency_matrix()
+
+    return search_engine
+
+
+def uncached(search_engine, query, k):
+    cache, search_engine.query_cache = search_engine.query_cache, None
+    try:
+        return search_engine.process_query(query, k)
+    finally:
+        search_engine.query_cache = cache
+
+
+def assert_invalidated(search_engine, change, changes_results=True):
+    """After change(), the cached query is looked up again and gives the new results"""
+    before = search_engine.process_query(*EXPANDED)
+    assert search_engine.process_query(*EXPANDED) == before  # Now cached
+    misses = search_engine.query_cache.misses
+
+    change()
+    after = search_engine.process_query(*EXPANDED)
+
+    assert search_engine.query_cache.misses == misses + 1
+    assert after == uncached(search_engine, *EXPANDED)
+    assert (after != before) is changes_results
+
+
+def test_query_cache():
+    server, seed_url = serve(make_test_site())
+    try:
+        search_engine = crawl(seed_url, 10)
+        larger = crawl(seed_url, 20)
+    finally:
+        server.shutdown()
+
+    directory = tempfile.TemporaryDirectory()
+    index_file = os.path.join(directory.name, "index.idx")
+    thesaurus_file = os.path.join(directory.name, "thesaurus.csv")
+    with open(thesaurus_file, "w") as thesaurus:
+        thesaurus.write("story,castle,poetry\n")
+    with contextlib.redirect_stdout(io.StringIO()):
+        larger.save_index(index_file)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Same results with the cache on (first and repeated lookups) and off
+        for k in (1, 6, 100):
+            expected = [uncached(search_engine, query, k) for query in QUERIES]
+            assert [search_engine.process_query(query, k) for query in QUERIES] == expected
+            assert [search_engine.process_query(query, k) for query in QUERIES] == expected
+        assert search_engine.query_cache.hits >= 3 * len(QUERIES)
+        assert search_engine.process_query("book mystery") == search_engine.process_query("mystery book")
+
+        # Changing the returned rows does not change the cached ones
+        results = search_engine.process_query("mystery")
+        expected = [row[:] for row in results]
+        results[0][1] = "Changed"
+        results.append(results[0])
+        assert search_engine.process_query("mystery") == expected
+
+        assert_invalidated(search_engine, lambda: search_engine.set_synonym_weight(0.5))
+        assert_invalidated(search_engine, lambda: search_engine.set_thesaurus(thesaurus_file))
+        assert_invalidated(search_engine, search_engine.build_frequency_matrix, changes_results=False)
+        assert_invalidated(search_engine, lambda: search_engine.load_index(index_file))
+
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    test_query_cache()
+    print("[SUCCESS] Cached results match uncached ones and are invalidated when the index changes.")
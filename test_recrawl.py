@@ -0,0 +1,100 @@
+"""
+Checks that an incremental re-crawl gives the same index as crawling the changed site from
+scratch: same documents, scores, titles, URLs, snippets, title index and PageRank, after
+pages were changed, deleted and added.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_recrawl.py   (or pytest test_recrawl.py)
+"""
+import contextlib
+import io
+import os
+import tempfile
+
+import numpy as np
+
+from SearchEngine import SearchEngine
+from synthetic_site import make_test_site, serve, QUERIES
+
+
+def crawl(seed_url):
+    search_engine = SearchEngine(seed_url)
+    search_engine.set_stop_words("Input/stopwords.txt")
+    search_engine.set_thesaurus("Input/thesaurus.csv")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        search_engine.crawl()
+        search_engine.build_frequency_matrix()
+
+    return search_engine
+
+
+def snapshot(search_engine):
+    """The index by document id and URL, independent of the document numbering"""
+    doc_ids = list(search_engine.index.doc_ids)
+    urls = list(search_engine.result_urls)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        rankings = [sorted((round(float(score), 9), url) for score, _, url, _ in results)
+                    for results in search_engine.process_queries(QUERIES, 100)]
+
+    return {
+        "results": {doc_id: (search_engine.result_titles[doc], urls[doc], search_engine.result_snippets[doc])
+                    for doc, doc_id in enumerate(doc_ids)},
+        "titles": {word: sorted(urls[doc] for doc in search_engine.title_index[word]) for word in search_engine.title_index},
+        "pagerank": {doc_id: round(float(rank), 9) for doc_id, rank in zip(doc_ids, search_engine.pagerank)},
+        "rankings": rankings,
+    }
+
+
+def test_recrawl_matches_fresh_crawl():
+    pages = make_test_site()
+    # Crawled before /p5.html, so it is the URL shown for their shared content
+    pages["/twin.html"] = pages["/p5.html"]
+    pages["/"] = pages["/"].replace("</body>", '<a href="/twin.html">t</a></body>')
+    server, seed_url = serve(pages)
+    directory = tempfile.TemporaryDirectory()
+
+    try:
+        search_engine = crawl(seed_url)
+        assert any(url.endswith("/twin.html") for url in search_engine.result_urls)
+
+        # Like --recrawl: the exported (memory-mapped) index and the saved crawl state
+        index_file, state_file = os.path.join(directory.name, "index.idx"), os.path.join(directory.name, "state.obj")
+        search_engine.save_index(index_file)
+        search_engine.save_crawl_state(state_file)
+        exported = SearchEngine(seed_url)
+        exported.set_stop_words("Input/stopwords.txt")
+        exported.set_thesaurus("Input/thesaurus.csv")
+        with contextlib.redirect_stdout(io.StringIO()):
+            exported.load_index(index_file)
+        exported.load_crawl_state(state_file)
+
+        pages["/p3.html"] = pages["/p3.html"].replace("Page 3", "Page 3 revised").replace("mystery", "gazetteer")
+        pages["/p4.html"] = pages["/p4.html"].replace("</body>", '<a href="/new.html">n</a></body>')
+        pages["/new.html"] = "<html><title>New page</title><body>lighthouse keeper mystery</body></html>"
+        del pages["/p7.html"]
+        del pages["/twin.html"]  # Its content is still found at /p5.html
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            deleted, added = search_engine.recrawl()
+            exported.recrawl()
+        fresh = crawl(seed_url)
+    finally:
+        server.shutdown()
+
+    assert deleted and added
+    assert search_engine.N == fresh.N == len(search_engine.result_titles)
+    assert np.isclose(search_engine.doc_vectors.sum(), fresh.doc_vectors.sum())
+
+    expected = snapshot(fresh)
+    for recrawled in (snapshot(search_engine), snapshot(exported)):
+        for part in expected:
+            assert recrawled[part] == expected[part], part
+
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    test_recrawl_matches_fresh_crawl()
+    print("[SUCCESS] The re-crawled index matches a fresh crawl of the changed site.")
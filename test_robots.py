@@ -0,0 +1,81 @@
+"""
+Checks robots.txt matching against the examples of RFC 9309: percent-encoding (section
+2.2.2), the special characters "*" and "$" (section 2.2.3), the longest match and the
+choice of the group for our user agent.
+
+Run with:  python test_robots.py   (or pytest test_robots.py)
+"""
+from Robots import RobotsRules, normalize_path
+
+HOST = "http://example.com"
+
+# (Disallow rule, path, blocked?)
+ENCODING_CASES = [
+    ("/foo/bar?baz=quz", "/foo/bar?baz=quz", True),
+    ("/foo/bar/ツ", "/foo/bar/%E3%83%84", True),
+    ("/foo/bar/%E3%83%84", "/foo/bar/ツ", True),
+    ("/foo/bar/%E3%83%84", "/foo/bar/%e3%83%84", True),
+    ("/foo/bar/%62%61%7A", "/foo/bar/baz", True),
+    ("/foo/bar/baz", "/foo/bar/%62%61%7A", True),
+    ("/%7Ejoe/", "/~joe/index.html", True),
+    ("/~joe/", "/%7ejoe/index.html", True),
+    ("/a%2fb", "/a%2Fb", True),
+    ("/a%2Fb", "/a/b", False),      # An escaped "/" is not a path separator
+]
+
+# (robots.txt, path, allowed?)
+MATCHING_CASES = [
+    ("Disallow: /fish", "/fish.html", False),
+    ("Disallow: /fish", "/fish/salmon.html", False),
+    ("Disallow: /fish", "/Fish.asp", True),           # Paths are case-sensitive
+    ("Disallow: /fish/", "/fish", True),
+    ("Disallow: /*.gif$", "/images/cat.gif", False),
+    ("Disallow: /*.gif$", "/images/cat.gif?size=2", True),
+    ("Disallow: /private/*/", "/private/a/b", False),
+    ("Disallow: /private/*/", "/private/a", True),
+    ("Disallow: /*.php$\nAllow: /*.php", "/index.php", False),
+    ("Allow: /example/page/\nDisallow: /example/page/disallowed.gif", "/example/page/disallowed.gif", False),
+    ("Allow: /example/page/\nDisallow: /example/page/disallowed.gif", "/example/page/", True),
+    ("Allow: /page\nDisallow: /*.html", "/page.html", False),  # The longer rule wins
+    ("Allow: /p\nDisallow: /p", "/p", True),                   # Equally long: Allow wins
+    ("Disallow: /", "/robots.txt", True),                      # Always allowed
+    ("Disallow:", "/anything", True),                          # An empty rule matches nothing
+]
+
+# (robots.txt, path, allowed?) - the group naming our product token beats "*"
+GROUP_CASES = [
+    ("User-agent: *\nDisallow: /\n\nUser-agent: WebCrawler\nDisallow: /private/", "/public.html", True),
+    ("User-agent: *\nDisallow: /\n\nUser-agent: webcrawler/1.0\nDisallow: /private/", "/private/a", False),
+    ("User-agent: other\nUser-agent: WebCrawler\nDisallow: /shared/", "/shared/a", False),
+    ("User-agent: other\nDisallow: /\n\nUser-agent: *\nAllow: /", "/page", True),
+    ("Disallow: /\nUser-agent: *\nAllow: /", "/page", True),   # Rules before any User-agent line are ignored
+]
+
+
+def test_percent_encoding():
+    for rule, path, blocked in ENCODING_CASES:
+        rules = RobotsRules(disallowed=[rule])
+        assert rules.allowed(HOST + path) is not blocked, (rule, path)
+
+    assert normalize_path("/%7e/%2f/ä") == "/~/%2F/%C3%A4"
+
+
+def test_matching():
+    for robots_txt, path, allowed in MATCHING_CASES:
+        rules = RobotsRules.parse("User-agent: *\n" + robots_txt)
+        assert rules.allowed(HOST + path) is allowed, (robots_txt, path)
+
+
+def test_groups():
+    for robots_txt, path, allowed in GROUP_CASES:
+        assert RobotsRules.parse(robots_txt).allowed(HOST + path) is allowed, (robots_txt, path)
+
+    rules = RobotsRules.parse("User-agent: *\nCrawl-delay: 2\n\nUser-agent: WebCrawler\nCrawl-delay: 5")
+    assert rules.crawl_delay == 5
+
+
+if __name__ == "__main__":
+    test_percent_encoding()
+    test_matching()
+    test_groups()
+    print("[SUCCESS] robots.txt matching follows the RFC 9309 examples.")
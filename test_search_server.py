@@ -0,0 +1,157 @@
+"""
+Checks the search service on localhost: /search answers like process_query, /health
+describes the served index, and a hot swap with SIGHUP serves the new index without
+failing any of the requests sent while it happens.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_search_server.py   (or pytest test_search_server.py)
+"""
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from SearchEngine import SearchEngine
+from SearchServer import SearchServer
+from synthetic_site import make_test_site, serve, QUERIES
+
+
+def crawl(seed_url, page_limit):
+    search_engine = SearchEngine(seed_url)
+    search_engine.set_page_limit(page_limit)
+    search_engine.set_stop_words("Input/stopwords.txt")
+    search_engine.set_thesaurus("Input/thesaurus.csv")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        search_engine.crawl()
+        search_engine.build_frequency_matrix()
+
+    return search_engine
+
+
+def get(url):
+    """(HTTP status, JSON body)"""
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def search(base_url, query, k):
+    return get(base_url + "/search?" + urllib.parse.urlencode({"q": query, "k": k}))
+
+
+def expected(search_engine, query, k):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [[float(score), title, url, snippet] for score, title, url, snippet in search_engine.process_query(query, k)]
+
+
+def answered(body):
+    return [[row["score"], row["title"], row["url"], row["snippet"]] for row in body["results"]]
+
+
+def wait_for_health(base_url, condition, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, health = get(base_url + "/health")
+            if status == 200 and condition(health):
+                return health
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise AssertionError("the server did not report the expected index in time")
+
+
+def test_search_server():
+    server, seed_url = serve(make_test_site())
+    try:
+        small = crawl(seed_url, 10)
+        large = crawl(seed_url, 20)
+    finally:
+        server.shutdown()
+    assert small.N != large.N
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "index.idx")
+        small.save_index(filename)
+
+        search_server = SearchServer(filename, "127.0.0.1", 0, workers=2)
+        search_server.set_thesaurus("Input/thesaurus.csv")
+        base_url = "http://%s:%d" % search_server.server_address
+
+        process = multiprocessing.get_context("fork").Process(target=search_server.serve_forever)
+        with contextlib.redirect_stdout(io.StringIO()):
+            process.start()
+        search_server.socket.close()  # The server process has its own copy
+
+        try:
+            health = wait_for_health(base_url, lambda health: True)
+            assert health["status"] == "ok" and health["index"] == filename
+            assert health["index_version"] == 0 and health["documents"] == small.N
+
+            for query in QUERIES:
+                status, body = search(base_url, query, 6)
+                assert status == 200 and body["query"] == query and body["k"] == 6
+                assert answered(body) == expected(small, query, 6)
+
+            assert search(base_url, "", 6)[0] == 400
+            assert search(base_url, QUERIES[0], 0)[0] == 400
+            assert get(base_url + "/unknown")[0] == 404
+
+            # Keep querying while the index file is replaced and the server swaps it in
+            # (process_query is not thread-safe: the answers are computed up front)
+            either_index = {query: (expected(small, query, 6), expected(large, query, 6)) for query in QUERIES}
+            failures = []
+            running = threading.Event()
+            running.set()
+
+            def query_loop():
+                while running.is_set():
+                    for query in QUERIES:
+                        try:
+                            status, body = search(base_url, query, 6)
+                            if status != 200 or answered(body) not in either_index[query]:
+                                failures.append((query, status))
+                        except OSError as e:
+                            failures.append((query, str(e)))
+
+            clients = [threading.Thread(target=query_loop) for _ in range(4)]
+            for client in clients:
+                client.start()
+
+            time.sleep(0.2)
+            large.save_index(filename)  # Atomic rename over the served file
+            os.kill(process.pid, signal.SIGHUP)
+            health = wait_for_health(base_url, lambda health: health["index_version"] == 1)
+            time.sleep(0.3)  # More queries after the swap, and the old workers have stopped
+
+            running.clear()
+            for client in clients:
+                client.join()
+
+            assert failures == []
+            assert health["documents"] == large.N
+
+            # Old workers are gone: every answer now comes from the new index
+            for query in QUERIES:
+                status, body = search(base_url, query, 6)
+                assert status == 200 and answered(body) == expected(large, query, 6)
+            assert get(base_url + "/health")[1]["index_version"] == 1
+        finally:
+            os.kill(process.pid, signal.SIGTERM)
+            process.join(10)
+
+
+if __name__ == "__main__":
+    test_search_server()
+    print("[SUCCESS] The search service answers like process_query and hot swaps its index without failing a request.")
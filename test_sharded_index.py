@@ -0,0 +1,61 @@
+"""
+Checks that a sharded index ranks exactly like the unsharded one: same scores, same order,
+including the title boost, thesaurus expansion and the PageRank blend.
+Runs against the small synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_sharded_index.py   (or pytest test_sharded_index.py)
+"""
+import contextlib
+import io
+import tempfile
+
+from SearchEngine import SearchEngine
+from ShardedIndex import build_shards, ShardedSearchEngine
+from synthetic_site import make_test_site, serve, QUERIES
+
+
+def test_sharded_index_matches_unsharded():
+    server, seed_url = serve(make_test_site())
+
+    try:
+        search_engine = SearchEngine(seed_url)
+        search_engine.set_page_limit(20)
+        search_engine.set_stop_words("Input/stopwords.txt")
+        search_engine.set_thesaurus("Input/thesaurus.csv")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            search_engine.crawl()
+            search_engine.build_frequency_matrix()
+    finally:
+        server.shutdown()
+
+    for num_shards in (1, 3, 8):
+        with tempfile.TemporaryDirectory() as directory:
+            build_shards(search_engine, num_shards, directory, processes=2)
+
+            sharded = ShardedSearchEngine(processes=2)
+            sharded.set_thesaurus("Input/thesaurus.csv")
+            sharded.load_index(directory)
+
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for pagerank_weight in (0, 0.5):
+                        search_engine.set_pagerank_weight(pagerank_weight)
+                        sharded.set_pagerank_weight(pagerank_weight)
+                        for k in (1, 3, 6, 20):
+                            for query in QUERIES:
+                                assert sharded.process_query(query, k) == search_engine.process_query(query, k), \
+                                    (num_shards, pagerank_weight, k, query)
+            finally:
+                sharded.close()
+
+    # The PageRank blend does change the rankings, so the comparison above covers it
+    with contextlib.redirect_stdout(io.StringIO()):
+        blended = search_engine.process_queries(QUERIES, 20)
+        search_engine.set_pagerank_weight(0)
+        assert blended != search_engine.process_queries(QUERIES, 20)
+
+
+if __name__ == "__main__":
+    test_sharded_index_matches_unsharded()
+    print("[SUCCESS] Sharded searches match the unsharded index.")
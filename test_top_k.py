@@ -0,0 +1,67 @@
+"""
+Checks the MaxScore top-k search: for many queries and k, top_k_documents returns exactly
+the k best documents of exhaustive scoring (same documents, scores and order), with and
+without the PageRank blend, while last_query_stats shows that documents were skipped
+without being fully scored.
+Runs against a synthetic site of synthetic_site.py, so no internet is needed.
+
+Run with:  python test_top_k.py   (or pytest test_top_k.py)
+"""
+import contextlib
+import io
+import math
+
+from SearchEngine import SearchEngine
+from synthetic_site import make_site, make_queries, serve
+
+
+def exhaustive_top_k(scores, k):
+    """The k best documents of a full scoring, ties to the earlier document like rank_results"""
+    return sorted(((doc, score) for doc, score in scores.items() if score > 0), key=lambda x: (-x[1], x[0]))[:k]
+
+
+def test_top_k():
+    server, seed_url = serve(make_site(num_pages=300, words_per_page=150, seed=3))
+    try:
+        search_engine = SearchEngine(seed_url)
+        search_engine.set_page_limit(301)
+        search_engine.set_stop_words("Input/stopwords.txt")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            search_engine.crawl()
+            search_engine.build_frequency_matrix()
+    finally:
+        server.shutdown()
+
+    queries = make_queries(100, site_seed=3)
+    matched = scored = skipped = 0
+
+    for weight in (0.0, 0.3):
+        search_engine.set_pagerank_weight(weight)
+        all_scores = search_engine.score_documents(queries)
+
+        for query, scores in zip(queries, all_scores):
+            for k in (1, 5, 20):
+                top = search_engine.top_k_scores(query, k)
+                expected = exhaustive_top_k(scores, k)
+
+                ranked = sorted(top.items(), key=lambda x: (-x[1], x[0]))
+                assert [doc for doc, _ in ranked] == [doc for doc, _ in expected], (query, k, weight)
+                assert all(math.isclose(a, b, abs_tol=1e-9) for (_, a), (_, b) in zip(ranked, expected))
+
+                stats = search_engine.last_query_stats
+                assert stats["documents"] == search_engine.N
+                assert stats["scored"] + stats["skipped"] <= len(scores)  # Only documents the query matches
+                assert stats["scored"] >= len(top)
+                matched += len(scores)
+                scored += stats["scored"]
+                skipped += stats["skipped"]
+
+    # MaxScore pays off: documents were skipped, and far fewer were scored than matched
+    assert skipped > 0
+    assert scored < matched / 2
+
+
+if __name__ == "__main__":
+    test_top_k()
+    print("[SUCCESS] MaxScore top-k matches exhaustive scoring and skips documents.")